@@ -0,0 +1,115 @@
+"""
+Pipeline Command Line
+=====================
+
+Purpose:
+    One entry point for the pipeline scripts. Each subcommand runs the
+    matching script's own command line, and only that script is imported,
+    so `stats` never loads pandas and `--help` never loads requests or
+    google-genai.
+
+Usage:
+    python -m scripts <command> [options]     (from the project root)
+    python scripts <command> [options]
+
+    python -m scripts combine --format .jsonl.zst
+    python -m scripts stats
+    python -m scripts scan
+    python -m scripts sample
+    python -m scripts predict --max-cost 2
+    python -m scripts backfill outputs/predictions/predictions_300_final.json --model deepseek
+    python -m scripts analyze outputs/predictions/predictions_300_final.preds
+    python -m scripts prepare-manual
+    python -m scripts serve --stub
+    python -m scripts startup-time            # cold start of every subcommand
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import runpy
+import sys
+import time
+from pathlib import Path
+
+
+SCRIPTS_DIR = Path(__file__).parent
+
+# command -> (script module, description)
+COMMANDS = {
+    'combine': ('combine_datasets', "Combine the five source datasets into the unified dataset"),
+    'stats': ('dataset_statistics', "Print unified dataset statistics"),
+    'scan': ('scan_data_quality', "Flag bad records and write the exclusion list"),
+    'sample': ('create_sample', "Create the evaluation samples"),
+    'predict': ('run_predictions_300', "Run the 300-sample predictions"),
+    'backfill': ('backfill_predictions', "Add a model's column to existing predictions"),
+    'analyze': ('analyze_results', "Inter-model agreement and accuracy"),
+    'prepare-manual': ('prepare_manual_testing', "Prepare the manual testing CSV and prompts"),
+    'compact': ('code_compaction', "Prompt token savings of code/description compaction"),
+    'serve': ('classification_service', "Run the local classification HTTP service"),
+}
+
+PROG = 'python -m scripts'
+
+
+def print_usage(stream=sys.stdout):
+    stream.write(f"usage: {PROG} <command> [options]\n\nCommands:\n")
+    for command, (_, description) in COMMANDS.items():
+        stream.write(f"  {command:<16} {description}\n")
+    stream.write(f"  {'startup-time':<16} Measure cold-start time of every command\n")
+    stream.write(f"\nRun '{PROG} <command> --help' for the options of a command.\n")
+
+
+def run_command(command, args):
+    """Run a script's __main__ block with the given arguments"""
+    module, _ = COMMANDS[command]
+    sys.argv = [f"{PROG} {command}"] + list(args)
+    runpy.run_module(module, run_name='__main__')
+
+
+def startup_time(repeat=5):
+    """Median wall time of '<command> --help' in a fresh interpreter"""
+    import subprocess
+
+    def measure(argv):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                           cwd=SCRIPTS_DIR.parent)
+            times.append(time.perf_counter() - start)
+        return sorted(times)[len(times) // 2] * 1000
+
+    baseline = measure([sys.executable, '-c', 'pass'])
+    print("="*80)
+    print(f"🚀 COLD START ('<command> --help', median of {repeat})")
+    print("="*80)
+    print(f"  {'python -c pass':<20} {baseline:>7.0f} ms")
+    for command in COMMANDS:
+        total = measure([sys.executable, str(SCRIPTS_DIR), command, '--help'])
+        print(f"  {command:<20} {total:>7.0f} ms   (+{total - baseline:.0f} ms over the interpreter)")
+    print("="*80)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print_usage()
+        return 0
+    command, args = argv[0], argv[1:]
+    if command == 'startup-time':
+        startup_time()
+        return 0
+    if command not in COMMANDS:
+        sys.stderr.write(f"{PROG}: unknown command '{command}'\n\n")
+        print_usage(sys.stderr)
+        return 2
+
+    # The scripts import their siblings as top-level modules
+    sys.path.insert(0, str(SCRIPTS_DIR))
+    run_command(command, args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,428 @@
+"""
+Agreement Analysis
+==================
+
+Purpose:
+    Compute inter-model agreement and accuracy from predictions files.
+    Predictions are loaded once into a compact samples × models int8 label
+    matrix (see labels.py); every metric is then computed with NumPy on
+    that matrix instead of set comprehensions over dicts:
+
+    - validity rate per model
+    - pairwise Cohen's kappa and confusion matrices
+    - Fleiss' kappa over records where every model gave a valid label
+    - conflict rate (records where the models do not all agree)
+    - accuracy against ground truth, overall / per source / per language
+
+    Ground truth comes from the Yaksh 'ground_truth_label' field in the
+    sample records and the 'Ground_Truth' column of the manual testing CSV
+    (the CSV wins when both are filled).
+
+Input:
+    - outputs/predictions/*.json (default: predictions_300_final.json), or
+      binary stores written by predictions_store.py (*.preds)
+    - data/sample_1000.json
+    - outputs/manual_testing/manual_testing_200_samples.csv
+
+Output:
+    - outputs/analysis/agreement_metrics.json
+
+Usage:
+    python scripts/analyze_results.py
+    python scripts/analyze_results.py outputs/predictions/predictions_200_final.json outputs/predictions/predictions_300_final.json
+    python scripts/analyze_results.py outputs/predictions/predictions_300_final.preds
+    python scripts/analyze_results.py --benchmark
+    python scripts/analyze_results.py --profile --profile-cpu
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import argparse
+import csv
+import json
+import math
+import time
+from pathlib import Path
+
+import numpy as np
+
+from jsonl_io import iter_records, resolve_data_file
+from labels import CATEGORY_CODES, MISSING, NUM_CATEGORIES, encode_labels, normalize_code
+from profiling import NULL_PROFILER, Profiler, add_profile_arguments
+
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_FILES = [PROJECT_ROOT / 'outputs' / 'predictions' / 'predictions_300_final.json']
+SAMPLE_FILE = PROJECT_ROOT / 'data' / 'sample_1000.json'
+MANUAL_CSV = PROJECT_ROOT / 'outputs' / 'manual_testing' / 'manual_testing_200_samples.csv'
+OUTPUT_FILE = PROJECT_ROOT / 'outputs' / 'analysis' / 'agreement_metrics.json'
+
+META_COLUMNS = {'unified_id', 'source_dataset', 'language', 'timestamp'}
+
+
+class LabelMatrix:
+    """Predictions as arrays: one row per record, one column per model"""
+
+    def __init__(self, ids, models, labels, sources, languages):
+        self.ids = np.asarray(ids, dtype=object)
+        self.models = list(models)
+        self.labels = labels                       # (n, m) int8, MISSING = -1
+        self.source_names, self.source_codes = np.unique(
+            np.asarray(sources, dtype=str), return_inverse=True)
+        self.language_names, self.language_codes = np.unique(
+            np.asarray(languages, dtype=str), return_inverse=True)
+
+    @classmethod
+    def from_codes(cls, ids, models, labels, source_names, source_codes, language_names, language_codes):
+        """Build from already-encoded columns (no np.unique over the records)"""
+        matrix = cls.__new__(cls)
+        matrix.ids = ids
+        matrix.models = list(models)
+        matrix.labels = labels
+        matrix.source_names, matrix.source_codes = np.asarray(source_names, dtype=str), source_codes
+        matrix.language_names, matrix.language_codes = np.asarray(language_names, dtype=str), language_codes
+        return matrix
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def is_model_column(column):
+    """Model columns are everything that is not metadata or a side field"""
+    return (column not in META_COLUMNS
+            and not column.endswith('_confidence')
+            and not column.startswith('cascade_'))
+
+
+def cell_value(cell):
+    """Prediction stored in a cell (plain string or {'prediction': ...})"""
+    if isinstance(cell, dict):
+        return cell.get('prediction')
+    return cell
+
+
+def load_prediction_rows(files):
+    """Read predictions files and merge rows by unified_id (first seen order)"""
+    from predictions_store import load_predictions
+
+    merged = {}
+    for path in files:
+        for row in load_predictions(path):
+            merged.setdefault(row['unified_id'], {}).update(row)
+    return list(merged.values())
+
+
+def build_label_matrix(rows, models=None):
+    """
+    Turn prediction rows into a LabelMatrix.
+
+    Args:
+        rows (list): Prediction dicts
+        models (list): Model columns to keep (default: all model columns seen)
+
+    Returns:
+        LabelMatrix
+    """
+    if models is None:
+        models = []
+        for row in rows:
+            for column in row:
+                if is_model_column(column) and column not in models:
+                    models.append(column)
+
+    labels = np.full((len(rows), len(models)), MISSING, dtype=np.int8)
+    for j, model in enumerate(models):
+        labels[:, j] = encode_labels([cell_value(row.get(model)) for row in rows])
+
+    return LabelMatrix(
+        [row['unified_id'] for row in rows],
+        models,
+        labels,
+        [row.get('source_dataset') or 'Unknown' for row in rows],
+        [row.get('language') or 'Unknown' for row in rows]
+    )
+
+
+def load_ground_truth(ids, sample_file=SAMPLE_FILE, manual_csv=MANUAL_CSV):
+    """int8 ground-truth codes aligned with ids (MISSING where unknown)"""
+    truth = {}
+    sample_file = resolve_data_file(sample_file)
+    if sample_file.exists():
+        for record in iter_records(sample_file):
+            if record.get('ground_truth_label'):
+                truth[record['unified_id']] = record['ground_truth_label']
+
+    if Path(manual_csv).exists():
+        with open(manual_csv, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                if normalize_code(row.get('Ground_Truth')):
+                    truth[row['Unified_ID']] = normalize_code(row['Ground_Truth'])
+
+    return encode_labels([truth.get(uid) for uid in ids])
+
+
+# ========================================
+# Metrics (all vectorized over records)
+# ========================================
+
+def confusion_matrix(a, b):
+    """K × K counts of (a label, b label) over records where both are valid"""
+    mask = (a >= 0) & (b >= 0)
+    pairs = a[mask].astype(np.int64) * NUM_CATEGORIES + b[mask]
+    return np.bincount(pairs, minlength=NUM_CATEGORIES ** 2).reshape(NUM_CATEGORIES, NUM_CATEGORIES)
+
+
+def kappa_from_confusion(cm):
+    """Cohen's kappa from a confusion matrix (nan if undefined)"""
+    n = cm.sum()
+    if n == 0:
+        return float('nan')
+    observed = np.trace(cm) / n
+    expected = float(cm.sum(axis=1) @ cm.sum(axis=0)) / n ** 2
+    if expected == 1:
+        return 1.0 if observed == 1 else float('nan')
+    return float((observed - expected) / (1 - expected))
+
+
+def pairwise_cohen_kappa(labels):
+    """
+    Cohen's kappa and confusion matrix for every model pair.
+
+    Returns:
+        tuple: (m × m kappa array, {(i, j): confusion matrix})
+    """
+    m = labels.shape[1]
+    kappa = np.eye(m)
+    confusions = {}
+    for i in range(m):
+        for j in range(i + 1, m):
+            cm = confusion_matrix(labels[:, i], labels[:, j])
+            confusions[(i, j)] = cm
+            kappa[i, j] = kappa[j, i] = kappa_from_confusion(cm)
+    return kappa, confusions
+
+
+def category_counts(labels):
+    """(n, K) number of models choosing each category per record"""
+    n = labels.shape[0]
+    valid = labels >= 0
+    flat = (np.arange(n)[:, None] * NUM_CATEGORIES + labels)[valid]
+    return np.bincount(flat, minlength=n * NUM_CATEGORIES).reshape(n, NUM_CATEGORIES)
+
+
+def fleiss_kappa(labels):
+    """Fleiss' kappa over records where every model gave a valid label"""
+    complete = labels[(labels >= 0).all(axis=1)]
+    n, m = complete.shape
+    if n == 0 or m < 2:
+        return float('nan')
+
+    counts = category_counts(complete)
+    p_j = counts.sum(axis=0) / (n * m)
+    p_i = (counts * (counts - 1)).sum(axis=1) / (m * (m - 1))
+    expected = float((p_j ** 2).sum())
+    if expected == 1:
+        return 1.0
+    return float((p_i.mean() - expected) / (1 - expected))
+
+
+def conflict_stats(labels):
+    """Records with all models valid, and how many of those disagree"""
+    complete_mask = (labels >= 0).all(axis=1)
+    distinct = (category_counts(labels[complete_mask]) > 0).sum(axis=1)
+    return int(complete_mask.sum()), int((distinct > 1).sum())
+
+
+def accuracy_by_group(labels, truth, group_codes, n_groups):
+    """
+    Per-group, per-model accuracy against ground truth.
+
+    Invalid predictions count as wrong; records without ground truth are
+    ignored.
+
+    Returns:
+        tuple: (correct counts, totals), both (n_groups, m)
+    """
+    m = labels.shape[1]
+    has_truth = truth >= 0
+    correct = (labels == truth[:, None]) & has_truth[:, None]
+    cell_group = group_codes[:, None].astype(np.int64) * m + np.arange(m)
+
+    size = n_groups * m
+    totals = np.bincount(cell_group[has_truth].ravel(), minlength=size).reshape(n_groups, m)
+    hits = np.bincount(cell_group.ravel(), weights=correct.ravel(), minlength=size).reshape(n_groups, m)
+    return hits.astype(np.int64), totals
+
+
+def nan_to_none(value):
+    """Copy of nested metrics with NaN floats replaced by None (NaN is not valid JSON)"""
+    if isinstance(value, dict):
+        return {k: nan_to_none(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [nan_to_none(v) for v in value]
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def compute_metrics(matrix, truth=None):
+    """
+    All agreement/accuracy metrics for a LabelMatrix.
+
+    Args:
+        matrix (LabelMatrix): Predictions
+        truth (np.ndarray): Optional int8 ground truth aligned with matrix.ids
+
+    Returns:
+        dict: Metrics; an undefined kappa is NaN (nan_to_none() before saving)
+    """
+    labels = matrix.labels
+    models = matrix.models
+    n = len(matrix)
+
+    kappa, confusions = pairwise_cohen_kappa(labels)
+    complete, conflicts = conflict_stats(labels)
+
+    metrics = {
+        'records': n,
+        'models': models,
+        'categories': CATEGORY_CODES,
+        'validity': {m: float((labels[:, j] >= 0).mean()) if n else 0.0 for j, m in enumerate(models)},
+        'pairwise_kappa': {
+            f"{models[i]}|{models[j]}": kappa[i, j] for i, j in confusions
+        },
+        'confusion_matrices': {
+            f"{models[i]}|{models[j]}": cm.tolist() for (i, j), cm in confusions.items()
+        },
+        'fleiss_kappa': fleiss_kappa(labels),
+        'all_valid_records': complete,
+        'conflicts': conflicts,
+        'conflict_rate': conflicts / complete if complete else 0.0
+    }
+
+    if truth is not None and (truth >= 0).any():
+        groupings = {
+            'overall': (np.zeros(n, dtype=np.int64), np.array(['All'])),
+            'by_source': (matrix.source_codes, matrix.source_names),
+            'by_language': (matrix.language_codes, matrix.language_names)
+        }
+        accuracy = {'records_with_truth': int((truth >= 0).sum())}
+        for name, (codes, names) in groupings.items():
+            hits, totals = accuracy_by_group(labels, truth, codes, len(names))
+            accuracy[name] = {
+                str(group): {
+                    m: {'correct': int(hits[g, j]), 'total': int(totals[g, j]),
+                        'accuracy': float(hits[g, j] / totals[g, j]) if totals[g, j] else None}
+                    for j, m in enumerate(models)
+                }
+                for g, group in enumerate(names)
+            }
+        metrics['accuracy'] = accuracy
+
+    return metrics
+
+
+def print_report(metrics):
+    """Print the main numbers"""
+    models = metrics['models']
+
+    print("="*80)
+    print("AGREEMENT ANALYSIS")
+    print("="*80)
+    print(f"\nRecords: {metrics['records']} | Models: {', '.join(models)}")
+
+    print("\n" + "-"*80)
+    print("VALIDITY:")
+    print("-"*80)
+    for model, rate in metrics['validity'].items():
+        print(f"  {model:<15} {rate*100:>6.1f}%")
+
+    print("\n" + "-"*80)
+    print("PAIRWISE COHEN'S KAPPA:")
+    print("-"*80)
+    for pair, kappa in metrics['pairwise_kappa'].items():
+        print(f"  {pair.replace('|', ' vs '):<35} {kappa:>6.3f}")
+
+    print(f"\nFleiss' kappa (all valid): {metrics['fleiss_kappa']:.3f}")
+    print(f"All models valid:          {metrics['all_valid_records']}")
+    print(f"Conflicts:                 {metrics['conflicts']} ({metrics['conflict_rate']*100:.1f}%)")
+
+    if 'accuracy' in metrics:
+        accuracy = metrics['accuracy']
+        print("\n" + "-"*80)
+        print(f"ACCURACY vs GROUND TRUTH ({accuracy['records_with_truth']} labelled records):")
+        print("-"*80)
+        for grouping in ('overall', 'by_source', 'by_language'):
+            for group, per_model in accuracy[grouping].items():
+                cells = [f"{m}={s['accuracy']*100:.0f}%" for m, s in per_model.items()
+                         if s['accuracy'] is not None]
+                if cells:
+                    print(f"  {group:<12} {'  '.join(cells)}")
+    print("="*80)
+
+
+def benchmark(n=148_746, m=6, seed=42):
+    """Time compute_metrics() on a random matrix the size of the full corpus"""
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, NUM_CATEGORIES, size=(n, m), dtype=np.int8)
+    labels[rng.random((n, m)) < 0.1] = MISSING
+    matrix = LabelMatrix(
+        np.arange(n).astype(str), [f"model_{j}" for j in range(m)], labels,
+        rng.choice(['Yaksh', 'Codeforces', 'SPOC', 'PyPal', 'DeepFix'], n),
+        rng.choice(['Python', 'C++', 'C'], n)
+    )
+    truth = rng.integers(-1, NUM_CATEGORIES, size=n, dtype=np.int8)
+
+    start = time.perf_counter()
+    compute_metrics(matrix, truth)
+    elapsed = time.perf_counter() - start
+    print(f"⏱️  Full metrics for {n:,} × {m} predictions: {elapsed*1000:.0f} ms")
+    return elapsed
+
+
+def analyze_results(files=None, output_file=OUTPUT_FILE, profiler=NULL_PROFILER):
+    """Load predictions, compute metrics, print and save them"""
+    files = [Path(f) for f in (files or DEFAULT_FILES)]
+    from predictions_store import PredictionsStore, is_store
+
+    if len(files) == 1 and is_store(files[0]):
+        # Binary store: the label matrix is memory-mapped, no rows to build
+        with profiler.stage("load"):
+            matrix = PredictionsStore.open(files[0]).to_label_matrix()
+        with profiler.stage("build label matrix"):
+            truth = load_ground_truth(matrix.ids)
+    else:
+        with profiler.stage("load"):
+            rows = load_prediction_rows(files)
+        with profiler.stage("build label matrix"):
+            matrix = build_label_matrix(rows)
+            truth = load_ground_truth(matrix.ids)
+
+    with profiler.stage("analyze"):
+        metrics = compute_metrics(matrix, truth)
+    metrics['files'] = [str(f) for f in files]
+    print_report(metrics)
+
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with profiler.stage("export JSON"), open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(nan_to_none(metrics), f, indent=2, allow_nan=False)
+    print(f"💾 Metrics saved to: {output_file}")
+    return metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inter-model agreement analysis")
+    parser.add_argument('files', nargs='*', type=Path, help="Predictions files (default: 300 run)")
+    parser.add_argument('--output', type=Path, default=OUTPUT_FILE)
+    parser.add_argument('--benchmark', action='store_true', help="Time metrics on a corpus-sized random matrix")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+    else:
+        profiler = Profiler.from_args('analyze_results', args)
+        analyze_results(args.files, args.output, profiler)
+        profiler.report()
@@ -0,0 +1,208 @@
+"""
+Backfill a Model Column
+=======================
+
+Purpose:
+    Add a new model column to an existing predictions file, or replace one,
+    without re-running the other models. This is the general version of
+    replace_llama_with_gptoss.py:
+
+    - any model from config/models.json, written to any column name
+    - requests run in parallel through llm_clients.request_concurrently,
+      with the response cache and circuit breakers in front of them
+    - every answer is appended to a checkpoint file, so an interrupted run
+      resumes where it stopped; the checkpoint is removed once the
+      predictions file has been written
+
+    By default only rows that do not have the column yet are requested.
+    Use --replace to overwrite the column everywhere.
+
+Usage:
+    python scripts/backfill_predictions.py outputs/predictions/predictions_200_final.json --model gpt_neox
+    python scripts/backfill_predictions.py outputs/predictions/predictions_300_final.json --model deepseek --column deepseek_r1
+    python scripts/backfill_predictions.py outputs/predictions/predictions_200_final.json --model llama --replace --output outputs/predictions/predictions_200_llama_v2.json
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from circuit_breaker import BreakerRegistry
+from cost_accounting import BUDGET_EXHAUSTED, CostTracker, add_budget_arguments
+from jsonl_io import iter_records, resolve_data_file
+from length_scheduling import add_schedule_argument
+from llm_clients import REQUEST_FLIGHTS, VALID_CODES, load_config, load_model_registry, request_concurrently
+from prompt_template import add_compact_argument, enable_compaction
+from repair_predictions import create_prompt, save_predictions, set_cell_value
+from request_trace import TraceRecorder
+from response_cache import ResponseCache
+from scan_data_quality import filter_excluded
+from telemetry import Telemetry
+
+
+DEFAULT_DATA = Path(__file__).parent.parent / 'data' / 'sample_1000.json'
+
+
+def load_checkpoint(checkpoint_file):
+    """unified_id -> prediction from a previous, interrupted run"""
+    done = {}
+    if checkpoint_file.exists():
+        with open(checkpoint_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entry = json.loads(line)
+                    done[entry['unified_id']] = entry['prediction']
+    return done
+
+
+def backfill_column(predictions_file, model_key, column=None, replace=False, output_file=None,
+                    data_file=DEFAULT_DATA, max_workers=4, use_cache=True, trace=False,
+                    max_tokens=None, max_cost=None, schedule='fifo'):
+    """
+    Fill one model column of a predictions file.
+
+    Args:
+        predictions_file (Path): Existing predictions JSON
+        model_key (str): Model key from config/models.json
+        column (str): Column to write (defaults to model_key)
+        replace (bool): Re-request rows that already have the column
+        output_file (Path): Where to write (defaults to predictions_file)
+        data_file (Path): Dataset holding the records (sample or unified)
+        max_workers (int): Parallel requests
+        use_cache (bool): Use the shared response cache
+        trace (bool): Write a Chrome/Perfetto trace of the requests
+        max_tokens (int): Optional token budget; unsent rows stay in the
+            to-do list for the next run
+        max_cost (float): Optional cost budget
+        schedule (str): Request order ('fifo', 'longest' or 'buckets')
+
+    Returns:
+        dict: Counts of requested, valid and failed cells
+    """
+    predictions_file = Path(predictions_file)
+    output_file = Path(output_file or predictions_file)
+    column = column or model_key
+    checkpoint_file = output_file.with_name(f"{output_file.stem}.backfill_{column}.jsonl")
+
+    print("="*80)
+    print(f"➕ BACKFILL COLUMN '{column}' WITH {model_key.upper()}")
+    print("="*80)
+    print()
+
+    models, _ = load_model_registry()
+    if model_key not in models:
+        print(f"❌ Unknown model '{model_key}'. Known: {', '.join(models)}")
+        return None
+
+    with open(predictions_file, 'r', encoding='utf-8') as f:
+        rows = json.load(f)
+
+    done = load_checkpoint(checkpoint_file)
+    todo = filter_excluded([row for row in rows
+                            if (replace or column not in row) and row['unified_id'] not in done])
+
+    print(f"📂 {predictions_file.name}: {len(rows)} records")
+    print(f"♻️  From checkpoint: {len(done)}")
+    print(f"🔁 To request: {len(todo)}")
+    print()
+
+    # Only keep the records this run needs
+    needed_ids = {row['unified_id'] for row in todo}
+    records = {}
+    if needed_ids:
+        data_file = resolve_data_file(data_file)
+        records = {r['unified_id']: r for r in iter_records(data_file) if r['unified_id'] in needed_ids}
+        missing = needed_ids - set(records)
+        if missing:
+            print(f"⚠️  {len(missing)} records not found in {Path(data_file).name}; left unchanged")
+
+    config = load_config()
+    breakers = BreakerRegistry(failure_threshold=3, cooldown=300)
+    cache = ResponseCache() if use_cache else None
+    telemetry = Telemetry() if trace else None
+    tracer = TraceRecorder(f'backfill_{column}') if trace else None
+    costs = CostTracker.from_registry(models, max_tokens, max_cost)
+    skipped = 0
+    tasks = [(uid, model_key, create_prompt(record),
+              {'source': record.get('source_dataset'), 'language': record.get('language')})
+             for uid, record in records.items()]
+
+    with open(checkpoint_file, 'a', encoding='utf-8') as checkpoint:
+        for n, (uid, result) in enumerate(request_concurrently(
+                tasks, config, models, max_workers, breakers=breakers, cache=cache,
+                telemetry=telemetry, tracer=tracer, costs=costs, schedule=schedule), 1):
+            if result['prediction'] == BUDGET_EXHAUSTED:
+                skipped += 1
+                continue
+            done[uid] = result['prediction']
+            checkpoint.write(json.dumps({'unified_id': uid, 'prediction': result['prediction']}) + "\n")
+            checkpoint.flush()
+            mark = "✓" if result['prediction'] in VALID_CODES else "✗"
+            print(f"[{n}/{len(tasks)}] {uid}: {mark} {result['prediction']}", flush=True)
+
+    # Merge into the rows (keeping nested {'prediction': ...} cells nested)
+    for row in rows:
+        uid = row['unified_id']
+        if uid not in done:
+            continue
+        if column in row:
+            set_cell_value(row, column, done[uid])
+        else:
+            row[column] = done[uid]
+
+    save_predictions(output_file, rows)
+    if skipped:
+        print(f"💰 Budget reached: {skipped} rows not requested (checkpoint kept)")
+    else:
+        checkpoint_file.unlink()
+
+    filled = [row.get(column) for row in rows if column in row]
+    valid = sum(1 for cell in filled
+                if (cell.get('prediction') if isinstance(cell, dict) else cell) in VALID_CODES)
+    stats = {'requested': len(tasks), 'filled': len(filled), 'valid': valid,
+             'failed': len(filled) - valid}
+
+    print("\n" + "="*80)
+    print("📊 BACKFILL SUMMARY")
+    print("="*80)
+    print(f"Requested:   {stats['requested']}")
+    if cache is not None:
+        print(f"Cache hits:  {cache.hits}")
+    print(f"Column rows: {stats['filled']}/{len(rows)}")
+    print(f"Valid:       {valid} ({valid / len(filled) * 100 if filled else 0:.1f}%)")
+    print(f"✅ SAVED: {output_file}")
+    costs.print_summary()
+    breakers.print_summary()
+    REQUEST_FLIGHTS.print_summary()
+    if trace:
+        tracer.save(output_file.with_name(f"{output_file.stem}.trace_{column}.json"), telemetry)
+    print("="*80)
+
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add or replace one model column")
+    parser.add_argument('predictions_file', type=Path)
+    parser.add_argument('--model', required=True, help="Model key from config/models.json")
+    parser.add_argument('--column', default=None, help="Column name (default: model key)")
+    parser.add_argument('--replace', action='store_true', help="Overwrite rows that already have the column")
+    parser.add_argument('--output', type=Path, default=None, help="Output file (default: in place)")
+    parser.add_argument('--data', type=Path, default=DEFAULT_DATA, help="Dataset with the records")
+    parser.add_argument('--workers', type=int, default=4, help="Parallel requests")
+    parser.add_argument('--no-cache', action='store_true', help="Skip the response cache")
+    parser.add_argument('--trace', action='store_true', help="Write a Chrome/Perfetto request trace")
+    add_budget_arguments(parser)
+    add_schedule_argument(parser)
+    add_compact_argument(parser)
+    args = parser.parse_args()
+    if args.compact:
+        enable_compaction()
+
+    backfill_column(args.predictions_file, args.model, args.column, args.replace, args.output,
+                    args.data, args.workers, not args.no_cache, args.trace,
+                    args.max_tokens, args.max_cost, args.schedule)
@@ -0,0 +1,279 @@
+"""
+Bootstrap Confidence Intervals
+==============================
+
+Purpose:
+    Put confidence intervals on the agreement numbers instead of reporting
+    point estimates from 50-300 samples. Records are resampled with
+    replacement; a whole batch of replicates is represented as a
+    (replicates × records) matrix of resample counts, so each statistic is
+    a weighted sum (one matrix product) over all replicates at once.
+    Batches are spread over CPU cores.
+
+    Statistics (overall and per source_dataset):
+    - accuracy per model against ground truth
+    - pairwise Cohen's kappa
+    - Fleiss' kappa
+    - conflict rate
+
+Input:
+    Same predictions files and ground truth as analyze_results.py
+
+Output:
+    - outputs/analysis/bootstrap_ci.json
+
+Usage:
+    python scripts/bootstrap_ci.py
+    python scripts/bootstrap_ci.py outputs/predictions/predictions_300_final.json --replicates 10000
+    python scripts/bootstrap_ci.py --benchmark
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from analyze_results import (DEFAULT_FILES, LabelMatrix, build_label_matrix, category_counts,
+                             load_ground_truth, load_prediction_rows)
+from labels import MISSING, NUM_CATEGORIES
+
+
+OUTPUT_FILE = Path(__file__).parent.parent / 'outputs' / 'analysis' / 'bootstrap_ci.json'
+
+# Upper bound on replicates × records per weight matrix (float64 -> ~40 MB)
+MAX_WEIGHT_CELLS = 5_000_000
+
+
+def prepare_arrays(labels, truth):
+    """Per-record quantities every replicate statistic is a weighted sum of"""
+    n, m = labels.shape
+    complete = (labels >= 0).all(axis=1)
+    counts = category_counts(labels) * complete[:, None]
+    distinct = (counts > 0).sum(axis=1)
+
+    arrays = {
+        'complete': complete.astype(np.float64),
+        'conflict': (complete & (distinct > 1)).astype(np.float64),
+        'fleiss_counts': counts.astype(np.float64),
+        'fleiss_agreement': ((counts * (counts - 1)).sum(axis=1) / (m * (m - 1))
+                             if m > 1 else np.zeros(n)),
+        'n_models': m,
+        'pairs': []
+    }
+
+    # Pair cells sorted by confusion cell, so a replicate's confusion matrix
+    # is a reduceat over contiguous column blocks of the weight matrix
+    for i in range(m):
+        for j in range(i + 1, m):
+            a, b = labels[:, i], labels[:, j]
+            rows = np.flatnonzero((a >= 0) & (b >= 0))
+            cells = a[rows].astype(np.int64) * NUM_CATEGORIES + b[rows]
+            order = np.argsort(cells, kind='stable')
+            rows, cells = rows[order], cells[order]
+            starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]]) if len(cells) else cells
+            arrays['pairs'].append((i, j, rows, starts, cells[starts] if len(cells) else cells))
+
+    if truth is not None and (truth >= 0).any():
+        has_truth = truth >= 0
+        arrays['has_truth'] = has_truth.astype(np.float64)
+        arrays['correct'] = ((labels == truth[:, None]) & has_truth[:, None]).astype(np.float64)
+    return arrays
+
+
+def resample_weights(rng, replicates, n):
+    """(replicates, n) counts of how often each record is drawn"""
+    idx = rng.integers(0, n, size=(replicates, n))
+    offsets = (np.arange(replicates) * n)[:, None]
+    return np.bincount((idx + offsets).ravel(), minlength=replicates * n).reshape(replicates, n).astype(np.float64)
+
+
+def _safe_divide(num, den):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(den > 0, num / np.where(den > 0, den, 1), np.nan)
+
+
+def replicate_statistics(weights, arrays):
+    """All statistics for a batch of replicates (one row per replicate)"""
+    complete = weights @ arrays['complete']
+    stats = {'conflict_rate': _safe_divide(weights @ arrays['conflict'], complete)}
+
+    # Fleiss' kappa
+    m = arrays['n_models']
+    p_bar = _safe_divide(weights @ arrays['fleiss_agreement'], complete)
+    p_j = _safe_divide(weights @ arrays['fleiss_counts'], (complete * m)[:, None])
+    expected = (p_j ** 2).sum(axis=1)
+    stats['fleiss_kappa'] = _safe_divide(p_bar - expected, 1 - expected)
+
+    # Pairwise Cohen's kappa
+    kappas = []
+    for _, _, rows, starts, cells in arrays['pairs']:
+        cm = np.zeros((weights.shape[0], NUM_CATEGORIES ** 2))
+        if len(rows):
+            cm[:, cells] = np.add.reduceat(weights[:, rows], starts, axis=1)
+        cm = cm.reshape(-1, NUM_CATEGORIES, NUM_CATEGORIES)
+        total = cm.sum(axis=(1, 2))
+        observed = _safe_divide(np.trace(cm, axis1=1, axis2=2), total)
+        expected = _safe_divide((cm.sum(axis=2) * cm.sum(axis=1)).sum(axis=1), total ** 2)
+        kappas.append(_safe_divide(observed - expected, 1 - expected))
+    stats['pairwise_kappa'] = np.stack(kappas, axis=1) if kappas else np.empty((weights.shape[0], 0))
+
+    if 'correct' in arrays:
+        stats['accuracy'] = _safe_divide(weights @ arrays['correct'],
+                                         (weights @ arrays['has_truth'])[:, None])
+    return stats
+
+
+def run_batch(arrays, n, replicates, seed):
+    """Worker entry point: one batch of replicates"""
+    rng = np.random.default_rng(seed)
+    return replicate_statistics(resample_weights(rng, replicates, n), arrays)
+
+
+def summarize(stats, models, confidence):
+    """Percentile intervals from replicate statistics"""
+    alpha = (1 - confidence) / 2 * 100
+    pair_names = [f"{models[i]}|{models[j]}" for i in range(len(models)) for j in range(i + 1, len(models))]
+
+    def interval(values):
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return None
+        low, mid, high = np.percentile(values, [alpha, 50, 100 - alpha])
+        return {'low': float(low), 'median': float(mid), 'high': float(high)}
+
+    summary = {
+        'conflict_rate': interval(stats['conflict_rate']),
+        'fleiss_kappa': interval(stats['fleiss_kappa']),
+        'pairwise_kappa': {name: interval(stats['pairwise_kappa'][:, k]) for k, name in enumerate(pair_names)}
+    }
+    if 'accuracy' in stats:
+        summary['accuracy'] = {m: interval(stats['accuracy'][:, j]) for j, m in enumerate(models)}
+    return summary
+
+
+def bootstrap_matrix(matrix, truth=None, replicates=10_000, batch_size=500, workers=None,
+                     confidence=0.95, seed=42):
+    """
+    Bootstrap CIs overall and per source_dataset.
+
+    Args:
+        matrix (LabelMatrix): Predictions
+        truth (np.ndarray): Optional ground truth aligned with matrix.ids
+        replicates (int): Bootstrap replicates per group
+        batch_size (int): Replicates per task (reduced automatically for
+            large record counts to bound memory)
+        workers (int): Processes (default: all cores)
+        confidence (float): Interval coverage
+
+    Returns:
+        dict: {'overall': {...}, 'by_source': {source: {...}}}
+    """
+    groups = {'overall': np.arange(len(matrix))}
+    for code, name in enumerate(matrix.source_names):
+        groups[str(name)] = np.flatnonzero(matrix.source_codes == code)
+
+    root_seed = np.random.SeedSequence(seed)
+    jobs = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for name, rows in groups.items():
+            n = len(rows)
+            if n == 0:
+                continue
+            arrays = prepare_arrays(matrix.labels[rows], truth[rows] if truth is not None else None)
+            per_batch = max(1, min(batch_size, MAX_WEIGHT_CELLS // n))
+            remaining = replicates
+            while remaining > 0:
+                size = min(per_batch, remaining)
+                jobs.append((name, executor.submit(run_batch, arrays, n, size, root_seed.spawn(1)[0])))
+                remaining -= size
+
+        collected = {}
+        for name, future in jobs:
+            collected.setdefault(name, []).append(future.result())
+
+    results = {'replicates': replicates, 'confidence': confidence, 'by_source': {}}
+    for name, batches in collected.items():
+        stats = {key: np.concatenate([b[key] for b in batches]) for key in batches[0]}
+        summary = summarize(stats, matrix.models, confidence)
+        summary['records'] = int(len(groups[name]))
+        if name == 'overall':
+            results['overall'] = summary
+        else:
+            results['by_source'][name] = summary
+    return results
+
+
+def print_report(results):
+    """Print the intervals"""
+    fmt = lambda ci: f"{ci['median']:.3f} [{ci['low']:.3f}, {ci['high']:.3f}]" if ci else "n/a"
+    pct = int(results['confidence'] * 100)
+
+    print("="*80)
+    print(f"BOOTSTRAP {pct}% CONFIDENCE INTERVALS ({results['replicates']:,} replicates)")
+    print("="*80)
+
+    sections = [('OVERALL', results.get('overall'))]
+    sections += [(name.upper(), s) for name, s in results['by_source'].items()]
+    for title, summary in sections:
+        if not summary:
+            continue
+        print("\n" + "-"*80)
+        print(f"{title} ({summary['records']} records)")
+        print("-"*80)
+        print(f"  {'Conflict rate':<30} {fmt(summary['conflict_rate'])}")
+        print(f"  {'Fleiss kappa':<30} {fmt(summary['fleiss_kappa'])}")
+        for pair, ci in summary['pairwise_kappa'].items():
+            print(f"  {'kappa ' + pair.replace('|', ' vs '):<30} {fmt(ci)}")
+        for model, ci in summary.get('accuracy', {}).items():
+            print(f"  {'accuracy ' + model:<30} {fmt(ci)}")
+    print("="*80)
+
+
+def benchmark(n=300, m=6, replicates=10_000):
+    """Time 10K replicates over a random 6-model matrix"""
+    rng = np.random.default_rng(0)
+    labels = rng.integers(0, NUM_CATEGORIES, size=(n, m), dtype=np.int8)
+    labels[rng.random((n, m)) < 0.1] = MISSING
+    matrix = LabelMatrix(np.arange(n).astype(str), [f"model_{j}" for j in range(m)], labels,
+                         rng.choice(['Yaksh', 'Codeforces', 'SPOC', 'PyPal', 'DeepFix'], n),
+                         rng.choice(['Python', 'C++', 'C'], n))
+    truth = rng.integers(-1, NUM_CATEGORIES, size=n, dtype=np.int8)
+
+    start = time.perf_counter()
+    bootstrap_matrix(matrix, truth, replicates)
+    elapsed = time.perf_counter() - start
+    print(f"⏱️  {replicates:,} replicates × {n} records × {m} models (overall + 5 sources): {elapsed:.1f}s")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bootstrap CIs for agreement metrics")
+    parser.add_argument('files', nargs='*', type=Path, help="Predictions files (default: 300 run)")
+    parser.add_argument('--replicates', type=int, default=10_000)
+    parser.add_argument('--workers', type=int, default=None, help="Processes (default: all cores)")
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--output', type=Path, default=OUTPUT_FILE)
+    parser.add_argument('--benchmark', action='store_true', help="Time a random 6-model matrix")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(replicates=args.replicates)
+    else:
+        rows = load_prediction_rows(args.files or DEFAULT_FILES)
+        matrix = build_label_matrix(rows)
+        truth = load_ground_truth(matrix.ids)
+        results = bootstrap_matrix(matrix, truth, args.replicates, workers=args.workers,
+                                   confidence=args.confidence)
+        print_report(results)
+
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Intervals saved to: {args.output}")
@@ -16,6 +16,8 @@ Date: December 2024
 import json
 from pathlib import Path
 
+from jsonl_io import iter_records, resolve_data_file
+
 # File paths
 predictions_file = Path(__file__).parent.parent / 'outputs' / 'predictions' / 'predictions_200_final.json'
 sample_file = Path(__file__).parent.parent / 'data' / 'sample_1000.json'
@@ -25,8 +27,7 @@ with open(predictions_file, 'r', encoding='utf-8') as f:
     predictions = json.load(f)
 
 # Load original data with UTF-8 encoding
-with open(sample_file, 'r', encoding='utf-8') as f:
-    all_data = {r['unified_id']: r for r in json.load(f)}
+all_data = {r['unified_id']: r for r in iter_records(resolve_data_file(sample_file))}
 
 print("="*80)
 print("CHECKING FOR EMPTY BUGGY CODES")
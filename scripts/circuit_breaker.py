@@ -0,0 +1,140 @@
+"""
+Per-Provider Circuit Breaker
+============================
+
+Purpose:
+    Stop paying for dead endpoints. Once Gemini's quota is gone or an HF model
+    is down, every further call returns QUOTA_EXCEEDED / MODEL_NOT_AVAILABLE /
+    ERROR after a full timeout. A breaker per provider/model opens after a
+    few consecutive failures of that kind; while it is open calls are skipped
+    (returned as CIRCUIT_OPEN) so the runner can queue the record for later.
+    After a cooldown one half-open probe is let through: success closes the
+    breaker, another failure re-opens it.
+
+    PARSE_ERROR is an answer from a healthy model, so it counts as success.
+
+Usage:
+    breakers = BreakerRegistry(failure_threshold=3, cooldown=300)
+    result = breakers.call('gemini', lambda: predict_gemini(prompt, config))
+    if result == CIRCUIT_OPEN:
+        deferred.append(...)
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import threading
+import time
+
+
+CIRCUIT_OPEN = "CIRCUIT_OPEN"
+
+# Statuses that mean the endpoint itself is unhealthy
+TRIP_STATUSES = {'QUOTA_EXCEEDED', 'RATE_LIMITED', 'MODEL_NOT_AVAILABLE',
+                 'MODEL_LOADING', 'ERROR'}
+
+
+def result_status(result):
+    """Status string of a plain prediction or a result dict"""
+    if isinstance(result, dict):
+        result = result.get('prediction')
+    if isinstance(result, str) and result.startswith('ERROR'):
+        return 'ERROR'
+    return result
+
+
+class CircuitBreaker:
+    """closed -> open after N consecutive failures -> half_open after cooldown"""
+
+    def __init__(self, name, failure_threshold=3, cooldown=300):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+        self.skipped = 0
+        self.times_opened = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go out now (a half-open probe counts)"""
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.time() - self.opened_at >= self.cooldown:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            self.skipped += 1
+            return False
+
+    def record(self, result):
+        """Update state from a call result"""
+        failed = result_status(result) in TRIP_STATUSES
+        with self.lock:
+            self.probe_in_flight = False
+            if not failed:
+                self.state = 'closed'
+                self.consecutive_failures = 0
+                return
+
+            self.consecutive_failures += 1
+            if self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.times_opened += 1
+                self.state = 'open'
+                self.opened_at = time.time()
+
+    def seconds_until_probe(self):
+        """Seconds until the next half-open probe (0 if calls are allowed)"""
+        with self.lock:
+            if self.state != 'open':
+                return 0
+            return max(0.0, self.cooldown - (time.time() - self.opened_at))
+
+
+class BreakerRegistry:
+    """One CircuitBreaker per provider/model key, created on first use"""
+
+    def __init__(self, failure_threshold=3, cooldown=300):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.breakers = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.breakers:
+                self.breakers[key] = CircuitBreaker(key, self.failure_threshold, self.cooldown)
+            return self.breakers[key]
+
+    def call(self, key, fn):
+        """Run fn() through the key's breaker; CIRCUIT_OPEN if skipped"""
+        breaker = self.get(key)
+        if not breaker.allow():
+            return CIRCUIT_OPEN
+        try:
+            result = fn()
+        except BaseException:
+            # Counts as a failure and ends a half-open probe
+            breaker.record('ERROR')
+            raise
+        breaker.record(result)
+        return result
+
+    def seconds_until_probe(self, keys):
+        """Shortest wait until any of the keys can be tried again"""
+        waits = [self.get(key).seconds_until_probe() for key in keys]
+        return min(waits) if waits else 0
+
+    def print_summary(self):
+        """Print breaker state per provider/model"""
+        print("\n" + "-"*80)
+        print("CIRCUIT BREAKERS:")
+        print("-"*80)
+        for key, breaker in self.breakers.items():
+            print(f"  {key:<45} {breaker.state:<10} opened {breaker.times_opened}x, "
+                  f"skipped {breaker.skipped} calls")
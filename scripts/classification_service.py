@@ -0,0 +1,449 @@
+"""
+Classification Service
+======================
+
+Purpose:
+    Long-running local HTTP service that classifies one submission at a
+    time, instead of running a whole batch script. Everything that batch
+    runs pay for on startup stays warm across requests: the model registry,
+    API keys, taxonomy / prompt template, the response cache, and the
+    provider connections (llm_clients keeps one HTTP session per thread and
+    one Gemini client).
+
+    Concurrent requests are grouped per model into micro-batches. A batch
+    is dispatched when it is full (--max-batch) or when its oldest request
+    has waited --max-wait-ms. Inside a batch, identical prompts are sent
+    once, cache lookups are done together, and at most --per-model calls
+    per model are in flight. The wait adapts to the latency SLO: it is
+    halved while the recent p95 is over --slo-ms and grows back while
+    there is headroom.
+
+    The providers have no batch endpoint, so a micro-batch is still one
+    call per distinct prompt; what batching buys is bounded concurrency
+    per provider and coalesced duplicates under bursts.
+
+Endpoints:
+    POST /classify   {"record": {unified-schema record}, "models": ["qwen", ...]}
+                     -> {"unified_id", "predictions": {model: code}, "results": {...}}
+    GET  /metrics    throughput, latency percentiles, batch sizes, cache hits
+    GET  /health
+
+Usage:
+    python scripts/classification_service.py --models qwen llama
+    python scripts/classification_service.py --stub --port 8765
+    python scripts/classification_service.py --stub --load-test 500
+
+    curl -s localhost:8765/classify -d '{"record": {"language": "Python", "buggy_code": "..."}}'
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from hedging import percentile
+from llm_clients import REQUEST_FLIGHTS, VALID_CODES, load_config, load_model_registry, request_prediction
+from prompt_template import add_compact_argument, create_classification_prompt, enable_compaction, load_taxonomy
+from response_cache import ResponseCache
+
+
+DEFAULT_PORT = 8765
+LATENCY_WINDOW = 500
+
+
+# ========================================
+# Backends
+# ========================================
+
+class ProviderBackend:
+    """Real provider calls through llm_clients.request_prediction"""
+
+    def __init__(self, config, models):
+        self.config = config
+        self.models = models
+
+    def model_name(self, model_key):
+        return self.models[model_key]['model']
+
+    def __call__(self, model_key, prompt):
+        return request_prediction(model_key, prompt, self.config, self.models)
+
+
+class StubBackend:
+    """Local stand-in: deterministic code per (model, prompt) after a simulated delay"""
+
+    def __init__(self, models, base_latency=0.05, per_kchar=0.01):
+        self.models = models
+        self.base_latency = base_latency
+        self.per_kchar = per_kchar
+
+    def model_name(self, model_key):
+        return f"stub/{model_key}"
+
+    def __call__(self, model_key, prompt):
+        time.sleep(self.base_latency + len(prompt) / 1000 * self.per_kchar)
+        digest = hashlib.sha1(f"{model_key}\n{prompt}".encode('utf-8')).digest()
+        code = VALID_CODES[digest[0] % len(VALID_CODES)]
+        return {'model': model_key, 'prediction': code, 'confidence': None, 'raw': code,
+                'attempts': 1, 'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': 3}}
+
+
+# ========================================
+# Micro-batching
+# ========================================
+
+class MicroBatcher:
+    """Per-model queue that dispatches batches under a latency SLO"""
+
+    def __init__(self, model_key, backend, cache=None, max_batch=8, max_wait=0.02,
+                 slo=2.0, per_model=4):
+        self.model_key = model_key
+        self.backend = backend
+        self.cache = cache
+        self.max_batch = max_batch
+        self.max_wait_limit = max_wait
+        self.max_wait = max_wait
+        self.slo = slo
+        self.queue = deque()
+        self.cond = threading.Condition()
+        self.pool = ThreadPoolExecutor(max_workers=per_model, thread_name_prefix=f"batch-{model_key}")
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.batch_sizes = deque(maxlen=LATENCY_WINDOW)
+        self.stats = {'requests': 0, 'batches': 0, 'calls': 0, 'coalesced': 0, 'cache_hits': 0}
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name=f"batcher-{model_key}", daemon=True)
+        self.thread.start()
+
+    def submit(self, prompt):
+        """Queue one prompt; the Future resolves to a result dict"""
+        future = Future()
+        with self.cond:
+            self.queue.append((prompt, future, time.perf_counter()))
+            self.stats['requests'] += 1
+            self.cond.notify()
+        return future
+
+    def _next_batch(self):
+        with self.cond:
+            while self.running and not self.queue:
+                self.cond.wait()
+            if not self.running:
+                return []
+            deadline = self.queue[0][2] + self.max_wait
+            while len(self.queue) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or not self.running:
+                    break
+                self.cond.wait(remaining)
+            return [self.queue.popleft() for _ in range(min(self.max_batch, len(self.queue)))]
+
+    def _loop(self):
+        while self.running:
+            batch = self._next_batch()
+            if batch:
+                self._dispatch(batch)
+
+    def _count(self, **increments):
+        with self.cond:
+            for name, n in increments.items():
+                self.stats[name] += n
+
+    def _dispatch(self, batch):
+        by_prompt = {}
+        for prompt, future, queued in batch:
+            by_prompt.setdefault(prompt, []).append((future, queued))
+        with self.cond:
+            self.stats['batches'] += 1
+            self.stats['coalesced'] += len(batch) - len(by_prompt)
+            self.batch_sizes.append(len(batch))
+
+        for prompt, waiters in by_prompt.items():
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self.cache.make_key(self.model_key, self.backend.model_name(self.model_key), prompt)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    self._count(cache_hits=1)
+                    self._resolve(waiters, dict(cached, cached=True))
+                    continue
+            self._count(calls=1)
+            self.pool.submit(self._call, prompt, cache_key, waiters)
+
+    def _call(self, prompt, cache_key, waiters):
+        try:
+            result = self.backend(self.model_key, prompt)
+            if self.cache is not None:
+                self.cache.put(cache_key, result)
+        except Exception as e:
+            for future, _ in waiters:
+                future.set_exception(e)
+            return
+        self._resolve(waiters, result)
+
+    def _resolve(self, waiters, result):
+        # Called from pool threads and the batcher thread
+        now = time.perf_counter()
+        with self.cond:
+            self.latencies.extend(now - queued for _, queued in waiters)
+            self._adapt()
+        for future, _ in waiters:
+            future.set_result(result)
+
+    def _adapt(self):
+        """Halve the batching wait while p95 is over the SLO, grow it back with headroom (holds self.cond)"""
+        if len(self.latencies) < 20:
+            return
+        p95 = percentile(list(self.latencies), 95)
+        if p95 > self.slo:
+            self.max_wait = self.max_wait / 2
+        elif p95 < self.slo / 2:
+            self.max_wait = min(self.max_wait_limit, max(self.max_wait * 1.25, 0.001))
+
+    def summary(self):
+        with self.cond:
+            latencies = list(self.latencies)
+            sizes = list(self.batch_sizes)
+            stats = dict(self.stats)
+            max_wait = self.max_wait
+            queued = len(self.queue)
+        return dict(
+            stats,
+            mean_batch_size=round(sum(sizes) / len(sizes), 2) if sizes else None,
+            max_wait_ms=round(max_wait * 1000, 1),
+            queued=queued,
+            latency_ms={
+                'p50': round(percentile(latencies, 50) * 1000, 1),
+                'p95': round(percentile(latencies, 95) * 1000, 1),
+                'p99': round(percentile(latencies, 99) * 1000, 1)
+            } if latencies else None
+        )
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        self.thread.join()
+        self.pool.shutdown()
+
+
+# ========================================
+# Service
+# ========================================
+
+class ClassificationService:
+    """Warm state shared by every request: backend, cache, batchers, metrics"""
+
+    def __init__(self, backend, models, cache=None, max_batch=8, max_wait=0.02, slo=2.0, per_model=4,
+                 timeout=180):
+        load_taxonomy()    # cached for every prompt
+        self.models = list(models)
+        self.cache = cache
+        self.timeout = timeout
+        self.batchers = {m: MicroBatcher(m, backend, cache, max_batch, max_wait, slo, per_model)
+                         for m in self.models}
+        self.started = time.time()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.counts = {'requests': 0, 'errors': 0}
+        self.lock = threading.Lock()
+
+    def classify(self, record, models=None):
+        """Taxonomy code per model for one unified-schema record"""
+        if not isinstance(record, dict) or not record.get('buggy_code') or not record.get('language'):
+            raise ValueError("record needs non-empty 'buggy_code' and 'language'")
+        models = models or self.models
+        unknown = [m for m in models if m not in self.batchers]
+        if unknown:
+            raise ValueError(f"unknown or disabled models: {', '.join(unknown)}")
+
+        start = time.perf_counter()
+        prompt = create_classification_prompt(record)
+        futures = {m: self.batchers[m].submit(prompt) for m in models}
+        results = {m: f.result(timeout=self.timeout) for m, f in futures.items()}
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.counts['requests'] += 1
+            self.latencies.append(elapsed)
+
+        return {
+            'unified_id': record.get('unified_id'),
+            'predictions': {m: r['prediction'] for m, r in results.items()},
+            'results': {m: {'prediction': r['prediction'], 'confidence': r.get('confidence'),
+                            'cached': bool(r.get('cached'))} for m, r in results.items()},
+            'latency_ms': round(elapsed * 1000, 1)
+        }
+
+    def record_error(self):
+        with self.lock:
+            self.counts['errors'] += 1
+
+    def metrics(self):
+        uptime = time.time() - self.started
+        with self.lock:
+            latencies = list(self.latencies)
+            counts = dict(self.counts)
+        return {
+            'uptime_seconds': round(uptime, 1),
+            'requests': counts['requests'],
+            'errors': counts['errors'],
+            'throughput_per_second': round(counts['requests'] / uptime, 2) if uptime > 0 else None,
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50) * 1000, 1),
+                'p95': round(percentile(latencies, 95) * 1000, 1),
+                'p99': round(percentile(latencies, 99) * 1000, 1),
+                'max': round(max(latencies) * 1000, 1)
+            } if latencies else None,
+            'models': {m: b.summary() for m, b in self.batchers.items()},
+            'cache': {'hits': self.cache.hits, 'misses': self.cache.misses} if self.cache else None,
+            'coalesced': REQUEST_FLIGHTS.summary()
+        }
+
+    def shutdown(self):
+        for batcher in self.batchers.values():
+            batcher.stop()
+        if self.cache:
+            self.cache.close()
+
+
+def make_handler(service):
+    """Request handler class bound to one service"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, status, body):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/metrics':
+                self._send(200, service.metrics())
+            elif self.path == '/health':
+                self._send(200, {'status': 'ok', 'models': service.models})
+            else:
+                self._send(404, {'error': f"unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != '/classify':
+                self._send(404, {'error': f"unknown path {self.path}"})
+                return
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+                record = body.get('record', body) if isinstance(body, dict) else None
+                models = body.get('models') if isinstance(body, dict) else None
+                self._send(200, service.classify(record, models))
+            except (ValueError, json.JSONDecodeError) as e:
+                service.record_error()
+                self._send(400, {'error': str(e)})
+            except Exception as e:
+                service.record_error()
+                self._send(500, {'error': f"{type(e).__name__}: {e}"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def create_server(service, host='127.0.0.1', port=DEFAULT_PORT):
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    return server
+
+
+def build_service(args):
+    """Service from command-line options (stub or real providers)"""
+    models, _ = load_model_registry()
+    selected = args.models or [m for m in ('qwen', 'llama') if m in models]
+    if args.stub:
+        backend = StubBackend(models, base_latency=args.stub_latency_ms / 1000)
+        cache = None
+    else:
+        backend = ProviderBackend(load_config(), models)
+        cache = None if args.no_cache else ResponseCache()
+    return ClassificationService(backend, selected, cache, args.max_batch, args.max_wait_ms / 1000,
+                                 args.slo_ms / 1000, args.per_model)
+
+
+def load_test(service, requests_total=500, concurrency=32, distinct=100):
+    """Fire concurrent /classify calls at a local server and print its metrics"""
+    import urllib.request
+
+    server = create_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/classify"
+
+    def one(i):
+        record = {'unified_id': f"LOAD_{i}", 'language': 'Python',
+                  'buggy_code': f"def f(n):\n    return n * {i % distinct}\n"}
+        request = urllib.request.Request(url, data=json.dumps({'record': record}).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=service.timeout) as response:
+            return json.load(response)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests_total)))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    metrics = service.metrics()
+    print("="*80)
+    print(f"🔥 LOAD TEST: {requests_total} requests, {concurrency} concurrent, {distinct} distinct records")
+    print("="*80)
+    print(f"Throughput: {requests_total / elapsed:.1f} requests/s ({elapsed:.2f} s)")
+    lat = metrics['latency_ms']
+    print(f"Latency:    p50 {lat['p50']} ms | p95 {lat['p95']} ms | p99 {lat['p99']} ms")
+    for model, stats in metrics['models'].items():
+        print(f"  {model:<10} {stats['batches']:>5} batches (mean size {stats['mean_batch_size']}) | "
+              f"{stats['calls']} calls | {stats['coalesced']} coalesced | wait {stats['max_wait_ms']} ms")
+    print("="*80)
+    return metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local classification service with micro-batching")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--models', nargs='+', default=None, help="Models to serve (default: qwen llama)")
+    parser.add_argument('--max-batch', type=int, default=8, help="Largest micro-batch per model")
+    parser.add_argument('--max-wait-ms', type=float, default=20, help="Longest a request waits for its batch")
+    parser.add_argument('--slo-ms', type=float, default=2000, help="p95 latency target; the wait shrinks above it")
+    parser.add_argument('--per-model', type=int, default=4, help="Max in-flight provider calls per model")
+    parser.add_argument('--no-cache', action='store_true', help="Do not use the response cache")
+    parser.add_argument('--stub', action='store_true', help="Answer from a local stub instead of the providers")
+    parser.add_argument('--stub-latency-ms', type=float, default=50)
+    parser.add_argument('--load-test', type=int, default=0, metavar='N',
+                        help="Run N concurrent requests against a local server and exit")
+    add_compact_argument(parser)
+    args = parser.parse_args()
+    if args.compact:
+        enable_compaction()
+
+    service = build_service(args)
+    if args.load_test:
+        load_test(service, args.load_test)
+        service.shutdown()
+    else:
+        server = create_server(service, args.host, args.port)
+        print(f"🚀 Serving {', '.join(service.models)} on http://{args.host}:{args.port} "
+              f"({'stub backend' if args.stub else 'providers'})")
+        print("   POST /classify | GET /metrics | GET /health")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n🛑 Stopping...")
+        finally:
+            server.server_close()
+            service.shutdown()
@@ -0,0 +1,476 @@
+"""
+Prompt Code Compaction
+======================
+
+Purpose:
+    Shrink the code and problem description in a prompt without changing
+    what the code means:
+
+    - Python: comments, blank lines and trailing whitespace are removed, and
+      indentation becomes one space per block level. Lines inside
+      multi-line strings are left alone. The result must give the same
+      ast.dump() as the original, otherwise the original is kept. Code that
+      does not parse is kept as is.
+    - C / C++: comments are removed (a block comment counts as one space,
+      as in the C standard). Whitespace runs outside literals collapse to
+      one space, and indentation and blank lines are dropped. Lines are
+      kept, so preprocessor directives and // comments still end where
+      they did. The token stream (literals included) must match the
+      original's, otherwise the original is kept. Sources with C++ raw
+      strings are kept as is.
+    - Descriptions: HTML tags such as <code>, <br/> and <p> become plain
+      text or newlines, and entities are unescaped. Text inside <pre> keeps
+      its spacing and line breaks.
+
+    Results are cached per record, keyed on the content and
+    COMPACTION_VERSION: in memory (an LRU of MEMORY_CACHE_SIZE entries, so
+    a long-running service stays bounded), plus an SQLite file for
+    corpus-wide reports (outputs/cache/compacted.db).
+
+Usage:
+    from code_compaction import compact_record
+    record = compact_record(record)          # dict with compacted code/description
+
+    python scripts/run_predictions_300.py --compact      # also cascade, worker, backfill, repair, serve
+    python scripts/code_compaction.py                    # token savings by source
+    python scripts/code_compaction.py --show PYPAL_000012
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import argparse
+import ast
+import hashlib
+import html
+import io
+import json
+import re
+import sqlite3
+import threading
+import time
+import tokenize
+from collections import OrderedDict
+from pathlib import Path
+
+from scan_data_quality import estimate_tokens
+
+
+COMPACTION_VERSION = 2
+MEMORY_CACHE_SIZE = 10_000
+
+DEFAULT_CACHE = Path(__file__).parent.parent / 'outputs' / 'cache' / 'compacted.db'
+SAMPLE_FILE = Path(__file__).parent.parent / 'data' / 'sample_1000.json'
+
+
+# ========================================
+# Python
+# ========================================
+
+def compact_python(code):
+    """Compacted Python source, or None if it cannot be verified (e.g. does not parse)"""
+    try:
+        tree = ast.dump(ast.parse(code))
+        tokens = list(tokenize.generate_tokens(io.StringIO(code).readline))
+    except (SyntaxError, ValueError, tokenize.TokenError):
+        return None
+
+    comments = {}          # row -> column where the comment starts
+    keep_end = set()       # rows whose end is inside a string (no rstrip)
+    keep_start = set()     # rows whose start is inside a string (no re-indent)
+    logical_rows = {}      # row -> block depth, for rows starting a statement
+    depth = 0
+    new_statement = True
+    for tok in tokens:
+        if tok.type == tokenize.INDENT:
+            depth += 1
+        elif tok.type == tokenize.DEDENT:
+            depth -= 1
+        elif tok.type == tokenize.COMMENT:
+            comments[tok.start[0]] = tok.start[1]
+        elif tok.type == tokenize.NEWLINE:
+            new_statement = True
+        elif tok.type in (tokenize.NL, tokenize.ENDMARKER):
+            pass
+        else:
+            if new_statement:
+                logical_rows[tok.start[0]] = depth
+                new_statement = False
+            if tok.end[0] > tok.start[0]:
+                keep_end.update(range(tok.start[0], tok.end[0]))
+                keep_start.update(range(tok.start[0] + 1, tok.end[0] + 1))
+
+    out = []
+    for row, line in enumerate(code.split('\n'), 1):
+        if row in comments:
+            line = line[:comments[row]]
+        if row not in keep_end:
+            line = line.rstrip()
+        if row in keep_start:
+            out.append(line)
+            continue
+        stripped = line.lstrip()
+        if not stripped:
+            continue
+        out.append(' ' * logical_rows[row] + stripped if row in logical_rows else stripped)
+    compacted = '\n'.join(out)
+
+    try:
+        if ast.dump(ast.parse(compacted)) != tree:
+            return None
+    except SyntaxError:
+        return None
+    return compacted
+
+
+# ========================================
+# C / C++
+# ========================================
+
+RAW_STRING = re.compile(r'(?<![A-Za-z0-9_])(?:u8|u|U|L)?R"')
+
+# Independent lexer for verification: literals, comments, words, punctuation
+C_TOKEN = re.compile(r'''
+    "(?:\\.|[^"\\\n])*"          # string literal
+  | '(?:\\.|[^'\\\n])*'          # character literal
+  | //[^\n]*                     # line comment
+  | /\*.*?\*/                    # block comment
+  | [A-Za-z_]\w*                 # identifier / keyword
+  | \d[\w.]*                     # number
+  | \n                           # line end (directives end at a newline)
+  | \S                           # punctuation
+''', re.VERBOSE | re.DOTALL)
+
+
+def c_tokens(code):
+    """Token stream without comments and whitespace; newlines kept only where a directive ends"""
+    tokens = []
+    in_directive = False
+    at_line_start = True
+    for match in C_TOKEN.finditer(code.replace('\\\n', '')):
+        token = match.group()
+        if token.startswith('//') or token.startswith('/*'):
+            continue
+        if token == '\n':
+            if in_directive:
+                tokens.append('\n')
+            in_directive = False
+            at_line_start = True
+            continue
+        if at_line_start and token == '#':
+            in_directive = True
+        at_line_start = False
+        tokens.append(token)
+    return tokens
+
+
+def compact_c(code):
+    """Compacted C/C++ source, or None if it cannot be verified"""
+    if RAW_STRING.search(code):
+        return None
+
+    out = []
+    i, n = 0, len(code)
+
+    def space():
+        if out and out[-1] not in (' ', '\n'):
+            out.append(' ')
+
+    def newline():
+        while out and out[-1] == ' ':
+            out.pop()
+        if out and out[-1] != '\n':
+            out.append('\n')
+
+    while i < n:
+        c = code[i]
+        if c == '\\' and code.startswith('\n', i + 1):
+            out.append('\\\n')                 # line splice (macro continuation)
+            i += 2
+        elif code.startswith('//', i):
+            while i < n and code[i] != '\n':
+                i += 2 if code.startswith('\\\n', i) else 1
+        elif code.startswith('/*', i):
+            end = code.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            space()
+        elif c in '"\'':
+            j = i + 1
+            while j < n and code[j] != c and code[j] != '\n':
+                j += 2 if code[j] == '\\' else 1
+            j = min(j + 1, n) if j < n and code[j] == c else j    # unterminated: stop at the newline
+            out.append(code[i:j])
+            i = j
+        elif c == '\n':
+            newline()
+            i += 1
+        elif c in ' \t\r\f\v':
+            space()
+            i += 1
+        else:
+            out.append(c)
+            i += 1
+    newline()
+    compacted = ''.join(out).strip('\n')
+
+    if c_tokens(compacted) != c_tokens(code):
+        return None
+    return compacted
+
+
+# ========================================
+# Descriptions
+# ========================================
+
+HTML_TAG_NAMES = (r'(p|br|div|pre|code|tt|b|i|em|strong|u|span|sup|sub|ul|ol|li|'
+                  r'h[1-6]|table|thead|tbody|tr|td|th|a|img|hr)')
+# Attributes must be name=value, so "i <a and a> 0" is not mistaken for a tag
+HTML_ATTRIBUTES = r'(?:\s+[A-Za-z_:][-\w:.]*\s*=\s*(?:"[^"]*"|\'[^\']*\'|[^\s"\'=<>`]+))*\s*/?>'
+HTML_TAG = re.compile(r'</?' + HTML_TAG_NAMES + HTML_ATTRIBUTES, re.IGNORECASE)
+HTML_PRE = re.compile(r'<pre' + HTML_ATTRIBUTES + r'(.*?)</pre\s*>', re.IGNORECASE | re.DOTALL)
+HTML_ENTITY = re.compile(r'&(?:[a-zA-Z]+|#\d+|#x[0-9a-fA-F]+);')
+BLOCK_TAGS = {'p', 'br', 'div', 'pre', 'ul', 'ol', 'table', 'tr', 'hr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+
+
+def _replace_tag(match):
+    tag = match.group(1).lower()
+    if tag == 'li':
+        return '' if match.group(0).startswith('</') else '\n- '
+    if tag in ('td', 'th'):
+        return ' '
+    return '\n' if tag in BLOCK_TAGS else ''
+
+
+def _flow_text(text, has_tags):
+    """Text outside <pre>: whitespace is not significant, tags break lines"""
+    if has_tags:
+        # Source line breaks are plain whitespace in HTML; only tags break lines
+        text = ' '.join(text.split())
+    text = html.unescape(HTML_TAG.sub(_replace_tag, text)).replace('\xa0', ' ')
+    # Whitespace in HTML is not significant: collapse it within each line
+    lines = [' '.join(line.split()) for line in text.split('\n')]
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
+
+
+def _preformatted_text(text):
+    """Text inside <pre>: kept verbatim, <br> becomes a newline and other tags are dropped"""
+    text = HTML_TAG.sub(lambda m: '\n' if m.group(1).lower() == 'br' else '', text)
+    text = html.unescape(text).replace('\xa0', ' ').replace('\r\n', '\n')
+    # A newline right after <pre> (or before </pre>) is not part of the content
+    return text.strip('\n').rstrip()
+
+
+def html_to_text(text):
+    """Plain text from a description with HTML markup (unchanged if there is none)"""
+    if not text or not (HTML_TAG.search(text) or HTML_ENTITY.search(text)):
+        return text
+
+    has_tags = bool(HTML_TAG.search(text))
+    parts = []
+    end = 0
+    for match in HTML_PRE.finditer(text):
+        parts.append(_flow_text(text[end:match.start()], has_tags))
+        parts.append(_preformatted_text(match.group(1)))
+        end = match.end()
+    parts.append(_flow_text(text[end:], has_tags))
+    return '\n'.join(part for part in parts if part)
+
+
+def compact_text(text):
+    """Trailing whitespace and runs of blank lines removed"""
+    if not text:
+        return text
+    lines = [line.rstrip() for line in text.split('\n')]
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
+
+
+# ========================================
+# Records
+# ========================================
+
+COMPACTORS = {'python': compact_python, 'c': compact_c, 'c++': compact_c, 'cpp': compact_c}
+
+
+def compact_code(code, language):
+    """(code, verified): compacted code, or the original with verified=False"""
+    compactor = COMPACTORS.get((language or '').lower())
+    if not code or compactor is None:
+        return code, False
+    compacted = compactor(code)
+    return (compacted, True) if compacted is not None else (code, False)
+
+
+class CompactionCache:
+    """Compacted fields per record content; bounded in-memory LRU, optionally backed by SQLite"""
+
+    def __init__(self, path=None, max_entries=MEMORY_CACHE_SIZE):
+        self.memory = OrderedDict()
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.conn = None
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS compacted ("
+                              "key TEXT PRIMARY KEY, unified_id TEXT, fields TEXT, created REAL)")
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(record):
+        raw = json.dumps([COMPACTION_VERSION, record.get('language'), record.get('buggy_code'),
+                          record.get('problem_description')], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _remember(self, key, fields):
+        # Caller holds self.lock; evicts the least recently used entry
+        self.memory[key] = fields
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, key):
+        with self.lock:
+            fields = self.memory.get(key)
+            if fields is not None:
+                self.memory.move_to_end(key)
+            elif self.conn is not None:
+                row = self.conn.execute("SELECT fields FROM compacted WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    fields = json.loads(row[0])
+                    self._remember(key, fields)
+            if fields is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return fields
+
+    def put(self, key, unified_id, fields):
+        with self.lock:
+            self._remember(key, fields)
+            if self.conn is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO compacted (key, unified_id, fields, created) VALUES (?, ?, ?, ?)",
+                    (key, unified_id, json.dumps(fields, ensure_ascii=False), time.time())
+                )
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+
+
+_default_cache = CompactionCache()
+
+
+def compact_fields(record, cache=None):
+    """{'buggy_code', 'problem_description', 'code_verified'} for a record (cached)"""
+    cache = cache or _default_cache
+    key = cache.make_key(record)
+    fields = cache.get(key)
+    if fields is None:
+        code, verified = compact_code(record.get('buggy_code'), record.get('language'))
+        description = compact_text(html_to_text(record.get('problem_description')))
+        fields = {'buggy_code': code, 'problem_description': description, 'code_verified': verified}
+        cache.put(key, record.get('unified_id'), fields)
+    return fields
+
+
+def compact_record(record, cache=None):
+    """Copy of a record (dict or Record) with compacted code and description"""
+    fields = compact_fields(record, cache)
+    compacted = dict(record.to_dict() if hasattr(record, 'to_dict') else record)
+    compacted['buggy_code'] = fields['buggy_code']
+    compacted['problem_description'] = fields['problem_description']
+    return compacted
+
+
+# ========================================
+# Report
+# ========================================
+
+def savings_report(records, cache=None):
+    """Estimated prompt tokens before/after compaction, per source"""
+    from prompt_template import create_classification_prompt
+
+    by_source = {}
+    for record in records:
+        fields = compact_fields(record, cache)
+        stats = by_source.setdefault(record.get('source_dataset') or 'Unknown', {
+            'records': 0, 'code_before': 0, 'code_after': 0, 'desc_before': 0, 'desc_after': 0,
+            'prompt_before': 0, 'prompt_after': 0, 'kept': 0})
+        stats['records'] += 1
+        stats['code_before'] += estimate_tokens(record.get('buggy_code') or '')
+        stats['code_after'] += estimate_tokens(fields['buggy_code'] or '')
+        stats['desc_before'] += estimate_tokens(record.get('problem_description') or '')
+        stats['desc_after'] += estimate_tokens(fields['problem_description'] or '')
+        stats['prompt_before'] += estimate_tokens(create_classification_prompt(record, compact=False))
+        stats['prompt_after'] += estimate_tokens(create_classification_prompt(record, compact=True))
+        stats['kept'] += 0 if fields['code_verified'] or not record.get('buggy_code') else 1
+    return by_source
+
+
+def print_report(by_source):
+    def saved(before, after):
+        return f"{(1 - after / before) * 100:5.1f}%" if before else "    -"
+
+    print("="*80)
+    print("✂️  PROMPT COMPACTION (estimated tokens, ~4 characters each)")
+    print("="*80)
+    print(f"{'Source':<12} {'Records':>8} {'Code':>8} {'Desc':>8} {'Prompt before':>14} {'after':>9} "
+          f"{'Saved':>7} {'Kept':>6}")
+    print("-"*80)
+    total = {}
+    for source, stats in sorted(by_source.items()):
+        for name, value in stats.items():
+            total[name] = total.get(name, 0) + value
+        print(f"{source:<12} {stats['records']:>8,} {saved(stats['code_before'], stats['code_after']):>8} "
+              f"{saved(stats['desc_before'], stats['desc_after']):>8} {stats['prompt_before']:>14,} "
+              f"{stats['prompt_after']:>9,} {saved(stats['prompt_before'], stats['prompt_after']):>7} "
+              f"{stats['kept']:>6,}")
+    if total:
+        print("-"*80)
+        print(f"{'Total':<12} {total['records']:>8,} {saved(total['code_before'], total['code_after']):>8} "
+              f"{saved(total['desc_before'], total['desc_after']):>8} {total['prompt_before']:>14,} "
+              f"{total['prompt_after']:>9,} {saved(total['prompt_before'], total['prompt_after']):>7} "
+              f"{total['kept']:>6,}")
+    print("-"*80)
+    print("Code / Desc = tokens saved on that field; Kept = code left unchanged because it does")
+    print("not parse or could not be verified")
+    print("="*80)
+
+
+if __name__ == "__main__":
+    from jsonl_io import iter_records, resolve_data_file
+
+    parser = argparse.ArgumentParser(description="Compact code and descriptions in prompts")
+    parser.add_argument('data_file', nargs='?', type=Path, default=SAMPLE_FILE)
+    parser.add_argument('--show', default=None, metavar='UNIFIED_ID', help="Print one record before and after")
+    parser.add_argument('--no-cache', action='store_true', help="Do not use outputs/cache/compacted.db")
+    args = parser.parse_args()
+
+    data_file = resolve_data_file(args.data_file)
+    if not data_file.exists():
+        print(f"❌ {data_file} not found")
+        raise SystemExit(1)
+    cache = CompactionCache(None if args.no_cache else DEFAULT_CACHE)
+
+    if args.show:
+        record = next((r for r in iter_records(data_file) if r.get('unified_id') == args.show), None)
+        if record is None:
+            print(f"❌ {args.show} not in {data_file.name}")
+            raise SystemExit(1)
+        compacted = compact_record(record, cache)
+        for title, value in (("CODE (before)", record.get('buggy_code')),
+                             ("CODE (after)", compacted['buggy_code']),
+                             ("DESCRIPTION (before)", record.get('problem_description')),
+                             ("DESCRIPTION (after)", compacted['problem_description'])):
+            print("="*80)
+            print(title)
+            print("-"*80)
+            print(value)
+        print("="*80)
+    else:
+        print_report(savings_report(iter_records(data_file), cache))
+    cache.close()
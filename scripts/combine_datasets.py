@@ -1,142 +1,24 @@
+import argparse
 import json
-import pandas as pd
 from pathlib import Path
 import os
-import re
 
-
-def load_pypal(filepath):
-    """Load and standardize PyPal dataset"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    standardized = []
-    for idx, record in enumerate(data):
-        standardized.append({
-            'unified_id': f"PYPAL_{idx:06d}",
-            'original_id': record.get('uid', ''),
-            'source_dataset': 'PyPal',
-            'problem_id': f"concept{record.get('concept_number')}_q{record.get('question_number')}",
-            'problem_description': record.get('question', ''),
-            'buggy_code': record.get('buggy_code', ''),
-            'correct_code': None,
-            'language': 'Python',
-            'execution_feedback': record.get('execution_feedback', ''),
-            'hint': record.get('hint', ''),
-            'ground_truth_label': None,
-            'additional_info': {
-                'concept_number': record.get('concept_number'),
-                'question_number': record.get('question_number'),
-                'anon_id': record.get('anon_id')
-            }
-        })
-    return standardized
+from jsonl_io import SUFFIXES
+from records import save_records
+from scan_data_quality import CONTROL_CHARS
+from profiling import NULL_PROFILER, Profiler, add_profile_arguments
 
 
-def load_yaksh(filepath):
-    """Load and standardize Yaksh dataset"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+def load_source(filepath, schema, profiler=NULL_PROFILER):
+    """Load a raw source file and standardize it with its config/source_schemas.json entry"""
+    from schema_mapping import standardize    # pandas-backed; keeps --help fast
     
-    standardized = []
-    for idx, record in enumerate(data):
-        standardized.append({
-            'unified_id': record.get('uid', f"YAKSH_{idx:06d}"),
-            'original_id': record.get('uid', ''),
-            'source_dataset': 'Yaksh',
-            'problem_id': None,
-            'problem_description': record.get('problem_description', ''),
-            'buggy_code': record.get('buggy_code', ''),
-            'correct_code': None,
-            'language': record.get('language', 'Python'),
-            'execution_feedback': record.get('execution_feedback', ''),
-            'hint': None,
-            'ground_truth_label': record.get('ground_truth'),
-            'additional_info': {}
-        })
-    return standardized
-
-
-def load_codeforces(filepath):
-    """Load and standardize Codeforces dataset"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    with profiler.stage(f"load {schema['name']}"):
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
     
-    standardized = []
-    for idx, record in enumerate(data):
-        standardized.append({
-            'unified_id': f"CODEFORCES_{idx:06d}",
-            'original_id': record.get('file_name', ''),
-            'source_dataset': 'Codeforces',
-            'problem_id': record.get('problem_id', ''),
-            'problem_description': None,
-            'buggy_code': record.get('code', ''),
-            'correct_code': None,
-            'language': 'C++',
-            'execution_feedback': None,
-            'hint': None,
-            'ground_truth_label': None,
-            'additional_info': {
-                'file_name': record.get('file_name')
-            }
-        })
-    return standardized
-
-
-def load_deepfix(filepath):
-    """Load and standardize DeepFix dataset"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    standardized = []
-    for idx, record in enumerate(data):
-        standardized.append({
-            'unified_id': f"DEEPFIX_{idx:06d}",
-            'original_id': record.get('file_name', ''),
-            'source_dataset': 'DeepFix',
-            'problem_id': record.get('problem_id', ''),
-            'problem_description': None,
-            'buggy_code': record.get('erroneous_code', ''),
-            'correct_code': record.get('correct_code', ''),
-            'language': 'C',
-            'execution_feedback': None,
-            'hint': None,
-            'ground_truth_label': None,
-            'additional_info': {
-                'file_name': record.get('file_name')
-            }
-        })
-    return standardized
-
-
-def load_spoc(filepath):
-    """Load and standardize SPOC dataset"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    standardized = []
-    for idx, record in enumerate(data):
-        description = record.get('description', [])
-        if isinstance(description, list):
-            description = '\n'.join(description)
-        
-        standardized.append({
-            'unified_id': f"SPOC_{idx:06d}",
-            'original_id': record.get('submission_id', ''),
-            'source_dataset': 'SPOC',
-            'problem_id': record.get('problem_id', ''),
-            'problem_description': description,
-            'buggy_code': record.get('code', ''),
-            'correct_code': None,
-            'language': 'C++',
-            'execution_feedback': None,
-            'hint': None,
-            'ground_truth_label': None,
-            'additional_info': {
-                'submission_id': record.get('submission_id')
-            }
-        })
-    return standardized
+    with profiler.stage(f"standardize {schema['name']}"):
+        return standardize(data, schema)
 
 
 def clean_for_excel(val):
@@ -146,26 +28,23 @@ def clean_for_excel(val):
     if isinstance(val, str):
         # Remove control characters that Excel doesn't support
         # Keep newlines (\n) and tabs (\t), remove others
-        return re.sub(r'[\x00-\x08\x0B-\x0C\x0E-\x1F\x7F-\x9F]', '', val)
+        return CONTROL_CHARS.sub('', val)
     return val
 
 
-def combine_all_datasets():
-    """Main function to combine all datasets"""
+def combine_all_datasets(profiler=NULL_PROFILER, output_format='.json'):
+    """Main function to combine all datasets (output_format: .json / .jsonl / .jsonl.gz / .jsonl.zst)"""
     
     # Get the script's directory and navigate to project root
     script_dir = Path(__file__).parent
     project_root = script_dir.parent
     
-    # Define dataset paths
+    # Define dataset paths (one entry per source in config/source_schemas.json)
+    from schema_mapping import load_source_schemas
+    
     base_path = project_root / 'data' / 'final_clean_datasets'
-    datasets = {
-        'pypal': base_path / 'pypal_clean.json',
-        'yaksh': base_path / 'yaksh_logical_dedup.json',
-        'codeforces': base_path / 'codeforces_clean.json',
-        'deepfix': base_path / 'deepfix_clean.json',
-        'spoc': base_path / 'spoc_programs.json'
-    }
+    schemas = load_source_schemas()
+    datasets = {key: base_path / schema['file'] for key, schema in schemas.items()}
     
     # Verify all files exist
     print("Checking for dataset files...")
@@ -185,40 +64,12 @@ def combine_all_datasets():
     print("Loading datasets...")
     print("="*60)
     
-    # PyPal
-    print(f"\n📂 Loading PyPal...")
-    pypal_data = load_pypal(datasets['pypal'])
-    all_records.extend(pypal_data)
-    dataset_stats['PyPal'] = len(pypal_data)
-    print(f"   ✓ Loaded {len(pypal_data)} records")
-    
-    # Yaksh
-    print(f"\n📂 Loading Yaksh...")
-    yaksh_data = load_yaksh(datasets['yaksh'])
-    all_records.extend(yaksh_data)
-    dataset_stats['Yaksh'] = len(yaksh_data)
-    print(f"   ✓ Loaded {len(yaksh_data)} records")
-    
-    # Codeforces
-    print(f"\n📂 Loading Codeforces...")
-    codeforces_data = load_codeforces(datasets['codeforces'])
-    all_records.extend(codeforces_data)
-    dataset_stats['Codeforces'] = len(codeforces_data)
-    print(f"   ✓ Loaded {len(codeforces_data)} records")
-    
-    # DeepFix
-    print(f"\n📂 Loading DeepFix...")
-    deepfix_data = load_deepfix(datasets['deepfix'])
-    all_records.extend(deepfix_data)
-    dataset_stats['DeepFix'] = len(deepfix_data)
-    print(f"   ✓ Loaded {len(deepfix_data)} records")
-    
-    # SPOC
-    print(f"\n📂 Loading SPOC...")
-    spoc_data = load_spoc(datasets['spoc'])
-    all_records.extend(spoc_data)
-    dataset_stats['SPOC'] = len(spoc_data)
-    print(f"   ✓ Loaded {len(spoc_data)} records")
+    for key, schema in schemas.items():
+        print(f"\n📂 Loading {schema['name']}...")
+        records = load_source(datasets[key], schema, profiler)
+        all_records.extend(records)
+        dataset_stats[schema['name']] = len(records)
+        print(f"   ✓ Loaded {len(records)} records")
     
     # Create output directory
     output_dir = project_root / 'data'
@@ -226,30 +77,34 @@ def combine_all_datasets():
     
     # Save as JSON
     print("\n" + "="*60)
-    print("💾 Saving unified_dataset.json...")
-    json_output = output_dir / 'unified_dataset.json'
-    with open(json_output, 'w', encoding='utf-8') as f:
-        json.dump(all_records, f, indent=2, ensure_ascii=False)
+    json_output = output_dir / f'unified_dataset{output_format}'
+    print(f"💾 Saving {json_output.name}...")
+    with profiler.stage("export JSON"):
+        save_records(json_output, all_records)
     print(f"   ✓ Saved to {json_output}")
     
     # Save as Excel (with cleaning)
     print("\n💾 Saving unified_dataset.xlsx...")
-    df = pd.DataFrame(all_records)
-    df['additional_info'] = df['additional_info'].apply(lambda x: json.dumps(x))
-    
-    # Clean all string columns for Excel compatibility
-    for col in df.columns:
-        if df[col].dtype == 'object':
-            df[col] = df[col].apply(clean_for_excel)
+    with profiler.stage("clean for XLSX"):
+        import pandas as pd    # only needed from here on; keeps the file check fast
+        
+        df = pd.DataFrame([record.to_dict() for record in all_records])
+        df['additional_info'] = df['additional_info'].apply(lambda x: json.dumps(x))
+        
+        # Clean all string columns for Excel compatibility
+        for col in df.columns:
+            if df[col].dtype == 'object':
+                df[col] = df[col].apply(clean_for_excel)
     
     excel_output = output_dir / 'unified_dataset.xlsx'
-    df.to_excel(excel_output, index=False, engine='openpyxl')
+    with profiler.stage("export XLSX"):
+        df.to_excel(excel_output, index=False, engine='openpyxl')
     print(f"   ✓ Saved to {excel_output}")
     
     # Generate summary statistics
     print("\n💾 Generating summary...")
     summary_output = output_dir / 'dataset_summary.txt'
-    with open(summary_output, 'w', encoding='utf-8') as f:
+    with profiler.stage("summarize"), open(summary_output, 'w', encoding='utf-8') as f:
         f.write("="*60 + "\n")
         f.write("UNIFIED DATASET SUMMARY\n")
         f.write("="*60 + "\n\n")
@@ -270,7 +125,7 @@ def combine_all_datasets():
         f.write("-"*40 + "\n")
         lang_counts = {}
         for record in all_records:
-            lang = record['language']
+            lang = record.language
             lang_counts[lang] = lang_counts.get(lang, 0) + 1
         
         for lang, count in sorted(lang_counts.items()):
@@ -291,13 +146,21 @@ def combine_all_datasets():
         print(f"  • {dataset}: {count} records")
     
     print("\n📁 Output files created in data/ folder:")
-    print("  • unified_dataset.json")
+    print(f"  • {json_output.name}")
     print("  • unified_dataset.xlsx")
     print("  • dataset_summary.txt")
     print("\n" + "="*60)
     
+    profiler.report()
+    
     return all_records
 
 
 if __name__ == "__main__":
-    combine_all_datasets()
+    parser = argparse.ArgumentParser(description="Combine the cleaned source datasets")
+    parser.add_argument('--format', choices=SUFFIXES, default='.json',
+                        help="Format of the unified dataset (compressed JSONL for the full corpus)")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    
+    combine_all_datasets(Profiler.from_args('combine_datasets', args), args.format)
@@ -0,0 +1,167 @@
+"""
+Conflict Index
+==============
+
+Purpose:
+    Build, once per predictions set, a per-record index of how the models
+    disagree, so conflict questions for any model combination are answered
+    from arrays instead of rescanning the predictions JSON:
+
+    - majority:     most common valid label (-1 if no model is valid)
+    - valid_mask:   bit j set if model j gave a valid label
+    - agree_mask:   bit j set if model j chose the majority label
+    - distinct:     number of distinct valid labels
+
+    Queries:
+    - subset_conflicts(S):   records where the models in S are all valid
+                             and do not all give the same label
+    - against_majority(S):   records where some model in S is valid but
+                             disagrees with the majority (bitmask only)
+    - pair_breakdown(a, b):  "LABEL_A vs LABEL_B" counts for a pair
+    - by_dataset(mask):      conflict counts per source_dataset
+
+    The index is cached next to the analysis outputs and rebuilt when a
+    predictions file is newer than the cache.
+
+Usage:
+    from conflict_index import load_or_build_index
+    index = load_or_build_index([Path('outputs/predictions/predictions_300_final.json')])
+    mask = index.subset_conflicts(['qwen', 'llama'])
+    index.pair_breakdown('qwen', 'llama')
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+from analyze_results import build_label_matrix, category_counts, load_prediction_rows
+from labels import CATEGORY_CODES, MISSING, NUM_CATEGORIES
+
+
+INDEX_DIR = Path(__file__).parent.parent / 'outputs' / 'analysis'
+
+
+class ConflictIndex:
+    """Per-record agreement bitmasks over a LabelMatrix"""
+
+    def __init__(self, ids, models, labels, source_names, source_codes,
+                 language_names, language_codes, majority, valid_mask, agree_mask, distinct):
+        self.ids = ids
+        self.models = list(models)
+        self.labels = labels
+        self.source_names = source_names
+        self.source_codes = source_codes
+        self.language_names = language_names
+        self.language_codes = language_codes
+        self.majority = majority
+        self.valid_mask = valid_mask
+        self.agree_mask = agree_mask
+        self.distinct = distinct
+        self.model_index = {m: j for j, m in enumerate(self.models)}
+
+    @classmethod
+    def build(cls, matrix):
+        """Build the index from a LabelMatrix"""
+        labels = matrix.labels
+        n, m = labels.shape
+        if m > 32:
+            raise ValueError("ConflictIndex supports up to 32 models")
+
+        counts = category_counts(labels)
+        valid = labels >= 0
+        majority = np.where(valid.any(axis=1), counts.argmax(axis=1), MISSING).astype(np.int8)
+
+        bits = (np.uint32(1) << np.arange(m, dtype=np.uint32))
+        valid_mask = (valid * bits).sum(axis=1, dtype=np.uint32)
+        agree_mask = (((labels == majority[:, None]) & valid) * bits).sum(axis=1, dtype=np.uint32)
+        distinct = (counts > 0).sum(axis=1).astype(np.uint8)
+
+        return cls(matrix.ids, matrix.models, labels, matrix.source_names, matrix.source_codes,
+                   matrix.language_names, matrix.language_codes, majority, valid_mask, agree_mask, distinct)
+
+    def save(self, path):
+        np.savez_compressed(
+            path, ids=self.ids.astype(str), models=np.array(self.models), labels=self.labels,
+            source_names=self.source_names.astype(str), source_codes=self.source_codes,
+            language_names=self.language_names.astype(str), language_codes=self.language_codes,
+            majority=self.majority, valid_mask=self.valid_mask, agree_mask=self.agree_mask,
+            distinct=self.distinct
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data['ids'].astype(object), data['models'].tolist(), data['labels'],
+                   data['source_names'], data['source_codes'],
+                   data['language_names'], data['language_codes'], data['majority'],
+                   data['valid_mask'], data['agree_mask'], data['distinct'])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def subset_bits(self, models):
+        """Bitmask for a list of model names"""
+        mask = np.uint32(0)
+        for model in models:
+            mask |= np.uint32(1) << np.uint32(self.model_index[model])
+        return mask
+
+    def subset_valid(self, models):
+        """Records where every model in the subset gave a valid label"""
+        bits = self.subset_bits(models)
+        return (self.valid_mask & bits) == bits
+
+    def subset_conflicts(self, models):
+        """Records where the subset is all valid but not unanimous"""
+        cols = self.labels[:, [self.model_index[m] for m in models]]
+        return self.subset_valid(models) & (cols.min(axis=1) != cols.max(axis=1))
+
+    def against_majority(self, models):
+        """Records where a valid model in the subset disagrees with the majority"""
+        bits = self.subset_bits(models)
+        return ((self.valid_mask & bits) & ~self.agree_mask) != 0
+
+    def pair_breakdown(self, model_a, model_b):
+        """
+        Conflict counts per label pair for two models.
+
+        Returns:
+            list: (label_a, label_b, count) sorted by count, largest first
+        """
+        a = self.labels[:, self.model_index[model_a]]
+        b = self.labels[:, self.model_index[model_b]]
+        mask = self.subset_conflicts([model_a, model_b])
+        cells = a[mask].astype(np.int64) * NUM_CATEGORIES + b[mask]
+        counts = np.bincount(cells, minlength=NUM_CATEGORIES ** 2)
+        order = np.argsort(counts)[::-1]
+        return [(CATEGORY_CODES[c // NUM_CATEGORIES], CATEGORY_CODES[c % NUM_CATEGORIES], int(counts[c]))
+                for c in order if counts[c]]
+
+    def by_dataset(self, mask):
+        """Counts of masked records per source_dataset"""
+        counts = np.bincount(self.source_codes[mask], minlength=len(self.source_names))
+        return {str(name): int(count) for name, count in zip(self.source_names, counts)}
+
+
+def index_path(files):
+    """Cache file name derived from the predictions file names"""
+    key = hashlib.sha1('|'.join(sorted(str(Path(f).resolve()) for f in files)).encode()).hexdigest()[:12]
+    return INDEX_DIR / f'conflict_index_{key}.npz'
+
+
+def load_or_build_index(files, rebuild=False):
+    """Load the cached index for these predictions files, rebuilding if stale"""
+    files = [Path(f) for f in files]
+    path = index_path(files)
+    newest = max(f.stat().st_mtime for f in files)
+    if not rebuild and path.exists() and path.stat().st_mtime >= newest:
+        return ConflictIndex.load(path)
+
+    index = ConflictIndex.build(build_label_matrix(load_prediction_rows(files)))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    index.save(path)
+    return index
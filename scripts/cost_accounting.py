@@ -0,0 +1,188 @@
+"""
+Token and Cost Accounting
+=========================
+
+Purpose:
+    Count prompt / completion tokens for every provider call, turn them into
+    cost with the per-model prices in config/models.json, and stop a run
+    from scheduling new work once a token or cost budget is used up.
+
+    Token counts come from the provider responses:
+    - Hugging Face router: the OpenAI-style 'usage' block
+    - Gemini (google-genai): response.usage_metadata
+
+    Totals are kept per model, per source_dataset and per language, so a
+    full-corpus run can be planned from a small one.
+
+Output:
+    - outputs/predictions/costs_<run>.json
+
+Usage:
+    costs = CostTracker.from_registry(models, max_tokens=2_000_000, max_cost=5.0)
+    costs.add('qwen', usage_from_hf(response.json()), source='Yaksh', language='Python')
+    if costs.exhausted():
+        ...stop scheduling...
+    costs.print_summary()
+    costs.save(output_dir / 'costs_300.json')
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import json
+import threading
+from pathlib import Path
+
+
+# Prediction status for calls skipped because the budget ran out
+BUDGET_EXHAUSTED = "BUDGET_EXHAUSTED"
+
+
+def usage_from_hf(payload):
+    """{'prompt_tokens', 'completion_tokens'} from an HF router response body (None if absent)"""
+    usage = (payload or {}).get('usage') or {}
+    if not usage:
+        return None
+    return {
+        'prompt_tokens': int(usage.get('prompt_tokens') or 0),
+        'completion_tokens': int(usage.get('completion_tokens') or 0)
+    }
+
+
+def usage_from_gemini(response):
+    """Same shape from a google-genai response's usage_metadata (None if absent)"""
+    metadata = getattr(response, 'usage_metadata', None)
+    if metadata is None:
+        return None
+    return {
+        'prompt_tokens': int(getattr(metadata, 'prompt_token_count', 0) or 0),
+        'completion_tokens': int(getattr(metadata, 'candidates_token_count', 0) or 0)
+    }
+
+
+def add_budget_arguments(parser):
+    """Add the shared --max-tokens / --max-cost flags"""
+    parser.add_argument('--max-tokens', type=int, default=None,
+                        help="Stop scheduling new calls after this many prompt + completion tokens")
+    parser.add_argument('--max-cost', type=float, default=None,
+                        help="Stop scheduling new calls after this much spend (prices in config/models.json)")
+    return parser
+
+
+def _empty_totals():
+    return {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'cost': 0.0}
+
+
+class CostTracker:
+    """Thread-safe token / cost totals with optional budget caps"""
+
+    def __init__(self, prices=None, max_tokens=None, max_cost=None):
+        """
+        Args:
+            prices (dict): model key -> {'input': $, 'output': $} per 1M tokens
+            max_tokens (int): Stop scheduling once this many tokens are used
+            max_cost (float): Stop scheduling once this much is spent
+        """
+        self.prices = prices or {}
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.total = _empty_totals()
+        self.by_model = {}
+        self.by_source = {}
+        self.by_language = {}
+        self.calls_without_usage = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_registry(cls, models, max_tokens=None, max_cost=None):
+        """Prices from the 'price_per_1m_tokens' entries of config/models.json"""
+        prices = {key: entry['price_per_1m_tokens'] for key, entry in models.items()
+                  if entry.get('price_per_1m_tokens')}
+        return cls(prices, max_tokens, max_cost)
+
+    def cost_of(self, model, usage):
+        price = self.prices.get(model, {})
+        return (usage['prompt_tokens'] * price.get('input', 0.0)
+                + usage['completion_tokens'] * price.get('output', 0.0)) / 1_000_000
+
+    def add(self, model, usage, source=None, language=None):
+        """Book one call (usage None -> counted as a call without token data)"""
+        with self._lock:
+            if not usage:
+                self.calls_without_usage += 1
+                return
+            cost = self.cost_of(model, usage)
+            groups = [self.total,
+                      self.by_model.setdefault(model, _empty_totals()),
+                      self.by_source.setdefault(source or 'Unknown', _empty_totals()),
+                      self.by_language.setdefault(language or 'Unknown', _empty_totals())]
+            for totals in groups:
+                totals['calls'] += 1
+                totals['prompt_tokens'] += usage['prompt_tokens']
+                totals['completion_tokens'] += usage['completion_tokens']
+                totals['cost'] += cost
+
+    def add_result(self, result, source=None, language=None):
+        """Book a llm_clients result dict (cache hits and coalesced copies cost nothing)"""
+        if isinstance(result, dict) and not (result.get('cached') or result.get('coalesced')):
+            self.add(result['model'], result.get('usage'), source, language)
+
+    @property
+    def tokens_used(self):
+        return self.total['prompt_tokens'] + self.total['completion_tokens']
+
+    def _exhausted(self):
+        if self.max_tokens is not None and self.tokens_used >= self.max_tokens:
+            return True
+        return self.max_cost is not None and self.total['cost'] >= self.max_cost
+
+    def exhausted(self):
+        """True once a budget cap is reached"""
+        with self._lock:
+            return self._exhausted()
+
+    def budget_status(self):
+        parts = [f"{self.tokens_used:,} tokens"]
+        if self.max_tokens is not None:
+            parts[-1] += f" / {self.max_tokens:,}"
+        parts.append(f"${self.total['cost']:.4f}")
+        if self.max_cost is not None:
+            parts[-1] += f" / ${self.max_cost:.2f}"
+        return ", ".join(parts)
+
+    def summary(self):
+        with self._lock:
+            round_cost = lambda groups: {k: dict(v, cost=round(v['cost'], 6)) for k, v in groups.items()}
+            return {
+                'budget': {'max_tokens': self.max_tokens, 'max_cost': self.max_cost,
+                           'exhausted': self._exhausted()},
+                'total': dict(self.total, cost=round(self.total['cost'], 6)),
+                'calls_without_usage': self.calls_without_usage,
+                'by_model': round_cost(self.by_model),
+                'by_source': round_cost(self.by_source),
+                'by_language': round_cost(self.by_language),
+                'prices_per_1m_tokens': self.prices
+            }
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"\n💰 Tokens and cost: {self.budget_status()}")
+        for title, groups in (('Model', summary['by_model']), ('Source', summary['by_source']),
+                              ('Language', summary['by_language'])):
+            if not groups:
+                continue
+            print(f"  {title:<12} {'Calls':>7} {'Prompt tok':>12} {'Output tok':>12} {'Cost $':>10}")
+            for name, t in sorted(groups.items(), key=lambda x: -x[1]['cost']):
+                print(f"  {name:<12} {t['calls']:>7} {t['prompt_tokens']:>12,} "
+                      f"{t['completion_tokens']:>12,} {t['cost']:>10.4f}")
+        if summary['calls_without_usage']:
+            print(f"  ⚠️  {summary['calls_without_usage']} calls returned no usage data")
+        return summary
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        summary = self.summary()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        return path
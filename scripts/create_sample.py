@@ -1,39 +1,51 @@
-import json
+import argparse
 import random
 from pathlib import Path
 
-def create_sample_dataset(sample_size=1000, subset_size=100):
+from jsonl_io import SUFFIXES
+from records import load_records, save_records
+from scan_data_quality import load_exclusions
+from profiling import NULL_PROFILER, Profiler, add_profile_arguments
+
+def create_sample_dataset(sample_size=1000, subset_size=100, profiler=NULL_PROFILER, output_format='.json'):
     """Create samples for automated and manual testing"""
     
     # Load unified dataset
     data_path = Path(__file__).parent.parent / 'data' / 'unified_dataset.json'
     
     print(f"Loading unified dataset from {data_path}...")
-    with open(data_path, 'r', encoding='utf-8') as f:
-        all_records = json.load(f)
+    with profiler.stage("load"):
+        all_records = load_records(data_path)
     
     print(f"Total records: {len(all_records)}")
     
     # Random sample for automated testing
     random.seed(42)  # For reproducibility
-    sample = random.sample(all_records, min(sample_size, len(all_records)))
+    with profiler.stage("sample"):
+        sample = random.sample(all_records, min(sample_size, len(all_records)))
+    
+    # The files keep the full seeded draw, so predictions and the manual set
+    # stay aligned with them; runners drop excluded ids when they load it
+    exclusions = load_exclusions()
+    excluded = sum(1 for record in sample if record.unified_id in exclusions)
     
     # Save main sample
     output_dir = Path(__file__).parent.parent / 'data'
-    sample_path = output_dir / f'sample_{sample_size}.json'
+    sample_path = output_dir / f'sample_{sample_size}{output_format}'
     
-    with open(sample_path, 'w', encoding='utf-8') as f:
-        json.dump(sample, f, indent=2, ensure_ascii=False)
+    with profiler.stage("export JSON"):
+        save_records(sample_path, sample)
     
     print(f"\n✅ Created main sample: {len(sample)} records")
     print(f"✅ Saved to: {sample_path}")
+    if excluded:
+        print(f"🚫 {excluded} of them are on the exclusion list and will be skipped by the runners")
     
     # Create smaller subset for manual testing
     subset = random.sample(sample, min(subset_size, len(sample)))
-    subset_path = output_dir / f'sample_manual_{subset_size}.json'
+    subset_path = output_dir / f'sample_manual_{subset_size}{output_format}'
     
-    with open(subset_path, 'w', encoding='utf-8') as f:
-        json.dump(subset, f, indent=2, ensure_ascii=False)
+    save_records(subset_path, subset)
     
     print(f"\n✅ Created manual testing subset: {len(subset)} records")
     print(f"✅ Saved to: {subset_path}")
@@ -41,7 +53,7 @@ def create_sample_dataset(sample_size=1000, subset_size=100):
     # Show distribution
     dataset_counts = {}
     for record in sample:
-        ds = record['source_dataset']
+        ds = record.source_dataset
         dataset_counts[ds] = dataset_counts.get(ds, 0) + 1
     
     print("\n📊 Sample Distribution:")
@@ -59,5 +71,12 @@ def create_sample_dataset(sample_size=1000, subset_size=100):
     return sample_path, subset_path
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create evaluation samples")
+    parser.add_argument('--format', choices=SUFFIXES, default='.json', help="Format of the sample files")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    
     # Create both samples
-    create_sample_dataset(sample_size=1000, subset_size=100)
+    profiler = Profiler.from_args('create_sample', args)
+    create_sample_dataset(sample_size=1000, subset_size=100, profiler=profiler, output_format=args.format)
+    profiler.report()
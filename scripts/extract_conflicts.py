@@ -1,80 +1,97 @@
+import argparse
 import json
+from itertools import combinations
 from pathlib import Path
 
-def extract_qwen_llama_conflicts():
-    """Extract conflicts between Qwen and Llama (ignoring Gemini failures)"""
-    
-    predictions_file = Path(__file__).parent.parent / 'outputs' / 'predictions' / 'predictions_300_final.json'
-    
-    with open(predictions_file, 'r') as f:
-        results = json.load(f)
-    
-    valid_codes = ['LOOP_COND', 'COND_BRANCH', 'STMT_INTEGRITY', 
-                   'IO_FORMAT', 'VAR_INIT', 'DATA_TYPE', 'COMPUTATION']
-    
-    # Filter where Qwen and Llama both valid
-    qwen_llama_valid = [r for r in results 
-                        if r['qwen'] in valid_codes and r['llama'] in valid_codes]
-    
-    # Find conflicts
+from analyze_results import load_prediction_rows
+from conflict_index import load_or_build_index
+
+
+def extract_conflicts(models=('qwen', 'llama'), files=None):
+    """Extract conflicts between any set of models (ignoring invalid predictions)"""
+
+    predictions_dir = Path(__file__).parent.parent / 'outputs' / 'predictions'
+    files = files or [predictions_dir / 'predictions_300_final.json']
+    models = list(models)
+
+    index = load_or_build_index(files)
+
+    # Records where all chosen models are valid, and where they disagree
+    subset_valid = index.subset_valid(models)
+    conflict_mask = index.subset_conflicts(models)
+    n_valid = int(subset_valid.sum())
+
+    # Build conflict entries; predictions are copied verbatim from the files,
+    # so statuses such as QUOTA_EXCEEDED survive (the index only keeps codes)
+    rows = conflict_mask.nonzero()[0]
+    raw_rows = {}
+    if len(rows):
+        raw_rows = {r['unified_id']: r for r in load_prediction_rows(files)}
     conflicts = []
-    for r in qwen_llama_valid:
-        if r['qwen'] != r['llama']:
-            conflict_entry = {
-                'unified_id': r['unified_id'],
-                'source_dataset': r['source_dataset'],
-                'language': r['language'],
-                'qwen_prediction': r['qwen'],
-                'llama_prediction': r['llama'],
-                'gemini_prediction': r.get('gemini', 'N/A')
-            }
-            conflicts.append(conflict_entry)
-    
+    for row in rows:
+        raw = raw_rows[index.ids[row]]
+        conflict_entry = {
+            'unified_id': index.ids[row],
+            'source_dataset': raw['source_dataset'],
+            'language': raw['language']
+        }
+        for m in models:
+            conflict_entry[f'{m}_prediction'] = raw[m]
+        for m in index.models:
+            if m not in models:
+                conflict_entry[f'{m}_prediction'] = raw.get(m, 'N/A')
+        conflict_entry['distinct_labels'] = int(index.distinct[row])
+        conflicts.append(conflict_entry)
+
     # Save conflicts
-    output_dir = Path(__file__).parent.parent / 'outputs' / 'predictions'
-    conflicts_file = output_dir / 'conflicts_qwen_llama.json'
-    
+    conflicts_file = predictions_dir / f"conflicts_{'_'.join(models)}.json"
+
     with open(conflicts_file, 'w') as f:
         json.dump(conflicts, f, indent=2, ensure_ascii=False)
-    
+
     # Statistics
+    names = ' vs '.join(m.upper() for m in models)
     print("="*80)
-    print("QWEN vs LLAMA CONFLICT ANALYSIS")
+    print(f"{names} CONFLICT ANALYSIS")
     print("="*80)
-    print(f"\nTotal samples analyzed:        {len(results)}")
-    print(f"Qwen + Llama both valid:       {len(qwen_llama_valid)} ({len(qwen_llama_valid)/len(results)*100:.1f}%)")
-    print(f"Conflicts (Qwen ≠ Llama):      {len(conflicts)} ({len(conflicts)/len(qwen_llama_valid)*100:.1f}%)")
-    
-    # Breakdown by category
+    print(f"\nTotal samples analyzed:        {len(index)}")
+    print(f"All {len(models)} models valid:           {n_valid} ({n_valid/len(index)*100:.1f}%)")
+    print(f"Conflicts:                     {len(conflicts)} ({len(conflicts)/max(n_valid, 1)*100:.1f}%)")
+
+    # Breakdown by category, for every pair in the set
     print("\n" + "-"*80)
     print("CONFLICT BREAKDOWN:")
     print("-"*80)
-    
-    conflict_pairs = {}
-    for c in conflicts:
-        pair = f"{c['qwen_prediction']} vs {c['llama_prediction']}"
-        conflict_pairs[pair] = conflict_pairs.get(pair, 0) + 1
-    
-    for pair, count in sorted(conflict_pairs.items(), key=lambda x: x[1], reverse=True):
-        print(f"  {pair:<45} {count:>3} conflicts")
-    
+
+    for model_a, model_b in combinations(models, 2):
+        if len(models) > 2:
+            print(f"\n  {model_a} vs {model_b}:")
+        for label_a, label_b, count in index.pair_breakdown(model_a, model_b):
+            pair = f"{label_a} vs {label_b}"
+            print(f"  {pair:<45} {count:>3} conflicts")
+
     print("\n" + "-"*80)
     print("DATASET DISTRIBUTION:")
     print("-"*80)
-    
-    dataset_counts = {}
-    for c in conflicts:
-        ds = c['source_dataset']
-        dataset_counts[ds] = dataset_counts.get(ds, 0) + 1
-    
-    for dataset, count in sorted(dataset_counts.items()):
-        print(f"  {dataset:<20} {count:>3} conflicts")
-    
+
+    for dataset, count in sorted(index.by_dataset(conflict_mask).items()):
+        if count:
+            print(f"  {dataset:<20} {count:>3} conflicts")
+
     print("\n" + "="*80)
     print(f"💾 Conflicts saved to: {conflicts_file}")
     print("="*80)
-    
+
     return conflicts
 
+def extract_qwen_llama_conflicts():
+    """Extract conflicts between Qwen and Llama (ignoring Gemini failures)"""
+    return extract_conflicts(('qwen', 'llama'))
+
 if __name__ == "__main__":
-    conflicts = extract_qwen_llama_conflicts()
+    parser = argparse.ArgumentParser(description="Extract conflicts between models")
+    parser.add_argument('--models', nargs='+', default=['qwen', 'llama'], help="Models to compare")
+    parser.add_argument('--files', nargs='+', type=Path, default=None, help="Predictions files")
+    args = parser.parse_args()
+
+    conflicts = extract_conflicts(args.models, args.files)
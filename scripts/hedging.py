@@ -0,0 +1,204 @@
+"""
+Hedged Requests
+===============
+
+Purpose:
+    Cut tail latency on slow providers. A request that runs longer than the
+    model's observed p95 latency gets a duplicate, and whichever copy answers
+    first (with a valid code, if possible) wins. Duplicates are capped at a
+    fraction of primary calls so they cannot eat the rate budget. The copy
+    that loses is still paid for; on_extra gets its result so the caller
+    can book its tokens.
+
+    Latency is tracked twice per model:
+    - primary: how long the first copy took on its own (= no hedging)
+    - effective: how long the caller actually waited (= with hedging)
+
+Usage:
+    hedger = HedgedCaller(max_hedge_ratio=0.1)
+    result = hedger.call('qwen', lambda: predict_huggingface(prompt, model, config))
+    hedger.print_summary()
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+VALID_CODES = ['LOOP_COND', 'COND_BRANCH', 'STMT_INTEGRITY',
+               'IO_FORMAT', 'VAR_INIT', 'DATA_TYPE', 'COMPUTATION']
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def is_valid_result(result):
+    """True for a valid code, either as a plain string or a result dict"""
+    if isinstance(result, dict):
+        result = result.get('prediction')
+    return result in VALID_CODES
+
+
+class HedgedCaller:
+    """Run provider calls with a p95-triggered duplicate request"""
+
+    def __init__(self, max_hedge_ratio=0.1, min_samples=10, window=200, max_workers=8):
+        """
+        Args:
+            max_hedge_ratio (float): Max duplicates as a fraction of primary calls
+            min_samples (int): Latencies needed per model before hedging starts
+            window (int): Number of recent primary latencies used for the p95
+            max_workers (int): Threads shared by primary and duplicate calls
+        """
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_samples = min_samples
+        self.window = window
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.lock = threading.Lock()
+        self.recent = {}
+        self.stats = {}
+
+    def _model_stats(self, model_key):
+        if model_key not in self.stats:
+            self.stats[model_key] = {
+                'calls': 0, 'hedges': 0, 'hedge_wins': 0,
+                'primary_latencies': [], 'effective_latencies': []
+            }
+            self.recent[model_key] = deque(maxlen=self.window)
+        return self.stats[model_key]
+
+    def _record_primary(self, model_key, started):
+        def callback(_future):
+            latency = time.time() - started
+            with self.lock:
+                self._model_stats(model_key)['primary_latencies'].append(latency)
+                self.recent[model_key].append(latency)
+        return callback
+
+    def hedge_delay(self, model_key):
+        """p95 of recent primary latencies, or None until enough are seen"""
+        with self.lock:
+            recent = list(self.recent.get(model_key, []))
+        if len(recent) < self.min_samples:
+            return None
+        return percentile(recent, 95)
+
+    def _can_hedge(self, stats):
+        return stats['hedges'] < self.max_hedge_ratio * stats['calls']
+
+    def call(self, model_key, fn, accept=is_valid_result, on_extra=None, hedge_fn=None):
+        """
+        Call fn(), sending one duplicate if it runs past the model's p95.
+
+        Args:
+            model_key (str): Model the latency statistics belong to
+            fn (callable): Zero-argument provider call
+            hedge_fn (callable): Call used for the duplicate (default fn). It
+                must reach the provider on its own, not join the primary's
+                in-flight call (e.g. request_prediction(..., coalesce=False))
+            accept (callable): Result check; an unaccepted first answer waits
+                for the other copy if it is still running
+            on_extra (callable): Called with the result of the copy that is
+                not returned, once it finishes (e.g. to book its tokens)
+
+        Returns:
+            Result of whichever copy answered first
+        """
+        started = time.time()
+        with self.lock:
+            stats = self._model_stats(model_key)
+            stats['calls'] += 1
+
+        primary = self.executor.submit(fn)
+        primary.add_done_callback(self._record_primary(model_key, started))
+
+        delay = self.hedge_delay(model_key)
+        copies = [primary]
+        pending = {primary}
+        if delay is not None:
+            done, pending = wait(pending, timeout=delay)
+            if not done:
+                with self.lock:
+                    hedge_allowed = self._can_hedge(stats)
+                    if hedge_allowed:
+                        stats['hedges'] += 1
+                if hedge_allowed:
+                    copies.append(self.executor.submit(hedge_fn or fn))
+                    pending.add(copies[-1])
+
+        result = None
+        winner = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = done.pop()
+            result = winner.result()
+            if accept(result):
+                break
+        if winner is None:
+            # Primary finished inside the hedge delay
+            winner = primary
+            result = primary.result()
+
+        with self.lock:
+            stats['effective_latencies'].append(time.time() - started)
+            if winner is not primary and accept(result):
+                stats['hedge_wins'] += 1
+        if on_extra:
+            for copy in copies:
+                if copy is not winner:
+                    copy.add_done_callback(self._extra_callback(on_extra))
+        return result
+
+    @staticmethod
+    def _extra_callback(on_extra):
+        def callback(future):
+            if future.exception() is None:
+                on_extra(future.result())
+        return callback
+
+    def summary(self):
+        """Per-model p50/p95/p99 with and without hedging"""
+        report = {}
+        with self.lock:
+            for model_key, stats in self.stats.items():
+                report[model_key] = {
+                    'calls': stats['calls'],
+                    'hedges': stats['hedges'],
+                    'hedge_wins': stats['hedge_wins'],
+                    'without_hedging': {
+                        f'p{p}': percentile(stats['primary_latencies'], p) for p in (50, 95, 99)
+                    },
+                    'with_hedging': {
+                        f'p{p}': percentile(stats['effective_latencies'], p) for p in (50, 95, 99)
+                    }
+                }
+        return report
+
+    def print_summary(self):
+        """Print the latency table for the run summary"""
+        fmt = lambda v: f"{v:.1f}s" if v is not None else "-"
+
+        print("\n" + "="*80)
+        print("⏱️  LATENCY (without hedging → with hedging)")
+        print("="*80)
+        print(f"{'Model':<12} {'p50':<16} {'p95':<16} {'p99':<16} {'Hedges':<8} {'Wins':<6}")
+        print("-" * 80)
+        for model_key, s in self.summary().items():
+            cells = [f"{fmt(s['without_hedging'][p])} → {fmt(s['with_hedging'][p])}"
+                     for p in ('p50', 'p95', 'p99')]
+            print(f"{model_key:<12} {cells[0]:<16} {cells[1]:<16} {cells[2]:<16} "
+                  f"{s['hedges']:<8} {s['hedge_wins']:<6}")
+
+    def shutdown(self, wait=False):
+        """Stop accepting work; abandoned duplicates finish in the background unless wait=True"""
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,240 @@
+"""
+Import Manual Testing Results
+=============================
+
+Purpose:
+    Read the hand-filled manual testing CSV back into the pipeline. The
+    Gemini_Manual / ChatGPT_Manual / Claude_Manual / DeepSeek_Manual and
+    Ground_Truth cells are normalized with labels.normalize_code() (stray
+    newlines, quotes, truncated codes such as "LOO"), one call per distinct
+    cell value, and joined by Unified_ID onto the predictions label matrix.
+
+    Cells that are filled in but cannot be mapped to a category are listed
+    in an issues file instead of being silently dropped.
+
+Input:
+    - outputs/manual_testing/manual_testing_200_samples.csv
+    - outputs/predictions/*.json to join with (optional)
+
+Output:
+    - outputs/predictions/predictions_manual.json (prediction-row format,
+      readable by analyze_results.py)
+    - outputs/manual_testing/manual_import_issues.csv
+
+Usage:
+    python scripts/import_manual_results.py
+    python scripts/import_manual_results.py --predictions outputs/predictions/predictions_200_final.json
+    python scripts/import_manual_results.py --benchmark
+
+    python scripts/analyze_results.py outputs/predictions/predictions_200_final.json outputs/predictions/predictions_manual.json
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analyze_results import LabelMatrix, build_label_matrix, load_prediction_rows
+from labels import CATEGORY_CODES, MISSING, decode_labels, normalize_labels
+
+
+PROJECT_ROOT = Path(__file__).parent.parent
+MANUAL_CSV = PROJECT_ROOT / 'outputs' / 'manual_testing' / 'manual_testing_200_samples.csv'
+OUTPUT_FILE = PROJECT_ROOT / 'outputs' / 'predictions' / 'predictions_manual.json'
+ISSUES_FILE = PROJECT_ROOT / 'outputs' / 'manual_testing' / 'manual_import_issues.csv'
+
+# CSV column -> model column in the predictions files
+MANUAL_COLUMNS = {
+    'Gemini_Manual': 'gemini_manual',
+    'ChatGPT_Manual': 'chatgpt_manual',
+    'Claude_Manual': 'claude_manual',
+    'DeepSeek_Manual': 'deepseek_manual'
+}
+
+TRUTH_COLUMN = 'Ground_Truth'
+
+
+def read_manual_csv(path=MANUAL_CSV):
+    """Manual testing CSV as strings (empty cells stay ''), one row per Unified_ID"""
+    df = pd.read_csv(path, dtype=str, keep_default_na=False, encoding='utf-8')
+    df['Unified_ID'] = df['Unified_ID'].str.strip()
+    df = df[df['Unified_ID'] != '']
+    duplicates = int(df['Unified_ID'].duplicated().sum())
+    if duplicates:
+        print(f"⚠️  {duplicates} duplicate Unified_ID rows, keeping the last one")
+        df = df.drop_duplicates('Unified_ID', keep='last')
+    return df.reset_index(drop=True)
+
+
+def normalize_manual_columns(df):
+    """
+    Normalize every manual column present in the CSV.
+
+    Returns:
+        tuple: ({column: int8 codes}, issues DataFrame)
+    """
+    codes = {}
+    issues = []
+    for column in list(MANUAL_COLUMNS) + [TRUTH_COLUMN]:
+        if column not in df.columns:
+            continue
+        codes[column], bad = normalize_labels(df[column].to_numpy())
+        if bad.any():
+            issues.append(pd.DataFrame({
+                'Unified_ID': df['Unified_ID'].to_numpy()[bad],
+                'Column': column,
+                'Value': df[column].to_numpy()[bad]
+            }))
+    issues = pd.concat(issues, ignore_index=True) if issues else pd.DataFrame(columns=['Unified_ID', 'Column', 'Value'])
+    return codes, issues
+
+
+def join_manual_labels(matrix, df, codes):
+    """
+    Add (or replace) the manual model columns of a LabelMatrix.
+
+    CSV rows whose Unified_ID is not in the matrix are appended as new
+    records, with Dataset / Language taken from the CSV.
+
+    Returns:
+        tuple: (LabelMatrix, int8 ground truth aligned with its ids, number
+        of appended records)
+    """
+    csv_ids = df['Unified_ID'].to_numpy(dtype=object)
+    positions = pd.Index(matrix.ids).get_indexer(csv_ids)
+    new_rows = positions < 0
+    n_new = int(new_rows.sum())
+    n = len(matrix) + n_new
+    positions[new_rows] = np.arange(len(matrix), n)
+
+    models = list(matrix.models)
+    labels = np.full((n, len(models)), MISSING, dtype=np.int8)
+    labels[:len(matrix)] = matrix.labels
+    for column, model in MANUAL_COLUMNS.items():
+        if column not in codes:
+            continue
+        if model not in models:
+            models.append(model)
+            labels = np.hstack([labels, np.full((n, 1), MISSING, dtype=np.int8)])
+        j = models.index(model)
+        labels[positions, j] = codes[column]
+
+    ids = np.concatenate([matrix.ids, csv_ids[new_rows]])
+    sources = np.concatenate([matrix.source_names[matrix.source_codes],
+                              df['Dataset'].to_numpy(dtype=str)[new_rows] if 'Dataset' in df else np.full(n_new, 'Unknown')])
+    languages = np.concatenate([matrix.language_names[matrix.language_codes],
+                                df['Language'].to_numpy(dtype=str)[new_rows] if 'Language' in df else np.full(n_new, 'Unknown')])
+
+    truth = np.full(n, MISSING, dtype=np.int8)
+    if TRUTH_COLUMN in codes:
+        truth[positions] = codes[TRUTH_COLUMN]
+
+    return LabelMatrix(ids, models, labels, sources, languages), truth, n_new
+
+
+def manual_rows(matrix):
+    """Prediction rows holding only the manual columns (empty cells omitted)"""
+    manual = [j for j, m in enumerate(matrix.models) if m in MANUAL_COLUMNS.values()]
+    decoded = {j: decode_labels(matrix.labels[:, j]) for j in manual}
+    has_label = (matrix.labels[:, manual] >= 0).any(axis=1) if manual else np.zeros(len(matrix), dtype=bool)
+
+    rows = []
+    for i in has_label.nonzero()[0]:
+        row = {
+            'unified_id': matrix.ids[i],
+            'source_dataset': str(matrix.source_names[matrix.source_codes[i]]),
+            'language': str(matrix.language_names[matrix.language_codes[i]])
+        }
+        for j in manual:
+            if decoded[j][i] is not None:
+                row[matrix.models[j]] = decoded[j][i]
+        rows.append(row)
+    return rows
+
+
+def import_manual_results(csv_file=MANUAL_CSV, prediction_files=None,
+                          output_file=OUTPUT_FILE, issues_file=ISSUES_FILE):
+    """Normalize the manual CSV, join it onto the predictions and save"""
+
+    print("="*80)
+    print("📥 IMPORTING MANUAL TESTING RESULTS")
+    print("="*80)
+
+    df = read_manual_csv(csv_file)
+    print(f"\n📂 {len(df)} rows from {Path(csv_file).name}")
+
+    codes, issues = normalize_manual_columns(df)
+
+    rows = load_prediction_rows(prediction_files) if prediction_files else []
+    matrix = build_label_matrix(rows) if rows else LabelMatrix([], [], np.empty((0, 0), dtype=np.int8), [], [])
+    matrix, truth, n_new = join_manual_labels(matrix, df, codes)
+    print(f"🔗 Joined on Unified_ID: {len(df) - n_new} matched, {n_new} not in the predictions files")
+
+    print(f"\n{'Column':<18} {'Filled':>8} {'Valid':>8} {'Unparseable':>12}")
+    print("-"*50)
+    for column in codes:
+        filled = int((df[column].str.strip() != '').sum())
+        valid = int((codes[column] >= 0).sum())
+        bad = int((issues['Column'] == column).sum())
+        print(f"{column:<18} {filled:>8} {valid:>8} {bad:>12}")
+
+    if len(issues):
+        issues_file = Path(issues_file)
+        issues_file.parent.mkdir(parents=True, exist_ok=True)
+        issues.to_csv(issues_file, index=False, encoding='utf-8')
+        print(f"\n⚠️  {len(issues)} unparseable cells written to: {issues_file}")
+        print(f"   Valid codes: {', '.join(CATEGORY_CODES)}")
+
+    output_rows = manual_rows(matrix)
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(output_rows, f, indent=2, ensure_ascii=False)
+
+    print(f"\n💾 {len(output_rows)} records with manual labels saved to: {output_file}")
+    print(f"   Ground truth labels: {int((truth >= 0).sum())}")
+    print("="*80)
+    return matrix, truth, issues
+
+
+def benchmark(n=50_000, seed=42):
+    """Time normalize + join on a synthetic annotated CSV of n rows"""
+    rng = np.random.default_rng(seed)
+    noisy = CATEGORY_CODES + [f"\n{c}" for c in CATEGORY_CODES] + [c[:4] for c in CATEGORY_CODES] + ['', '', '', '??']
+    ids = np.array([f"ID_{i:06d}" for i in range(n)], dtype=object)
+    df = pd.DataFrame({'Unified_ID': ids, 'Dataset': 'Yaksh', 'Language': 'Python'})
+    for column in list(MANUAL_COLUMNS) + [TRUTH_COLUMN]:
+        df[column] = rng.choice(np.array(noisy, dtype=object), n)
+
+    labels = rng.integers(0, len(CATEGORY_CODES), size=(n, 2), dtype=np.int8)
+    matrix = LabelMatrix(ids[rng.permutation(n)], ['qwen', 'llama'], labels,
+                         np.full(n, 'Yaksh'), np.full(n, 'Python'))
+
+    start = time.perf_counter()
+    codes, issues = normalize_manual_columns(df)
+    joined, truth, _ = join_manual_labels(matrix, df, codes)
+    elapsed = time.perf_counter() - start
+    print(f"⏱️  Normalize + join {n:,} rows × {len(codes)} columns: {elapsed*1000:.0f} ms "
+          f"({len(issues):,} unparseable cells)")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import manual testing CSV results")
+    parser.add_argument('--csv', type=Path, default=MANUAL_CSV)
+    parser.add_argument('--predictions', nargs='*', type=Path, default=None,
+                        help="Predictions files to join with (reported as matched / unmatched)")
+    parser.add_argument('--output', type=Path, default=OUTPUT_FILE)
+    parser.add_argument('--benchmark', action='store_true', help="Time the import on a synthetic 50K-row CSV")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+    else:
+        import_manual_results(args.csv, args.predictions, args.output)
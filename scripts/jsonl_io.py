@@ -0,0 +1,291 @@
+"""
+Compressed JSONL Storage
+========================
+
+Purpose:
+    Read and write record files (unified dataset, samples, predictions) in
+    any of these formats, chosen by file name on write and detected from
+    the file's first bytes on read:
+
+    - .json        indented JSON array (the original format)
+    - .jsonl       one record per line
+    - .jsonl.gz    gzip; written as independent ~1 MB members compressed
+                   on a thread pool (zlib releases the GIL), which any
+                   gzip reader handles as one stream
+    - .jsonl.zst   zstd with multi-threaded compression (needs the optional
+                   'zstandard' package)
+
+    JSONL formats are read one line at a time, so a consumer that
+    iterates never holds more than one record's text in memory.
+
+Usage:
+    from jsonl_io import iter_records, read_records, resolve_data_file, write_records
+    path = resolve_data_file(data_dir / 'unified_dataset.json')   # finds .jsonl.zst etc.
+    for record in iter_records(path):
+        ...
+    write_records(data_dir / 'unified_dataset.jsonl.zst', records)
+
+    python scripts/jsonl_io.py convert data/unified_dataset.json data/unified_dataset.jsonl.zst
+    python scripts/jsonl_io.py benchmark data/unified_dataset.json
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import argparse
+import gzip
+import io
+import json
+import os
+import time
+from collections import deque
+from pathlib import Path
+
+
+SUFFIXES = ('.json', '.jsonl', '.jsonl.gz', '.jsonl.zst')
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+CHUNK_BYTES = 1 << 20
+DEFAULT_THREADS = min(8, os.cpu_count() or 1)
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd files need the 'zstandard' package (pip install zstandard), "
+                          "or use .jsonl.gz instead") from None
+    return zstandard
+
+
+def format_of(path):
+    """Format from the file name (for writing)"""
+    name = Path(path).name
+    for suffix in sorted(SUFFIXES, key=len, reverse=True):
+        if name.endswith(suffix):
+            return suffix
+    raise ValueError(f"{path}: unknown record file format (use one of {', '.join(SUFFIXES)})")
+
+
+def detect_format(path):
+    """Format from the file contents (for reading)"""
+    with open(path, 'rb') as f:
+        head = f.read(4096)
+    if head.startswith(GZIP_MAGIC):
+        return '.jsonl.gz'
+    if head.startswith(ZSTD_MAGIC):
+        return '.jsonl.zst'
+    return '.json' if head.lstrip().startswith(b'[') else '.jsonl'
+
+
+def resolve_data_file(path):
+    """
+    The existing variant of a record file.
+
+    data/unified_dataset.json resolves to the newest of unified_dataset.json
+    / .jsonl / .jsonl.gz / .jsonl.zst (itself if none exists yet).
+    """
+    path = Path(path)
+    stem = path.name
+    for suffix in SUFFIXES:
+        if stem.endswith(suffix):
+            stem = stem[:-len(suffix)]
+            break
+    candidates = [path] + [path.with_name(stem + suffix) for suffix in SUFFIXES]
+    existing = [p for p in candidates if p.is_file()]
+    if not existing:
+        return path
+    return max(existing, key=lambda p: p.stat().st_mtime)
+
+
+# ========================================
+# Reading
+# ========================================
+
+def _open_lines(path, fmt):
+    if fmt == '.jsonl.gz':
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if fmt == '.jsonl.zst':
+        reader = _zstandard().ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        return io.TextIOWrapper(reader, encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def iter_records(path):
+    """Yield records one at a time (a .json array is parsed as a whole)"""
+    fmt = detect_format(path)
+    if fmt == '.json':
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+        return
+    with _open_lines(path, fmt) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_lines(path):
+    """
+    Yield unparsed JSON lines of a JSONL file (parsed records for a .json
+    array), so the parsing can be spread over worker processes.
+    """
+    fmt = detect_format(path)
+    if fmt == '.json':
+        yield from iter_records(path)
+        return
+    with _open_lines(path, fmt) as f:
+        for line in f:
+            if line.strip():
+                yield line
+
+
+def read_records(path):
+    """All records of a file in any supported format"""
+    return list(iter_records(path))
+
+
+# ========================================
+# Writing
+# ========================================
+
+class ParallelGzipWriter:
+    """Binary sink writing gzip members compressed on a thread pool, in order"""
+
+    def __init__(self, raw, level=6, threads=DEFAULT_THREADS):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.raw = raw
+        self.level = level
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+        self.pending = deque()
+        self.max_pending = threads * 2
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        if len(self.buffer) >= CHUNK_BYTES:
+            self._submit()
+        return len(data)
+
+    def _submit(self):
+        chunk, self.buffer = bytes(self.buffer), bytearray()
+        self.pending.append(self.pool.submit(gzip.compress, chunk, self.level, mtime=0))
+        while len(self.pending) >= self.max_pending:
+            self.raw.write(self.pending.popleft().result())
+
+    def close(self):
+        if self.buffer:
+            self._submit()
+        while self.pending:
+            self.raw.write(self.pending.popleft().result())
+        self.pool.shutdown()
+        self.raw.close()
+
+
+def _open_sink(path, fmt, level, threads):
+    raw = open(path, 'wb')
+    if fmt == '.jsonl.gz':
+        return ParallelGzipWriter(raw, level if level is not None else 6, threads)
+    if fmt == '.jsonl.zst':
+        compressor = _zstandard().ZstdCompressor(level=level if level is not None else 3, threads=threads)
+        return compressor.stream_writer(raw, closefd=True)
+    return raw
+
+
+def write_records(path, records, default=None, level=None, threads=DEFAULT_THREADS):
+    """
+    Write records in the format given by the file name.
+
+    Args:
+        path (Path): Output file (.json / .jsonl / .jsonl.gz / .jsonl.zst)
+        records (iterable): Records; JSONL formats consume it lazily
+        default (callable): json default= hook (e.g. Record.to_dict)
+        level (int): Compression level (gzip 1-9, zstd 1-22)
+        threads (int): Compression threads
+
+    Returns:
+        int: Number of records written
+    """
+    path = Path(path)
+    fmt = format_of(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+
+    try:
+        if fmt == '.json':
+            records = list(records)
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(records, f, default=default, indent=2, ensure_ascii=False)
+            os.replace(tmp, path)
+            return len(records)
+
+        count = 0
+        sink = _open_sink(tmp, fmt, level, threads)
+        try:
+            lines = []
+            for record in records:
+                lines.append(json.dumps(record, default=default, ensure_ascii=False))
+                count += 1
+                if len(lines) == 1000:
+                    sink.write(('\n'.join(lines) + '\n').encode('utf-8'))
+                    lines = []
+            if lines:
+                sink.write(('\n'.join(lines) + '\n').encode('utf-8'))
+        finally:
+            sink.close()
+        os.replace(tmp, path)
+        return count
+    except BaseException:
+        # Leave the previous file (if any) and no half-written .tmp behind
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def benchmark(path, threads=DEFAULT_THREADS):
+    """Size, write and cold-read time of one file in every format"""
+    import tempfile
+
+    records = read_records(path)
+    print(f"📦 {len(records):,} records from {Path(path).name}")
+    print(f"{'Format':<12} {'Size MB':>9} {'Write s':>9} {'Read s':>9}")
+    print("-"*42)
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in SUFFIXES:
+            out = Path(tmp) / f"records{fmt}"
+            try:
+                start = time.perf_counter()
+                write_records(out, records, threads=threads)
+                write_seconds = time.perf_counter() - start
+            except ImportError as e:
+                print(f"{fmt:<12} skipped ({e})")
+                continue
+            start = time.perf_counter()
+            for _ in iter_records(out):
+                pass
+            read_seconds = time.perf_counter() - start
+            print(f"{fmt:<12} {out.stat().st_size / 1e6:>9.1f} {write_seconds:>9.2f} {read_seconds:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compressed JSONL record files")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help="Rewrite a record file in another format")
+    convert_parser.add_argument('source', type=Path)
+    convert_parser.add_argument('target', type=Path)
+    convert_parser.add_argument('--level', type=int, default=None)
+    convert_parser.add_argument('--threads', type=int, default=DEFAULT_THREADS)
+
+    benchmark_parser = subparsers.add_parser('benchmark', help="Compare formats on one file")
+    benchmark_parser.add_argument('source', type=Path)
+    benchmark_parser.add_argument('--threads', type=int, default=DEFAULT_THREADS)
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        count = write_records(args.target, iter_records(args.source), level=args.level, threads=args.threads)
+        before, after = args.source.stat().st_size, args.target.stat().st_size
+        print(f"✅ {count:,} records: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB ({args.target})")
+    else:
+        benchmark(args.source, args.threads)
@@ -0,0 +1,137 @@
+"""
+Category Label Codes
+====================
+
+Purpose:
+    Compact integer codes for the 7 taxonomy categories, shared by the
+    analysis scripts. Label matrices use int8 with:
+
+        0..6  -> CATEGORY_CODES[i]
+        -1    -> no valid label (ERROR, PARSE_ERROR, missing cell, ...)
+
+    The binary predictions store (predictions_store.py) uses uint8 cells
+    that also keep the failure status:
+
+        0..6    -> CATEGORY_CODES[i]
+        16..    -> STATUS_CODES (ERROR, RATE_LIMITED, PARSE_ERROR, ...)
+        64..253 -> other strings, from a per-file table
+        254     -> cell present but null
+        255     -> no cell for this model
+
+    Hand-typed cells (manual testing CSV) go through normalize_code(), which
+    also accepts stray whitespace/quotes and unambiguous truncations such as
+    "LOO" -> LOOP_COND.
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import re
+
+import numpy as np
+
+
+CATEGORY_CODES = ['LOOP_COND', 'COND_BRANCH', 'STMT_INTEGRITY',
+                  'IO_FORMAT', 'VAR_INIT', 'DATA_TYPE', 'COMPUTATION']
+
+NUM_CATEGORIES = len(CATEGORY_CODES)
+MISSING = -1
+
+CODE_INDEX = {code: i for i, code in enumerate(CATEGORY_CODES)}
+
+# Non-valid prediction statuses written by the runners
+STATUS_CODES = ['ERROR', 'RATE_LIMITED', 'QUOTA_EXCEEDED', 'MODEL_NOT_AVAILABLE',
+                'MODEL_LOADING', 'PARSE_ERROR', 'CIRCUIT_OPEN', 'BUDGET_EXHAUSTED']
+
+STATUS_BASE = 16
+EXTRA_BASE = 64
+NULL_CELL = 254
+ABSENT_CELL = 255
+MAX_EXTRA_LABELS = NULL_CELL - EXTRA_BASE
+
+STORE_INDEX = dict(CODE_INDEX, **{status: STATUS_BASE + i for i, status in enumerate(STATUS_CODES)})
+
+
+def encode_labels(values):
+    """
+    Map strings to int8 label codes without a Python-level loop per value.
+
+    Args:
+        values (sequence): Category strings (anything else becomes MISSING)
+
+    Returns:
+        np.ndarray: int8 codes, same length as values
+    """
+    values = np.asarray(values, dtype=object)
+    if values.size == 0:
+        return np.empty(0, dtype=np.int8)
+
+    # Encode the few distinct strings once, then broadcast via the inverse index
+    unique, inverse = np.unique(values.astype(str), return_inverse=True)
+    table = np.array([CODE_INDEX.get(u.strip().upper(), MISSING) for u in unique], dtype=np.int8)
+    return table[inverse.reshape(values.shape)]
+
+
+def decode_labels(codes):
+    """int8 codes back to strings (MISSING -> None)"""
+    lookup = np.array(CATEGORY_CODES + [None], dtype=object)
+    codes = np.asarray(codes)
+    return lookup[np.where(codes >= 0, codes, NUM_CATEGORIES)]
+
+
+def normalize_code(value):
+    """
+    Best-effort category code for a hand-typed cell.
+
+    Accepts stray whitespace/newlines/quotes, spaces or hyphens instead of
+    underscores, a code embedded in a short note ("IO_FORMAT?"), and an
+    unambiguous prefix of at least 3 letters ("LOO", "STMT").
+
+    Returns:
+        str: Category code, or None if the cell is empty or unparseable
+    """
+    if value is None:
+        return None
+    text = str(value).strip().strip('"\'`.,;:!?').strip().upper()
+    if not text:
+        return None
+    text = re.sub(r'[\s\-]+', '_', text)
+    if text in CODE_INDEX:
+        return text
+
+    found = {code for code in CATEGORY_CODES if re.search(r'(?<![A-Z])' + code + r'(?![A-Z])', text)}
+    if len(found) == 1:
+        return found.pop()
+
+    if len(text) >= 3:
+        prefixed = [code for code in CATEGORY_CODES if code.startswith(text)]
+        if len(prefixed) == 1:
+            return prefixed[0]
+    return None
+
+
+def normalize_labels(values):
+    """
+    Vectorized normalize_code() over a column of hand-typed cells.
+
+    Returns:
+        tuple: (int8 codes, bool mask of non-empty cells that could not be
+        parsed)
+    """
+    values = np.asarray(values, dtype=object)
+    if values.size == 0:
+        return np.empty(0, dtype=np.int8), np.empty(0, dtype=bool)
+
+    unique, inverse = np.unique(values.astype(str), return_inverse=True)
+    normalized = [normalize_code(u) for u in unique]
+    table = np.array([CODE_INDEX[n] if n else MISSING for n in normalized], dtype=np.int8)
+    # str() of None / NaN cells is 'None' / 'nan': empty, not unparseable
+    bad = np.array([n is None and u.strip() not in ('', 'None', 'nan') for n, u in zip(normalized, unique)])
+    inverse = inverse.reshape(values.shape)
+    return table[inverse], bad[inverse]
+
+
+def store_to_label_codes(cells):
+    """uint8 store cells -> int8 label codes (statuses and the rest -> MISSING)"""
+    cells = np.asarray(cells)
+    return np.where(cells < NUM_CATEGORIES, cells, MISSING).astype(np.int8)
@@ -0,0 +1,217 @@
+"""
+Length-Aware Scheduling
+=======================
+
+Purpose:
+    Decide the order in which prediction requests are handed to the
+    thread pool (llm_clients.request_concurrently) or written to the work
+    queue (worker.py init). With file order, a few huge Codeforces/SPOC
+    programs that start late keep one thread busy after the others have
+    finished. Each request gets an estimated cost:
+
+        prompt tokens (~4 characters each) x the model's relative_latency
+        (config/models.json; models without one get
+        scheduling.default_relative_latency when the registry is loaded)
+
+    and is scheduled with one of these policies:
+
+    - fifo      file order (the old behaviour)
+    - longest   most expensive first (LPT): the long requests overlap with
+                the short ones instead of running alone at the end
+    - buckets   power-of-two length buckets, longest bucket first, file
+                order inside a bucket. The tail is nearly as short as with
+                'longest', and a checkpoint still fills in roughly file order
+
+    Both shorten the run and nearly remove the drain at the end. The price
+    is a later mean completion, since short requests wait behind long ones.
+
+Usage:
+    from length_scheduling import order_tasks
+    tasks = order_tasks(tasks, models, 'longest')    # (task_id, model_key, prompt[, tags])
+
+    python scripts/length_scheduling.py --benchmark  # stub endpoint: FIFO vs longest vs buckets
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+
+from scan_data_quality import estimate_tokens
+
+
+POLICIES = ('fifo', 'longest', 'buckets')
+DEFAULT_RELATIVE_LATENCY = 1.0
+
+
+def estimate_cost(model_key, prompt, models=None):
+    """Relative cost of one request: prompt tokens x model relative_latency"""
+    entry = (models or {}).get(model_key, {})
+    return estimate_tokens(prompt) * entry.get('relative_latency', DEFAULT_RELATIVE_LATENCY)
+
+
+def length_bucket(cost):
+    """Power-of-two bucket of a cost (0 for anything below 1)"""
+    return max(int(cost), 1).bit_length()
+
+
+def order_tasks(tasks, models=None, policy='fifo'):
+    """
+    Order (task_id, model_key, prompt[, tags]) tuples by a scheduling policy.
+
+    Returns:
+        list: The tasks in dispatch order (sorting is stable, so ties keep
+        file order)
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown scheduling policy '{policy}' (use one of {', '.join(POLICIES)})")
+    tasks = list(tasks)
+    if policy == 'fifo':
+        return tasks
+    costs = [estimate_cost(task[1], task[2], models) for task in tasks]
+    if policy == 'longest':
+        key = lambda i: -costs[i]
+    else:
+        key = lambda i: -length_bucket(costs[i])
+    return [tasks[i] for i in sorted(range(len(tasks)), key=key)]
+
+
+def order_records(records, models=None, policy='fifo', text=None):
+    """
+    Order records (for enqueueing) by the cost of their prompt over all models.
+
+    text(record) gives the prompt text; buggy_code + problem_description by default.
+    """
+    if policy == 'fifo':
+        return list(records)
+    text = text or (lambda r: (r.get('buggy_code') or '') + (r.get('problem_description') or ''))
+    weight = sum(entry.get('relative_latency', DEFAULT_RELATIVE_LATENCY)
+                 for entry in (models or {}).values()) or DEFAULT_RELATIVE_LATENCY
+    tasks = [(i, None, text(record)) for i, record in enumerate(records)]
+    ordered = order_tasks(tasks, {None: {'relative_latency': weight}}, policy)
+    return [records[i] for i, _, _ in ordered]
+
+
+def add_schedule_argument(parser):
+    """Add the shared --schedule flag"""
+    parser.add_argument('--schedule', choices=POLICIES, default='fifo',
+                        help="Request order: file order, longest first, or length buckets")
+    return parser
+
+
+# ========================================
+# Benchmark against a local stub endpoint
+# ========================================
+
+def _stub_server(seconds_per_token, base_seconds):
+    """HTTP stub whose latency grows with the prompt length, like a provider"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            time.sleep(base_seconds + body['tokens'] * body['relative_latency'] * seconds_per_token)
+            payload = json.dumps({'prediction': 'COMPUTATION'}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _synthetic_tasks(n, models, seed=0):
+    """Mostly short snippets plus a few large programs, in random (file) order"""
+    rng = random.Random(seed)
+    keys = list(models)
+    tasks = []
+    for i in range(n):
+        roll = rng.random()
+        if roll < 0.80:
+            tokens = rng.randint(60, 400)        # PyPal / Yaksh snippets
+        elif roll < 0.97:
+            tokens = rng.randint(400, 2000)      # typical C/C++
+        else:
+            tokens = rng.randint(4000, 8000)     # large Codeforces / SPOC programs
+        tasks.append((i, rng.choice(keys), 'x' * (tokens * 4)))
+    return tasks
+
+
+def _run(tasks, models, url, workers):
+    """Dispatch tasks in order over a thread pool; returns per-task finish times"""
+    import urllib.request
+    from concurrent.futures import ThreadPoolExecutor
+
+    def call(task):
+        _, model_key, prompt = task[:3]
+        body = json.dumps({'tokens': estimate_tokens(prompt),
+                           'relative_latency': models[model_key].get('relative_latency', 1.0)}).encode('utf-8')
+        request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request) as response:
+            response.read()
+        return time.perf_counter()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        finished = list(executor.map(call, tasks))
+    return [t - start for t in finished]
+
+
+def benchmark(n=400, workers=8, seconds_per_token=0.00005, base_seconds=0.01):
+    """Makespan, drain time and mean completion per policy on a stub endpoint"""
+    from hedging import percentile
+    from llm_clients import load_model_registry
+
+    models, _ = load_model_registry()
+    tasks = _synthetic_tasks(n, models)
+    server = _stub_server(seconds_per_token, base_seconds)
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    print("="*80)
+    print(f"⏱️  SCHEDULING BENCHMARK ({n} requests, {workers} workers, stub endpoint)")
+    print("="*80)
+    print(f"{'Policy':<10} {'Makespan s':>11} {'Drain s':>9} {'Mean done s':>12} {'p50 done s':>11} {'Idle %':>8}")
+    print("-"*80)
+    work = sum(base_seconds + estimate_cost(t[1], t[2], models) * seconds_per_token for t in tasks)
+    results = {}
+    try:
+        for policy in POLICIES:
+            finished = _run(order_tasks(tasks, models, policy), models, url, workers)
+            makespan = max(finished)
+            drain = makespan - percentile(finished, 95)
+            idle = max(0.0, 1 - work / (makespan * workers)) * 100
+            results[policy] = makespan
+            print(f"{policy:<10} {makespan:>11.2f} {drain:>9.2f} {sum(finished) / len(finished):>12.2f} "
+                  f"{percentile(finished, 50):>11.2f} {idle:>7.1f}%")
+    finally:
+        server.shutdown()
+    print("-"*80)
+    print("Drain = time from 95% of requests done to the last one; Idle = unused worker time")
+    for policy in POLICIES[1:]:
+        print(f"  {policy}: run {(1 - results[policy] / results['fifo']) * 100:.1f}% shorter than fifo")
+    print("="*80)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Length-aware request scheduling")
+    parser.add_argument('--benchmark', action='store_true', help="Compare policies on a local stub endpoint")
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.requests, args.workers)
+    else:
+        parser.print_help()
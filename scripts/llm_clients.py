@@ -0,0 +1,388 @@
+"""
+Shared LLM Client Helpers
+=========================
+
+Purpose:
+    One place for the model registry (config/models.json) and the provider
+    calls used by the newer prediction runners. Unlike the predict_* helpers
+    in the older run_predictions_*.py scripts, these return a result dict so
+    callers can see the confidence and raw response, not just the code.
+
+Result dict:
+    {
+        'model': 'qwen',
+        'prediction': 'LOOP_COND' | 'PARSE_ERROR' | 'RATE_LIMITED' | ...,
+        'confidence': 0.93 or None,
+        'raw': '<model text>',
+        'attempts': 1,
+        'usage': {'prompt_tokens': 412, 'completion_tokens': 5} or None
+    }
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import json
+import math
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from cost_accounting import BUDGET_EXHAUSTED, usage_from_gemini, usage_from_hf
+from length_scheduling import order_tasks
+from request_trace import NULL_TRACER
+from single_flight import SingleFlight
+from telemetry import NULL_TELEMETRY
+
+
+VALID_CODES = ['LOOP_COND', 'COND_BRANCH', 'STMT_INTEGRITY',
+               'IO_FORMAT', 'VAR_INIT', 'DATA_TYPE', 'COMPUTATION']
+
+HF_API_URL = "https://router.huggingface.co/v1/chat/completions"
+
+# Identical (model, prompt) requests in flight at the same time share one call
+REQUEST_FLIGHTS = SingleFlight()
+
+# Appended to the prompt when a model cannot give us logprobs (Gemini) or
+# when the caller asks for a self-reported confidence explicitly
+CONFIDENCE_INSTRUCTION = (
+    "\n\nAfter the category code, on a new line, write CONFIDENCE: followed by "
+    "a number between 0 and 1 showing how sure you are."
+)
+
+
+def load_config(config_path=None):
+    """Load API configuration (config/api_keys.json unless a path is given)"""
+    config_path = config_path or Path(__file__).parent.parent / 'config' / 'api_keys.json'
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_model_registry():
+    """
+    Load config/models.json.
+
+    Returns:
+        tuple: (models, settings) where models is an ordered dict of
+        model key -> entry and settings holds the non-model sections
+    """
+    registry_path = Path(__file__).parent.parent / 'config' / 'models.json'
+    with open(registry_path, 'r', encoding='utf-8') as f:
+        registry = json.load(f)
+
+    models = {entry['key']: entry for entry in registry['models']}
+    settings = {k: v for k, v in registry.items() if k != 'models'}
+
+    # Models without their own relative_latency get the scheduling default
+    default_latency = settings.get('scheduling', {}).get('default_relative_latency')
+    if default_latency is not None:
+        for entry in models.values():
+            entry.setdefault('relative_latency', default_latency)
+    return models, settings
+
+
+def resolve_model_key(column, models):
+    """Registry key for a predictions column (handles aliases like gpt_oss)"""
+    if column in models:
+        return column
+    for key, entry in models.items():
+        if column in entry.get('aliases', []):
+            return key
+    return None
+
+
+def extract_category_code(response_text):
+    """Extract category code from model response"""
+    text = response_text.strip().upper()
+    text = re.sub(r'</?THINK>', '', text, flags=re.IGNORECASE)
+
+    # Look for exact code matches
+    for code in VALID_CODES:
+        pattern = r'\b' + re.escape(code) + r'\b'
+        if re.search(pattern, text):
+            return code
+
+    # Check last lines for answer
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    for line in reversed(lines[-5:]):
+        for code in VALID_CODES:
+            if code in line and len(line) < 50:
+                return code
+
+    return "PARSE_ERROR"
+
+
+def extract_self_reported_confidence(response_text):
+    """Read a 'CONFIDENCE: 0.8' line from the response (None if missing)"""
+    match = re.search(r'CONFIDENCE\s*[:=]\s*([01](?:\.\d+)?|\.\d+)', response_text, re.IGNORECASE)
+    if not match:
+        return None
+    return min(max(float(match.group(1)), 0.0), 1.0)
+
+
+def logprob_confidence(choice):
+    """
+    Joint probability of the generated answer from OpenAI-style logprobs.
+
+    The answer line is only the code, so exp(sum of its token logprobs) is a
+    fair estimate of how sure the model is. Tokens after the first line (e.g.
+    a self-reported CONFIDENCE line) are not counted.
+    """
+    logprobs = (choice.get('logprobs') or {}).get('content') or []
+    if not logprobs:
+        return None
+
+    total = 0.0
+    seen_text = False
+    for token in logprobs:
+        text = token.get('token', '')
+        if '\n' in text and seen_text:
+            break
+        seen_text = seen_text or bool(text.strip())
+        total += token.get('logprob', 0.0)
+    return math.exp(total)
+
+
+def _result(model_key, prediction, confidence=None, raw='', attempts=1, usage=None):
+    return {
+        'model': model_key,
+        'prediction': prediction,
+        'confidence': confidence,
+        'raw': raw,
+        'attempts': attempts,
+        'usage': usage
+    }
+
+
+_connections = threading.local()
+_gemini_clients = {}
+_gemini_lock = threading.Lock()
+
+
+def http_session():
+    """Per-thread requests.Session, so HF calls reuse their TLS connection"""
+    session = getattr(_connections, 'session', None)
+    if session is None:
+        import requests
+        session = _connections.session = requests.Session()
+    return session
+
+
+def gemini_client(api_key):
+    """One google-genai client per API key (created on first use)"""
+    with _gemini_lock:
+        if api_key not in _gemini_clients:
+            from google import genai    # slow to import, and only needed for Gemini
+            _gemini_clients[api_key] = genai.Client(api_key=api_key, http_options={'api_version': 'v1'})
+        return _gemini_clients[api_key]
+
+
+def request_gemini(prompt, config, model_key='gemini', self_report=False, telemetry=None):
+    """Get a prediction from Gemini (confidence is self-reported only)"""
+    telemetry = telemetry or NULL_TELEMETRY
+    if self_report:
+        prompt = prompt + CONFIDENCE_INSTRUCTION
+
+    with telemetry.attempt(model_key, 1, prompt) as call:
+        try:
+            client = gemini_client(config['gemini']['api_key'])
+
+            response = client.models.generate_content(
+                model=config['gemini']['model'],
+                contents=prompt
+            )
+
+            text = response.text or ''
+            confidence = extract_self_reported_confidence(text) if self_report else None
+            result = _result(model_key, extract_category_code(text), confidence, text,
+                             usage=usage_from_gemini(response))
+            call.finish(result['prediction'], 200, text)
+            return result
+        except Exception as e:
+            error_msg = str(e)
+            if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
+                call.finish("QUOTA_EXCEEDED", 429)
+                return _result(model_key, "QUOTA_EXCEEDED")
+            call.finish("ERROR", response=type(e).__name__)
+            return _result(model_key, "ERROR")
+
+
+def request_huggingface(prompt, model_name, config, model_key=None, max_retries=3,
+                        with_logprobs=False, self_report=False, max_tokens=150, telemetry=None):
+    """Get a prediction from the Hugging Face router with retry logic"""
+    model_key = model_key or model_name
+    telemetry = telemetry or NULL_TELEMETRY
+    if self_report:
+        prompt = prompt + CONFIDENCE_INSTRUCTION
+
+    for attempt in range(max_retries):
+        try:
+            headers = {
+                "Authorization": f"Bearer {config['deepseek']['api_key']}",
+                "Content-Type": "application/json"
+            }
+
+            payload = {
+                "model": model_name,
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": max_tokens,
+                "temperature": 0.1
+            }
+            if with_logprobs:
+                payload["logprobs"] = True
+                payload["top_logprobs"] = 1
+
+            with telemetry.attempt(model_key, attempt + 1, prompt) as call:
+                response = http_session().post(HF_API_URL, headers=headers, json=payload, timeout=90)
+
+                if response.status_code == 200:
+                    body = response.json()
+                    choice = body['choices'][0]
+                    raw_response = choice['message']['content'] or ''
+                    confidence = logprob_confidence(choice) if with_logprobs else None
+                    if confidence is None and self_report:
+                        confidence = extract_self_reported_confidence(raw_response)
+                    prediction = extract_category_code(raw_response)
+                    call.finish(prediction, 200, raw_response)
+                    return _result(model_key, prediction, confidence, raw_response, attempt + 1,
+                                   usage_from_hf(body))
+
+                status = {429: "RATE_LIMITED", 400: "MODEL_NOT_AVAILABLE"}.get(response.status_code, "ERROR")
+                call.finish(status, response.status_code)
+
+            if response.status_code == 429:
+                if attempt < max_retries - 1:
+                    telemetry.sleep(model_key, 15 * (attempt + 1), 'rate_limit_wait')
+                    continue
+                return _result(model_key, "RATE_LIMITED", attempts=attempt + 1)
+            elif response.status_code == 400:
+                return _result(model_key, "MODEL_NOT_AVAILABLE", attempts=attempt + 1)
+            else:
+                return _result(model_key, "ERROR", attempts=attempt + 1)
+
+        except Exception:
+            if attempt < max_retries - 1:
+                telemetry.sleep(model_key, 10, 'backoff')
+                continue
+            return _result(model_key, "ERROR", attempts=attempt + 1)
+
+    return _result(model_key, "ERROR", attempts=max_retries)
+
+
+def request_prediction(model_key, prompt, config, models=None, with_confidence=False, telemetry=None,
+                       coalesce=True):
+    """
+    Get a prediction from any model in the registry.
+
+    Args:
+        model_key (str): Key from config/models.json (e.g. 'qwen')
+        prompt (str): Classification prompt
+        config (dict): API keys from config/api_keys.json
+        models (dict): Registry from load_model_registry() (loaded if None)
+        with_confidence (bool): Ask for logprobs (HF) or a self-reported
+            confidence (Gemini, or HF models that return no logprobs)
+        telemetry (Telemetry): Optional per-attempt instrumentation
+        coalesce (bool): Share the call with identical requests already in
+            flight (REQUEST_FLIGHTS); the copies they get are marked
+            'coalesced': True. Hedged duplicates pass False, since they
+            exist to make a second, independent call
+
+    Returns:
+        dict: Result dict (see module docstring)
+    """
+    if models is None:
+        models, _ = load_model_registry()
+    entry = models[model_key]
+
+    call = lambda: _request_provider(model_key, prompt, config, entry, with_confidence, telemetry)
+    if not coalesce:
+        return call()
+    result, shared = REQUEST_FLIGHTS.do((model_key, entry['model'], bool(with_confidence), prompt), call)
+    return dict(result, coalesced=True) if shared else result
+
+
+def _request_provider(model_key, prompt, config, entry, with_confidence, telemetry):
+
+    if entry['provider'] == 'gemini':
+        return request_gemini(prompt, config, model_key, self_report=with_confidence,
+                              telemetry=telemetry)
+
+    # Ask for both: logprobs when the provider supports them, the
+    # self-reported line otherwise
+    return request_huggingface(prompt, entry['model'], config, model_key,
+                               with_logprobs=with_confidence,
+                               self_report=with_confidence,
+                               telemetry=telemetry)
+
+
+def request_concurrently(tasks, config, models=None, max_workers=4, per_model_limit=2,
+                         breakers=None, with_confidence=False, cache=None, telemetry=None,
+                         tracer=None, costs=None, schedule='fifo'):
+    """
+    Run many predictions in parallel, yielding results as they finish.
+
+    Args:
+        tasks (iterable): (task_id, model_key, prompt) tuples, optionally
+            with a fourth item {'source': ..., 'language': ...} used to
+            group token costs
+        config (dict): API keys
+        models (dict): Registry from load_model_registry() (loaded if None)
+        max_workers (int): Total threads
+        per_model_limit (int): Max in-flight calls per model, so one
+            provider's rate limit is not hit by every thread at once
+        breakers (BreakerRegistry): Optional circuit breakers; skipped calls
+            come back with prediction CIRCUIT_OPEN
+        with_confidence (bool): Passed to request_prediction()
+        cache (ResponseCache): Optional cache; hits skip the API call
+        telemetry (Telemetry): Optional per-attempt instrumentation
+        tracer (TraceRecorder): Optional timeline; one span per task
+        costs (CostTracker): Optional token/cost accounting; once the
+            budget is exhausted, remaining tasks come back as
+            BUDGET_EXHAUSTED without a call. Cache hits are marked
+            'cached': True and cost nothing.
+        schedule (str): Dispatch order: 'fifo' (as given), 'longest' or
+            'buckets' (see length_scheduling.py)
+
+    Yields:
+        tuple: (task_id, result dict)
+    """
+    if models is None:
+        models, _ = load_model_registry()
+    limits = {key: threading.Semaphore(per_model_limit) for key in models}
+    tracer = tracer or NULL_TRACER
+
+    def run(task_id, model_key, prompt, tags=None):
+        with tracer.span(model_key, record_id=str(task_id), model=model_key) as span:
+            cache_key = None
+            if cache is not None:
+                cache_key = cache.make_key(model_key, models[model_key]['model'], prompt, with_confidence)
+                cached = cache.get(cache_key)
+                span['cached'] = cached is not None
+                if cached is not None:
+                    cached['cached'] = True
+                    return cached
+
+            if costs is not None and costs.exhausted():
+                span['skipped'] = BUDGET_EXHAUSTED
+                return _result(model_key, BUDGET_EXHAUSTED, attempts=0)
+
+            with limits[model_key]:
+                call = lambda: request_prediction(model_key, prompt, config, models, with_confidence,
+                                                  telemetry)
+                result = call() if breakers is None else breakers.call(model_key, call)
+                if isinstance(result, str):
+                    return _result(model_key, result)
+
+            if costs is not None:
+                costs.add_result(result, **(tags or {}))
+
+            if cache is not None:
+                cache.put(cache_key, result)
+            return result
+
+    tasks = order_tasks(tasks, models, schedule)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run, *task): task[0] for task in tasks}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
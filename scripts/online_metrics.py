@@ -0,0 +1,163 @@
+"""
+Online Metrics
+==============
+
+Purpose:
+    Running validity / agreement numbers while a prediction run is still in
+    flight, so a broken parser or a dead model shows up after a few dozen
+    records instead of at the end of a multi-hour run.
+
+    Every accumulator is a counter, so adding (or removing) a record costs
+    O(models²) regardless of how many records were seen:
+
+    - per-model valid / invalid counts and valid rate
+    - per-model histogram of non-valid outputs (ERROR, RATE_LIMITED, ...)
+    - pairwise confusion counts and raw agreement for every model pair
+    - records with all models valid, unanimous, and in conflict
+
+Output:
+    A small JSON status file, rewritten every N records (atomic replace),
+    plus a one-screen console summary.
+
+Usage:
+    from online_metrics import OnlineMetrics
+    metrics = OnlineMetrics(['gemini', 'qwen', 'llama'], status_file=path, every=25)
+    metrics.add_record(row)          # after each record
+    metrics.replace_record(old_row, new_row)   # after a retried prediction
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import json
+import os
+import time
+from itertools import combinations
+from pathlib import Path
+
+
+VALID_CODES = ['LOOP_COND', 'COND_BRANCH', 'STMT_INTEGRITY',
+               'IO_FORMAT', 'VAR_INIT', 'DATA_TYPE', 'COMPUTATION']
+
+CODE_INDEX = {code: i for i, code in enumerate(VALID_CODES)}
+
+
+class OnlineMetrics:
+    """Streaming accumulators over prediction rows"""
+
+    def __init__(self, models, status_file=None, every=25):
+        self.models = list(models)
+        self.pairs = list(combinations(self.models, 2))
+        self.status_file = Path(status_file) if status_file else None
+        self.every = every
+        self.started = time.time()
+
+        self.records = 0
+        self.valid = {m: 0 for m in self.models}
+        self.errors = {m: {} for m in self.models}
+        self.confusion = {pair: [[0] * len(VALID_CODES) for _ in VALID_CODES] for pair in self.pairs}
+        self.pair_agree = {pair: 0 for pair in self.pairs}
+        self.pair_total = {pair: 0 for pair in self.pairs}
+        self.all_valid = 0
+        self.unanimous = 0
+
+    def _apply(self, row, sign):
+        labels = {}
+        for m in self.models:
+            value = row.get(m)
+            if value in CODE_INDEX:
+                labels[m] = CODE_INDEX[value]
+                self.valid[m] += sign
+            else:
+                key = str(value) if value is not None else 'MISSING'
+                self.errors[m][key] = self.errors[m].get(key, 0) + sign
+                if not self.errors[m][key]:
+                    del self.errors[m][key]
+
+        for pair in self.pairs:
+            a, b = pair
+            if a in labels and b in labels:
+                self.confusion[pair][labels[a]][labels[b]] += sign
+                self.pair_total[pair] += sign
+                if labels[a] == labels[b]:
+                    self.pair_agree[pair] += sign
+
+        if len(labels) == len(self.models):
+            self.all_valid += sign
+            if len(set(labels.values())) == 1:
+                self.unanimous += sign
+        self.records += sign
+
+    def add_record(self, row):
+        """Count a finished prediction row; writes the status file every N records"""
+        self._apply(row, 1)
+        if self.every and self.records % self.every == 0:
+            self.report()
+
+    def add_records(self, rows):
+        """Count rows loaded from a progress file (no per-row reporting)"""
+        for row in rows:
+            self._apply(row, 1)
+
+    def replace_record(self, old_row, new_row):
+        """Swap a counted row for its revised version (e.g. retried cells)"""
+        self._apply(old_row, -1)
+        self._apply(new_row, 1)
+
+    def summary(self):
+        """Current numbers as a JSON-serializable dict"""
+        rate = lambda num, den: round(num / den, 4) if den else None
+        return {
+            'updated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'elapsed_seconds': round(time.time() - self.started, 1),
+            'records': self.records,
+            'models': {
+                m: {
+                    'valid': self.valid[m],
+                    'valid_rate': rate(self.valid[m], self.records),
+                    'errors': dict(sorted(self.errors[m].items(), key=lambda x: -x[1]))
+                }
+                for m in self.models
+            },
+            'all_valid': self.all_valid,
+            'unanimous': self.unanimous,
+            'conflicts': self.all_valid - self.unanimous,
+            'conflict_rate': rate(self.all_valid - self.unanimous, self.all_valid),
+            'pairs': {
+                f"{a}|{b}": {
+                    'both_valid': self.pair_total[(a, b)],
+                    'agreement': rate(self.pair_agree[(a, b)], self.pair_total[(a, b)]),
+                    'confusion': self.confusion[(a, b)]
+                }
+                for a, b in self.pairs
+            }
+        }
+
+    def write_status(self, summary=None):
+        """Atomically replace the status file"""
+        if not self.status_file:
+            return
+        summary = summary or self.summary()
+        self.status_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.status_file.with_suffix(self.status_file.suffix + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        os.replace(tmp, self.status_file)
+
+    def report(self):
+        """Print a compact summary and refresh the status file"""
+        summary = self.summary()
+        print(f"\n  📈 Live metrics ({summary['records']} records)")
+        for m, stats in summary['models'].items():
+            rate = stats['valid_rate'] * 100 if stats['valid_rate'] is not None else 0
+            top = ', '.join(f"{k}={v}" for k, v in list(stats['errors'].items())[:3])
+            print(f"     {m:<10} {rate:5.1f}% valid" + (f"  ({top})" if top else ""))
+        for pair, stats in summary['pairs'].items():
+            if stats['agreement'] is not None:
+                print(f"     {pair.replace('|', ' vs '):<22} {stats['agreement'] * 100:5.1f}% agree"
+                      f" ({stats['both_valid']} both valid)")
+        if summary['conflict_rate'] is not None:
+            print(f"     conflicts (all valid)  {summary['conflicts']}/{summary['all_valid']}"
+                  f" ({summary['conflict_rate'] * 100:.1f}%)")
+        self.write_status(summary)
+        return summary
@@ -0,0 +1,386 @@
+"""
+Binary Predictions Store
+========================
+
+Purpose:
+    Compact, memory-mappable alternative to the indented predictions JSON
+    files. A store is a directory holding:
+
+    - labels.npy      uint8 records × models cells (codes in labels.py:
+                      0..6 categories, 16.. ERROR / RATE_LIMITED / ...,
+                      64.. other strings, 254 null, 255 no cell)
+    - ids.npy         unified_id column (fixed-width unicode)
+    - sources.npy     source_dataset codes  } names in meta.json
+    - languages.npy   language codes        }
+    - meta.json       models, code tables and run metadata
+    - extras.json     everything else, per record: timestamps, *_confidence
+                      and cascade_* fields, and the rest of nested
+                      {'prediction': ...} cells
+
+    The .npy files open with np.load(mmap_mode='r'), so analysis of
+    millions of predictions starts without parsing anything. Conversion is
+    lossless: to_rows() gives back rows equal to the JSON file's, and
+    convert checks that before returning.
+
+Usage:
+    python scripts/predictions_store.py convert outputs/predictions/predictions_300_final.json
+    python scripts/predictions_store.py export outputs/predictions/predictions_300_final.preds
+    python scripts/predictions_store.py benchmark
+
+    store = PredictionsStore.open(path)
+    matrix = store.to_label_matrix()        # analyze_results.LabelMatrix
+    rows = load_predictions(path)           # JSON / JSONL file or store, same rows
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from analyze_results import LabelMatrix, build_label_matrix, is_model_column
+from jsonl_io import read_records
+from labels import (ABSENT_CELL, CATEGORY_CODES, EXTRA_BASE, MAX_EXTRA_LABELS, NULL_CELL,
+                    STATUS_BASE, STATUS_CODES, STORE_INDEX, store_to_label_codes)
+
+
+FORMAT_VERSION = 1
+STORE_SUFFIX = '.preds'
+
+# Code for a record without a source_dataset / language key
+ABSENT_CATEGORY = np.iinfo(np.uint16).max
+
+_ABSENT = object()
+
+
+def is_store(path):
+    path = Path(path)
+    return path.is_dir() and (path / 'meta.json').exists()
+
+
+def load_predictions(path):
+    """Prediction rows from a JSON / JSONL file or a store"""
+    if is_store(path):
+        return PredictionsStore.open(path, mmap=False).to_rows()
+    return read_records(path)
+
+
+class _Categories:
+    """First-seen string -> uint16 code table"""
+
+    def __init__(self):
+        self.names = []
+        self.index = {}
+
+    def code(self, value):
+        if value is _ABSENT:
+            return ABSENT_CATEGORY
+        if value not in self.index:
+            self.index[value] = len(self.names)
+            self.names.append(value)
+        return self.index[value]
+
+
+class PredictionsStore:
+    """Predictions as a uint8 cell matrix plus id / metadata columns"""
+
+    def __init__(self, ids, models, cells, source_names, source_codes, language_names,
+                 language_codes, extra_labels=(), metadata=None, extras=None, path=None):
+        self.ids = ids
+        self.models = list(models)
+        self.cells = cells
+        self.source_names = list(source_names)
+        self.source_codes = source_codes
+        self.language_names = list(language_names)
+        self.language_codes = language_codes
+        self.extra_labels = list(extra_labels)
+        self.metadata = metadata or {}
+        self._extras = extras
+        self.path = Path(path) if path else None
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ========================================
+    # JSON rows <-> store
+    # ========================================
+
+    @classmethod
+    def from_rows(cls, rows, metadata=None):
+        """Encode prediction rows (any mix of plain and {'prediction': ...} cells)"""
+        models = []
+        for row in rows:
+            for column, value in row.items():
+                if (column not in models and column != 'unified_id' and is_model_column(column)
+                        and (value is None or isinstance(value, (str, dict)))):
+                    models.append(column)
+        model_index = {m: j for j, m in enumerate(models)}
+
+        cells = np.full((len(rows), len(models)), ABSENT_CELL, dtype=np.uint8)
+        sources, languages = _Categories(), _Categories()
+        source_codes = np.empty(len(rows), dtype=np.uint16)
+        language_codes = np.empty(len(rows), dtype=np.uint16)
+        extra_labels, extra_index = [], {}
+        extras = {}
+
+        def encode(prediction):
+            if prediction is _ABSENT:
+                return ABSENT_CELL
+            if prediction is None:
+                return NULL_CELL
+            code = STORE_INDEX.get(prediction)
+            if code is not None:
+                return code
+            if prediction not in extra_index:
+                if len(extra_labels) >= MAX_EXTRA_LABELS:
+                    raise ValueError(f"More than {MAX_EXTRA_LABELS} distinct non-standard labels")
+                extra_index[prediction] = EXTRA_BASE + len(extra_labels)
+                extra_labels.append(prediction)
+            return extra_index[prediction]
+
+        for i, row in enumerate(rows):
+            source_codes[i] = sources.code(row.get('source_dataset', _ABSENT))
+            language_codes[i] = languages.code(row.get('language', _ABSENT))
+            fields, nested = {}, {}
+            for column, value in row.items():
+                if column in ('unified_id', 'source_dataset', 'language'):
+                    continue
+                j = model_index.get(column)
+                if j is None or not (value is None or isinstance(value, (str, dict))):
+                    fields[column] = value
+                elif isinstance(value, dict):
+                    nested[column] = {k: v for k, v in value.items() if k != 'prediction'}
+                    prediction = value.get('prediction', _ABSENT)
+                    if prediction is not _ABSENT and not (prediction is None or isinstance(prediction, str)):
+                        nested[column]['prediction'] = prediction
+                        prediction = _ABSENT
+                    cells[i, j] = encode(prediction)
+                else:
+                    cells[i, j] = encode(value)
+            if fields or nested:
+                extras[str(i)] = {k: v for k, v in (('fields', fields), ('cells', nested)) if v}
+
+        ids = np.array([row['unified_id'] for row in rows], dtype=str)
+        return cls(ids, models, cells, sources.names, source_codes, languages.names,
+                   language_codes, extra_labels, metadata, extras)
+
+    @property
+    def extras(self):
+        """Per-record side fields (loaded on first use)"""
+        if self._extras is None:
+            extras_file = self.path / 'extras.json' if self.path else None
+            if extras_file and extras_file.exists():
+                with open(extras_file, 'r', encoding='utf-8') as f:
+                    self._extras = json.load(f)
+            else:
+                self._extras = {}
+        return self._extras
+
+    def lookup_table(self):
+        """uint8 cell -> label string (None for null / absent cells)"""
+        table = np.full(256, None, dtype=object)
+        table[:len(CATEGORY_CODES)] = CATEGORY_CODES
+        table[STATUS_BASE:STATUS_BASE + len(STATUS_CODES)] = STATUS_CODES
+        table[EXTRA_BASE:EXTRA_BASE + len(self.extra_labels)] = self.extra_labels
+        return table
+
+    def decoded(self, model):
+        """Label strings of one model column"""
+        return self.lookup_table()[np.asarray(self.cells[:, self.models.index(model)])]
+
+    def to_rows(self):
+        """Rows equal to the ones the store was built from"""
+        table = self.lookup_table()
+        cells = np.asarray(self.cells)
+        extras = self.extras
+        rows = []
+        for i in range(len(self)):
+            row = {'unified_id': str(self.ids[i])}
+            for key, names, codes in (('source_dataset', self.source_names, self.source_codes),
+                                      ('language', self.language_names, self.language_codes)):
+                if codes[i] != ABSENT_CATEGORY:
+                    row[key] = names[codes[i]]
+            extra = extras.get(str(i), {})
+            nested = extra.get('cells', {})
+            for j, model in enumerate(self.models):
+                code = cells[i, j]
+                if model in nested:
+                    cell = {} if code == ABSENT_CELL else {'prediction': table[code]}
+                    cell.update(nested[model])
+                    row[model] = cell
+                elif code != ABSENT_CELL:
+                    row[model] = table[code]
+            row.update(extra.get('fields', {}))
+            rows.append(row)
+        return rows
+
+    def to_label_matrix(self):
+        """analyze_results.LabelMatrix over the (memory-mapped) cells"""
+        return LabelMatrix.from_codes(
+            self.ids, self.models, store_to_label_codes(self.cells),
+            [name if name is not None else 'Unknown' for name in self.source_names] + ['Unknown'],
+            np.minimum(self.source_codes, len(self.source_names)),
+            [name if name is not None else 'Unknown' for name in self.language_names] + ['Unknown'],
+            np.minimum(self.language_codes, len(self.language_names))
+        )
+
+    # ========================================
+    # Disk format
+    # ========================================
+
+    def save(self, path):
+        """Write the store directory (replaced as a whole)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=path.name + '.', dir=path.parent))
+
+        np.save(tmp / 'labels.npy', np.ascontiguousarray(self.cells))
+        np.save(tmp / 'ids.npy', np.asarray(self.ids, dtype=str))
+        np.save(tmp / 'sources.npy', np.asarray(self.source_codes, dtype=np.uint16))
+        np.save(tmp / 'languages.npy', np.asarray(self.language_codes, dtype=np.uint16))
+        meta = {
+            'format_version': FORMAT_VERSION,
+            'rows': len(self),
+            'models': self.models,
+            'source_names': self.source_names,
+            'language_names': self.language_names,
+            'extra_labels': self.extra_labels,
+            'metadata': self.metadata
+        }
+        with open(tmp / 'meta.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False)
+        with open(tmp / 'extras.json', 'w', encoding='utf-8') as f:
+            json.dump(self.extras, f, ensure_ascii=False, separators=(',', ':'))
+
+        if path.exists():
+            shutil.rmtree(path)
+        os.replace(tmp, path)
+        self.path = path
+        return path
+
+    @classmethod
+    def open(cls, path, mmap=True):
+        """Open a store; the .npy columns are memory-mapped unless mmap=False"""
+        path = Path(path)
+        with open(path / 'meta.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported store format {meta.get('format_version')}")
+        mode = 'r' if mmap else None
+        return cls(
+            np.load(path / 'ids.npy', mmap_mode=mode),
+            meta['models'],
+            np.load(path / 'labels.npy', mmap_mode=mode),
+            meta['source_names'],
+            np.load(path / 'sources.npy', mmap_mode=mode),
+            meta['language_names'],
+            np.load(path / 'languages.npy', mmap_mode=mode),
+            meta['extra_labels'],
+            meta['metadata'],
+            path=path
+        )
+
+
+# ========================================
+# Converters
+# ========================================
+
+def convert_json(json_file, output=None):
+    """predictions_*.json -> predictions_*.preds"""
+    json_file = Path(json_file)
+    output = Path(output) if output else json_file.with_suffix(STORE_SUFFIX)
+    rows = read_records(json_file)
+
+    metadata = {'source_file': json_file.name,
+                'converted': datetime.now().isoformat(timespec='seconds')}
+    store = PredictionsStore.from_rows(rows, metadata)
+    store.save(output)
+
+    if store.to_rows() != rows:
+        raise ValueError(f"{json_file}: round trip through the store changed the rows")
+    return store
+
+
+def export_json(store_path, output=None):
+    """predictions_*.preds -> predictions_*.json"""
+    store_path = Path(store_path)
+    output = Path(output) if output else store_path.with_suffix('.json')
+    rows = PredictionsStore.open(store_path, mmap=False).to_rows()
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(rows, f, indent=2, ensure_ascii=False)
+    return output
+
+
+def directory_size(path):
+    return sum(p.stat().st_size for p in Path(path).iterdir())
+
+
+def benchmark(n=500_000, m=6, seed=42):
+    """Load time of n × m predictions: indented JSON vs. memory-mapped store"""
+    rng = np.random.default_rng(seed)
+    labels = np.array(CATEGORY_CODES + ['ERROR', 'PARSE_ERROR', 'RATE_LIMITED'], dtype=object)
+    picks = rng.integers(0, len(labels), size=(n, m))
+    models = [f"model_{j}" for j in range(m)]
+    sources = rng.choice(['Yaksh', 'Codeforces', 'SPOC', 'PyPal', 'DeepFix'], n)
+    rows = [dict({'unified_id': f"ID_{i:07d}", 'source_dataset': sources[i], 'language': 'Python'},
+                 **dict(zip(models, labels[picks[i]])))
+            for i in range(n)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_file = Path(tmp) / 'predictions.json'
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+        store_path = Path(tmp) / 'predictions.preds'
+        PredictionsStore.from_rows(rows).save(store_path)
+        del rows
+
+        start = time.perf_counter()
+        with open(json_file, 'r', encoding='utf-8') as f:
+            build_label_matrix(json.load(f))
+        json_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        PredictionsStore.open(store_path).to_label_matrix()
+        store_seconds = time.perf_counter() - start
+
+        print(f"⏱️  {n:,} records × {m} models ({n * m:,} predictions)")
+        print(f"   JSON  {json_file.stat().st_size / 1e6:>8.1f} MB   load + label matrix {json_seconds * 1000:>8.0f} ms")
+        print(f"   store {directory_size(store_path) / 1e6:>8.1f} MB   open + label matrix {store_seconds * 1000:>8.0f} ms")
+    return json_seconds, store_seconds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Binary predictions store")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help="JSON predictions file(s) -> store")
+    convert_parser.add_argument('files', nargs='+', type=Path)
+    convert_parser.add_argument('--output', type=Path, default=None, help="Store path (single file only)")
+
+    export_parser = subparsers.add_parser('export', help="Store -> JSON predictions file")
+    export_parser.add_argument('store', type=Path)
+    export_parser.add_argument('--output', type=Path, default=None)
+
+    benchmark_parser = subparsers.add_parser('benchmark', help="JSON vs. store load time")
+    benchmark_parser.add_argument('--records', type=int, default=500_000)
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        for json_file in args.files:
+            store = convert_json(json_file, args.output if len(args.files) == 1 else None)
+            print(f"✅ {json_file.name}: {len(store)} records × {len(store.models)} models "
+                  f"({json_file.stat().st_size / 1024:.0f} KB -> {directory_size(store.path) / 1024:.0f} KB), "
+                  f"round trip verified")
+            print(f"   💾 {store.path}")
+    elif args.command == 'export':
+        print(f"💾 Exported to: {export_json(args.store, args.output)}")
+    else:
+        benchmark(args.records)
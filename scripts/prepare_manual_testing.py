@@ -8,7 +8,8 @@ Purpose:
     with formatted prompts for easy copy-paste testing.
 
 Input:
-    - outputs/predictions/predictions_200_final.json (automated predictions)
+    - outputs/predictions/predictions_200_final.json (automated predictions;
+      predictions_200_final.preds is used if only the store exists)
     - data/sample_1000.json (original dataset records)
 
 Output:
@@ -17,16 +18,20 @@ Output:
 
 Usage:
     python scripts/prepare_manual_testing.py
+    python scripts/prepare_manual_testing.py --profile
 
 Author: [Your Name]
 Date: December 2024
 Part of: FOSSEE Internship - Logical Error Classification Study
 """
 
-import json
+import argparse
 import csv
 from pathlib import Path
 
+from jsonl_io import iter_records, resolve_data_file
+from profiling import NULL_PROFILER, Profiler, add_profile_arguments
+
 
 def create_classification_prompt(record):
     """
@@ -94,10 +99,13 @@ YOUR CLASSIFICATION (code only):"""
     return prompt
 
 
-def prepare_manual_testing_200():
+def prepare_manual_testing_200(profiler=NULL_PROFILER):
     """
     Prepare 200 samples for manual testing across 4 LLM platforms.
     
+    Args:
+        profiler (Profiler): Optional stage profiler (--profile)
+    
     Process:
         1. Load automated predictions (Qwen, Llama)
         2. Load original dataset records
@@ -107,6 +115,9 @@ def prepare_manual_testing_200():
     Returns:
         None (creates output files)
     """
+    # NumPy-backed; imported here so --help stays fast
+    from analyze_results import cell_value
+    from predictions_store import is_store, load_predictions
     
     # ========================================
     # LOAD DATA
@@ -114,17 +125,19 @@ def prepare_manual_testing_200():
     
     # Load predictions from 200-sample automated run
     predictions_file = Path(__file__).parent.parent / 'outputs' / 'predictions' / 'predictions_200_final.json'
+    if not predictions_file.exists() and is_store(predictions_file.with_suffix('.preds')):
+        predictions_file = predictions_file.with_suffix('.preds')
     
     print("Loading predictions...")
-    with open(predictions_file, 'r', encoding='utf-8') as f:
-        predictions = json.load(f)
+    with profiler.stage("load predictions"):
+        predictions = load_predictions(predictions_file)
     
     # Load original dataset records for full information
     sample_path = Path(__file__).parent.parent / 'data' / 'sample_1000.json'
     
     print("Loading original dataset...")
-    with open(sample_path, 'r', encoding='utf-8') as f:
-        all_data = {r['unified_id']: r for r in json.load(f)}
+    with profiler.stage("load sample"):
+        all_data = {r['unified_id']: r for r in iter_records(resolve_data_file(sample_path))}
     
     print("="*80)
     print("📊 PREPARING MANUAL TESTING - 200 SAMPLES")
@@ -144,7 +157,7 @@ def prepare_manual_testing_200():
     print("Creating CSV file...")
     csv_file = output_dir / 'manual_testing_200_samples.csv'
     
-    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+    with profiler.stage("export CSV"), open(csv_file, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
         
         # Write header row
@@ -182,18 +195,10 @@ def prepare_manual_testing_200():
             buggy_code = record.get('buggy_code') or ''
             code = (buggy_code[:800] + "...") if len(buggy_code) > 800 else (buggy_code if buggy_code else 'N/A')
             
-            # Extract predictions from nested structure
-            qwen_pred = pred.get('qwen', {})
-            if isinstance(qwen_pred, dict):
-                qwen_result = qwen_pred.get('prediction', 'ERROR')
-            else:
-                qwen_result = qwen_pred or 'ERROR'
+            # Plain or nested {'prediction': ...} cell
+            qwen_result = cell_value(pred.get('qwen')) or 'ERROR'
             
-            llama_pred = pred.get('llama', {})
-            if isinstance(llama_pred, dict):
-                llama_result = llama_pred.get('prediction', 'ERROR')
-            else:
-                llama_result = llama_pred or 'ERROR'
+            llama_result = cell_value(pred.get('llama')) or 'ERROR'
             
             # Write row with automated predictions pre-filled
             writer.writerow([
@@ -223,7 +228,7 @@ def prepare_manual_testing_200():
     print("Creating prompts file...")
     prompts_file = output_dir / 'prompts_200_samples.txt'
     
-    with open(prompts_file, 'w', encoding='utf-8') as f:
+    with profiler.stage("render prompts"), open(prompts_file, 'w', encoding='utf-8') as f:
         # Write header with platform URLs
         f.write("="*80 + "\n")
         f.write("MANUAL TESTING - 200 SAMPLES\n")
@@ -258,17 +263,9 @@ def prepare_manual_testing_200():
             f.write(f"{'='*80}\n\n")
             
             # Show automated predictions for reference
-            qwen_pred = pred.get('qwen', {})
-            if isinstance(qwen_pred, dict):
-                qwen_result = qwen_pred.get('prediction', 'ERROR')
-            else:
-                qwen_result = qwen_pred or 'ERROR'
+            qwen_result = cell_value(pred.get('qwen')) or 'ERROR'
             
-            llama_pred = pred.get('llama', {})
-            if isinstance(llama_pred, dict):
-                llama_result = llama_pred.get('prediction', 'ERROR')
-            else:
-                llama_result = llama_pred or 'ERROR'
+            llama_result = cell_value(pred.get('llama')) or 'ERROR'
             
             f.write(f"📊 Qwen: {qwen_result} | Llama: {llama_result}\n\n")
             f.write(f"{'─'*80}\n\n")
@@ -311,4 +308,10 @@ if __name__ == "__main__":
     
     Executes the preparation workflow and creates necessary files.
     """
-    prepare_manual_testing_200()
+    parser = argparse.ArgumentParser(description="Prepare manual testing files")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    
+    profiler = Profiler.from_args('prepare_manual_testing', args)
+    prepare_manual_testing_200(profiler)
+    profiler.report()
@@ -0,0 +1,209 @@
+"""
+Pipeline Profiling Hooks
+========================
+
+Purpose:
+    Find out why a pipeline script is slow or runs out of memory on the
+    148K corpus. Scripts wrap their named stages (load, standardize, export
+    JSON, export XLSX, summarize, render prompts, analyze, ...) in
+    profiler.stage(); with --profile each stage records:
+
+    - wall time and CPU time (CPU% shows waiting on disk vs. computing)
+    - with --profile-cpu:    a cProfile dump per stage plus its top functions
+    - with --profile-memory: tracemalloc peak / retained memory and the
+                             top allocation sites at the end of the stage
+
+    Without the flags stage() does nothing.
+
+Output:
+    - Per-stage table on the console
+    - outputs/profiles/<script>_<timestamp>.json
+    - outputs/profiles/<script>_<stage>.prof (cProfile, open with snakeviz
+      or python -m pstats)
+
+Usage:
+    python scripts/combine_datasets.py --profile --profile-memory
+    python scripts/dataset_statistics.py --profile-cpu
+
+    parser = argparse.ArgumentParser()
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    profiler = Profiler.from_args('combine_datasets', args)
+    with profiler.stage('export JSON'):
+        ...
+    profiler.report()
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import json
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+
+PROFILE_DIR = Path(__file__).parent.parent / 'outputs' / 'profiles'
+
+MB = 1024 * 1024
+
+
+def add_profile_arguments(parser):
+    """Add the shared --profile / --profile-cpu / --profile-memory flags"""
+    group = parser.add_argument_group('profiling')
+    group.add_argument('--profile', action='store_true', help="Time each stage (wall and CPU)")
+    group.add_argument('--profile-cpu', action='store_true', help="Also run cProfile per stage")
+    group.add_argument('--profile-memory', action='store_true', help="Also track memory with tracemalloc")
+    return parser
+
+
+class Profiler:
+    """Per-stage wall/CPU timers with optional cProfile and tracemalloc"""
+
+    def __init__(self, name, enabled=True, cpu=False, memory=False, output_dir=PROFILE_DIR, top=10):
+        self.name = name
+        self.enabled = enabled or cpu or memory
+        self.cpu = cpu
+        self.memory = memory
+        self.output_dir = Path(output_dir)
+        self.top = top
+        self.stages = []
+
+    @classmethod
+    def from_args(cls, name, args):
+        return cls(name, enabled=args.profile, cpu=args.profile_cpu, memory=args.profile_memory)
+
+    def _slug(self, stage_name):
+        return re.sub(r'[^a-z0-9]+', '_', stage_name.lower()).strip('_')
+
+    @contextmanager
+    def stage(self, stage_name):
+        """Measure one stage (stages should not be nested when cProfile is on)"""
+        if not self.enabled:
+            yield
+            return
+
+        # Loaded only when profiling is on (pstats alone costs ~10 ms of startup)
+        import cProfile
+        import tracemalloc
+
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+
+        profile = cProfile.Profile() if self.cpu else None
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        if profile:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            entry = {
+                'stage': stage_name,
+                'wall_seconds': round(wall, 3),
+                'cpu_seconds': round(cpu, 3),
+                'cpu_percent': round(cpu / wall * 100, 1) if wall > 0 else None
+            }
+            if self.memory:
+                entry.update(self._memory_report(memory_before))
+            if profile:
+                entry.update(self._cpu_report(profile, stage_name))
+            self.stages.append(entry)
+
+    def _memory_report(self, memory_before):
+        import tracemalloc
+
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ])
+        return {
+            'memory_peak_mb': round(peak / MB, 1),
+            'memory_retained_mb': round((current - memory_before) / MB, 1),
+            'top_allocations': [
+                {
+                    'where': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    'size_mb': round(stat.size / MB, 2),
+                    'blocks': stat.count
+                }
+                for stat in snapshot.statistics('lineno')[:self.top]
+            ]
+        }
+
+    def _cpu_report(self, profile, stage_name):
+        import pstats
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        prof_file = self.output_dir / f"{self.name}_{self._slug(stage_name)}.prof"
+        profile.dump_stats(prof_file)
+
+        stats = pstats.Stats(profile).stats
+        ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+        return {
+            'cprofile_file': str(prof_file),
+            'top_functions': [
+                {
+                    'function': f"{Path(filename).name}:{line}({func})",
+                    'calls': calls,
+                    'own_seconds': round(own, 3),
+                    'cumulative_seconds': round(cumulative, 3)
+                }
+                for (filename, line, func), (_, calls, own, cumulative, _) in ranked[:self.top]
+            ]
+        }
+
+    def report(self):
+        """Print the per-stage table and save it as JSON"""
+        if not self.enabled or not self.stages:
+            return None
+
+        print("\n" + "="*80)
+        print(f"⏱️  PROFILE: {self.name}")
+        print("="*80)
+        header = f"{'Stage':<30} {'Wall s':>9} {'CPU s':>9} {'CPU %':>7}"
+        if self.memory:
+            header += f" {'Peak MB':>9} {'Kept MB':>9}"
+        print(header)
+        print("-"*80)
+        for entry in self.stages:
+            cpu_pct = f"{entry['cpu_percent']:.0f}" if entry['cpu_percent'] is not None else "-"
+            line = f"{entry['stage']:<30} {entry['wall_seconds']:>9.2f} {entry['cpu_seconds']:>9.2f} {cpu_pct:>7}"
+            if self.memory:
+                line += f" {entry['memory_peak_mb']:>9.1f} {entry['memory_retained_mb']:>9.1f}"
+            print(line)
+        print("-"*80)
+        total_wall = sum(e['wall_seconds'] for e in self.stages)
+        total_cpu = sum(e['cpu_seconds'] for e in self.stages)
+        print(f"{'Total':<30} {total_wall:>9.2f} {total_cpu:>9.2f}")
+
+        if self.cpu:
+            slowest = max(self.stages, key=lambda e: e['wall_seconds'])
+            print(f"\nTop functions in '{slowest['stage']}' (slowest stage):")
+            for item in slowest['top_functions'][:5]:
+                print(f"  {item['cumulative_seconds']:>8.2f} s   {item['function']}")
+        if self.memory:
+            largest = max(self.stages, key=lambda e: e['memory_peak_mb'])
+            print(f"\nTop allocations in '{largest['stage']}' (highest peak):")
+            for item in largest['top_allocations'][:5]:
+                print(f"  {item['size_mb']:>8.2f} MB  {item['where']}")
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        report_file = self.output_dir / f"{self.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump({'script': self.name, 'stages': self.stages}, f, indent=2)
+        print(f"\n💾 Profile saved to: {report_file}")
+        print("="*80)
+        return report_file
+
+
+NULL_PROFILER = Profiler('disabled', enabled=False)
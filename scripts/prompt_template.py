@@ -1,14 +1,34 @@
 import json
+from functools import lru_cache
 from pathlib import Path
 
+# Compact code and descriptions (code_compaction.py) unless a caller says otherwise
+COMPACT_PROMPTS = False
+
+def enable_compaction(enabled=True):
+    """Turn prompt compaction on for every create_classification_prompt() call"""
+    global COMPACT_PROMPTS
+    COMPACT_PROMPTS = enabled
+
+def add_compact_argument(parser):
+    """Add the shared --compact flag"""
+    parser.add_argument('--compact', action='store_true',
+                        help="Strip comments/whitespace from code and HTML from descriptions in prompts")
+    return parser
+
+@lru_cache(maxsize=1)
 def load_taxonomy():
-    """Load taxonomy categories"""
+    """Load taxonomy categories (read once per process)"""
     config_path = Path(__file__).parent.parent / 'config' / 'taxonomy_categories.json'
     with open(config_path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-def create_classification_prompt(record):
-    """Create prompt for logical error classification"""
+def create_classification_prompt(record, compact=None):
+    """Create prompt for logical error classification (compact: see enable_compaction)"""
+    
+    if COMPACT_PROMPTS if compact is None else compact:
+        from code_compaction import compact_record
+        record = compact_record(record)
     
     taxonomy = load_taxonomy()
     
@@ -34,7 +54,7 @@ PROBLEM DETAILS:
         prompt += f"\nProblem Description:\n{record['problem_description']}\n"
     
     # Add buggy code
-    prompt += f"\nBuggy Code ({record['language']}):\n``````\n"
+    prompt += f"\nBuggy Code ({record['language']}):\n```\n{record.get('buggy_code') or ''}\n```\n"
     
     # Add execution feedback if available
     if record.get('execution_feedback'):
@@ -0,0 +1,177 @@
+"""
+Compact Dataset Records
+=======================
+
+Purpose:
+    One standardized buggy-code record, shared by combine_datasets.py (which
+    creates them) and the scripts that read data/unified_dataset.* back.
+
+    A Record keeps the 12 standardized fields in __slots__ instead of a
+    per-record dict:
+
+    - source_dataset and language are interned, so the 148K records share
+      one 'Codeforces' / 'C++' / 'Python' string each
+    - fields that are None (correct_code, hint, ...) and an empty
+      additional_info are simply not set; reading them still gives None
+
+    Records behave like the old dicts for reading (record['language'],
+    record.get('hint')), and to_dict() gives back the exact 12-key dict, so
+    the files on disk do not change.
+
+Usage:
+    from records import Record, load_records, save_records
+    records = load_records(data_path)
+    save_records(data_dir / 'sample_1000.jsonl.gz', records)
+
+    python scripts/records.py --benchmark      # memory: dicts vs Records
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import argparse
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+
+from jsonl_io import iter_records, resolve_data_file, write_records
+
+
+UNIFIED_DATASET = Path(__file__).parent.parent / 'data' / 'unified_dataset.json'
+
+# Field order of the standardized record (also the JSON key order)
+FIELDS = ('unified_id', 'original_id', 'source_dataset', 'problem_id',
+          'problem_description', 'buggy_code', 'correct_code', 'language',
+          'execution_feedback', 'hint', 'ground_truth_label', 'additional_info')
+
+INTERNED_FIELDS = ('source_dataset', 'language')
+
+
+class Record:
+    """Standardized record with slotted fields and interned categoricals"""
+
+    __slots__ = FIELDS
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            if value is None or (name == 'additional_info' and not value):
+                continue
+            if name in INTERNED_FIELDS:
+                value = sys.intern(value)
+            setattr(self, name, value)
+
+    def __getattr__(self, name):
+        # Only reached for unset slots: absent optionals read as None
+        if name in FIELDS:
+            return None
+        raise AttributeError(name)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data.get(name) for name in FIELDS})
+
+    @classmethod
+    def from_columns(cls, columns, n):
+        """
+        n Records from field -> sequence of n values (or one constant value),
+        filled one field at a time instead of one record at a time.
+        """
+        records = [cls.__new__(cls) for _ in range(n)]
+        for name, values in columns.items():
+            setter = getattr(cls, name).__set__
+            if isinstance(values, (str, dict)) or values is None or not hasattr(values, '__len__'):
+                # Constant (the same interned object in every record)
+                if values is None or (name == 'additional_info' and not values):
+                    continue
+                value = sys.intern(values) if name in INTERNED_FIELDS else values
+                for record in records:
+                    setter(record, value)
+                continue
+            if name in INTERNED_FIELDS:
+                values = [sys.intern(v) if v is not None else None for v in values]
+            for record, value in zip(records, values):
+                if value is not None and (value or name != 'additional_info'):
+                    setter(record, value)
+        return records
+
+    def to_dict(self):
+        """The standardized 12-key dict (None placeholders restored)"""
+        data = {name: getattr(self, name) for name in FIELDS}
+        data['additional_info'] = data['additional_info'] or {}
+        return data
+
+    # Read-only dict interface, so existing record['field'] code keeps working
+    def __getitem__(self, name):
+        if name not in FIELDS:
+            raise KeyError(name)
+        return getattr(self, name) if name != 'additional_info' else (self.additional_info or {})
+
+    def get(self, name, default=None):
+        # Same as the to_dict() dict: every field is present, even when None
+        return self[name] if name in FIELDS else default
+
+    def keys(self):
+        return FIELDS
+
+    def __repr__(self):
+        return f"Record({self.unified_id!r}, {self.source_dataset!r}, {self.language!r})"
+
+
+def load_records(path=UNIFIED_DATASET):
+    """Read a standardized record file (any jsonl_io format) into Records"""
+    return [Record.from_dict(data) for data in iter_records(resolve_data_file(path))]
+
+
+def save_records(path, records, **kwargs):
+    """jsonl_io.write_records() for Records (written as the usual dicts)"""
+    return write_records(path, records, default=Record.to_dict, **kwargs)
+
+
+def benchmark(path=UNIFIED_DATASET, n=148_746):
+    """Traced memory of the corpus as dicts vs. Records"""
+    if Path(path).exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        source = Path(path).name
+    else:
+        sources = [('PyPal', 'Python'), ('Yaksh', 'Python'), ('Codeforces', 'C++'),
+                   ('DeepFix', 'C'), ('SPOC', 'C++')]
+        rows = []
+        for i in range(n):
+            dataset, language = sources[i % len(sources)]
+            rows.append({'unified_id': f"{dataset.upper()}_{i:06d}", 'original_id': str(i),
+                         'source_dataset': dataset, 'problem_id': f"p{i % 500}",
+                         'problem_description': None, 'buggy_code': 'x' * 40, 'correct_code': None,
+                         'language': language, 'execution_feedback': None, 'hint': None,
+                         'ground_truth_label': None, 'additional_info': {'file_name': f"{i}.c"}})
+        text = json.dumps(rows)
+        del rows
+        source = f"synthetic {n:,} records"
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    as_dicts = json.loads(text)
+    dict_bytes = tracemalloc.get_traced_memory()[0] - base
+    del as_dicts
+
+    base = tracemalloc.get_traced_memory()[0]
+    as_records = [Record.from_dict(data) for data in json.loads(text)]
+    record_bytes = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    mb = 1024 * 1024
+    print(f"📦 {len(as_records):,} records ({source})")
+    print(f"   dicts:   {dict_bytes / mb:>8.1f} MB")
+    print(f"   Records: {record_bytes / mb:>8.1f} MB ({(1 - record_bytes / dict_bytes) * 100:.0f}% less)")
+    return dict_bytes, record_bytes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact dataset records")
+    parser.add_argument('--benchmark', action='store_true', help="Compare memory of dicts vs. Records")
+    parser.add_argument('--data', type=Path, default=UNIFIED_DATASET)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.data)
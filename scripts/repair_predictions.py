@@ -0,0 +1,247 @@
+"""
+Repair Failed Predictions
+=========================
+
+Purpose:
+    Fill the ERROR / RATE_LIMITED / QUOTA_EXCEEDED / MODEL_LOADING /
+    PARSE_ERROR / CIRCUIT_OPEN cells of existing predictions files without
+    re-running everything. Only the non-valid (record, model) cells are
+    re-requested (in parallel, through llm_clients.request_concurrently);
+    answers are merged back into the same files and valid cells are never
+    touched. A cell that appears in several files is requested once.
+
+    Both cell layouts are handled: plain strings ('qwen': 'ERROR') and the
+    nested form written by replace_llama_with_gptoss.py
+    ('gpt_oss': {'prediction': 'ERROR', ...}).
+
+Usage:
+    python scripts/repair_predictions.py
+    python scripts/repair_predictions.py outputs/predictions/predictions_300_final.json --models qwen
+    python scripts/repair_predictions.py --dry-run
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+from circuit_breaker import BreakerRegistry
+from cost_accounting import BUDGET_EXHAUSTED, CostTracker, add_budget_arguments
+from jsonl_io import iter_records, resolve_data_file
+from length_scheduling import add_schedule_argument
+from llm_clients import (REQUEST_FLIGHTS, VALID_CODES, load_config, load_model_registry,
+                         request_concurrently, resolve_model_key)
+from prompt_template import add_compact_argument, enable_compaction
+from request_trace import TraceRecorder
+from response_cache import ResponseCache
+from scan_data_quality import load_exclusions
+from telemetry import Telemetry
+
+
+PREDICTIONS_DIR = Path(__file__).parent.parent / 'outputs' / 'predictions'
+DEFAULT_FILES = [
+    PREDICTIONS_DIR / 'predictions_200_final.json',
+    PREDICTIONS_DIR / 'predictions_300_final.json',
+]
+
+
+def create_prompt(record):
+    """Import from prompt_template.py"""
+    from prompt_template import create_classification_prompt
+    return create_classification_prompt(record)
+
+
+def cell_value(cell):
+    """Prediction stored in a cell (plain string or {'prediction': ...})"""
+    if isinstance(cell, dict):
+        return cell.get('prediction')
+    return cell
+
+
+def set_cell_value(row, column, prediction):
+    """Write a prediction back, keeping the cell's original layout"""
+    cell = row[column]
+    if isinstance(cell, dict):
+        cell['prediction'] = prediction
+        cell['timestamp'] = datetime.now().isoformat()
+    else:
+        row[column] = prediction
+
+
+def save_predictions(path, rows):
+    """Atomically rewrite a predictions file"""
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(rows, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def find_failed_cells(files_rows, models, only_models=None):
+    """
+    Collect non-valid cells.
+
+    Returns:
+        dict: (unified_id, model_key) -> list of (file, row index, column)
+    """
+    failed = {}
+    for path, rows in files_rows.items():
+        for idx, row in enumerate(rows):
+            for column in row:
+                model_key = resolve_model_key(column, models)
+                if model_key is None or (only_models and model_key not in only_models):
+                    continue
+                if cell_value(row[column]) in VALID_CODES:
+                    continue
+                failed.setdefault((row['unified_id'], model_key), []).append((path, idx, column))
+    return failed
+
+
+def repair_predictions(files=None, only_models=None, max_workers=4, dry_run=False, save_every=25,
+                       trace=False, max_tokens=None, max_cost=None, schedule='fifo'):
+    """
+    Re-request failed cells and merge recovered answers in place.
+
+    Args:
+        files (list): Predictions files (default: the 200 and 300 runs)
+        only_models (list): Restrict to these model keys
+        max_workers (int): Parallel requests
+        dry_run (bool): Only report what would be retried
+        save_every (int): Rewrite the files after this many answers
+        trace (bool): Write a Chrome/Perfetto trace of the requests
+        max_tokens (int): Optional token budget; later cells stay failed
+        max_cost (float): Optional cost budget
+        schedule (str): Request order ('fifo', 'longest' or 'buckets')
+
+    Returns:
+        dict: Per-model counts of failed and recovered cells
+    """
+    print("="*80)
+    print("🔧 REPAIR FAILED PREDICTIONS")
+    print("="*80)
+    print()
+
+    models, _ = load_model_registry()
+    files = [Path(f) for f in (files or DEFAULT_FILES)]
+
+    files_rows = {}
+    for path in files:
+        if not path.exists():
+            print(f"⚠️  Skipping missing file: {path}")
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            files_rows[path] = json.load(f)
+
+    failed = find_failed_cells(files_rows, models, only_models)
+    exclusions = load_exclusions()
+    excluded = [key for key in failed if key[0] in exclusions]
+    for key in excluded:
+        del failed[key]
+    if excluded:
+        print(f"🚫 Skipping {len(excluded)} failed cells of records on the exclusion list")
+    report = {}
+    for (_, model_key), cells in failed.items():
+        report.setdefault(model_key, {'failed': 0, 'requests': 0, 'recovered': 0})
+        report[model_key]['failed'] += len(cells)
+        report[model_key]['requests'] += 1
+
+    for path, rows in files_rows.items():
+        n_failed = sum(1 for cells in failed.values() for p, _, _ in cells if p == path)
+        print(f"📂 {path.name}: {len(rows)} records, {n_failed} failed cells")
+    print(f"🔁 Unique (record, model) requests: {len(failed)}")
+    print()
+
+    if dry_run or not failed:
+        return report
+
+    # Only the records we need, not the whole sample as a dict of everything
+    needed_ids = {uid for uid, _ in failed}
+    sample_path = Path(__file__).parent.parent / 'data' / 'sample_1000.json'
+    sample_path = resolve_data_file(sample_path)
+    records = {r['unified_id']: r for r in iter_records(sample_path) if r['unified_id'] in needed_ids}
+
+    missing = needed_ids - set(records)
+    if missing:
+        print(f"⚠️  {len(missing)} records not found in {sample_path.name}; their cells are skipped")
+
+    config = load_config()
+    breakers = BreakerRegistry(failure_threshold=3, cooldown=300)
+    prompts = {}
+    tasks = []
+    for uid, model_key in failed:
+        if uid not in records:
+            continue
+        if uid not in prompts:
+            prompts[uid] = create_prompt(records[uid])
+        tags = {'source': records[uid].get('source_dataset'), 'language': records[uid].get('language')}
+        tasks.append(((uid, model_key), model_key, prompts[uid], tags))
+
+    answered = 0
+    cache = ResponseCache()
+    telemetry = Telemetry() if trace else None
+    tracer = TraceRecorder('repair') if trace else None
+    costs = CostTracker.from_registry(models, max_tokens, max_cost)
+    skipped = 0
+    for (uid, model_key), result in request_concurrently(tasks, config, models, max_workers,
+                                                          breakers=breakers, cache=cache,
+                                                          telemetry=telemetry, tracer=tracer,
+                                                          costs=costs, schedule=schedule):
+        prediction = result['prediction']
+        answered += 1
+        if prediction == BUDGET_EXHAUSTED:
+            skipped += 1
+            continue
+        if prediction in VALID_CODES:
+            report[model_key]['recovered'] += len(failed[(uid, model_key)])
+            for path, idx, column in failed[(uid, model_key)]:
+                set_cell_value(files_rows[path][idx], column, prediction)
+            print(f"[{answered}/{len(tasks)}] {uid} {model_key}: ✓ {prediction}", flush=True)
+        else:
+            print(f"[{answered}/{len(tasks)}] {uid} {model_key}: ✗ {prediction}", flush=True)
+
+        if answered % save_every == 0:
+            for path, rows in files_rows.items():
+                save_predictions(path, rows)
+
+    for path, rows in files_rows.items():
+        save_predictions(path, rows)
+
+    # Summary
+    print("\n" + "="*80)
+    print("📊 REPAIR SUMMARY")
+    print("="*80)
+    print(f"{'Model':<12} {'Failed cells':<15} {'Requests':<10} {'Recovered':<10}")
+    print("-" * 80)
+    for model_key, counts in report.items():
+        print(f"{model_key:<12} {counts['failed']:<15} {counts['requests']:<10} {counts['recovered']:<10}")
+    if skipped:
+        print(f"💰 Budget reached: {skipped} requests not sent")
+    costs.print_summary()
+    breakers.print_summary()
+    REQUEST_FLIGHTS.print_summary()
+    if trace:
+        tracer.save(Path(__file__).parent.parent / 'outputs' / 'predictions' / 'trace_repair.json', telemetry)
+    print("="*80)
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-request only failed prediction cells")
+    parser.add_argument('files', nargs='*', type=Path, help="Predictions files (default: 200 and 300 runs)")
+    parser.add_argument('--models', nargs='+', default=None, help="Only repair these model keys")
+    parser.add_argument('--workers', type=int, default=4, help="Parallel requests")
+    parser.add_argument('--dry-run', action='store_true', help="Only count failed cells")
+    parser.add_argument('--trace', action='store_true', help="Write a Chrome/Perfetto request trace")
+    add_budget_arguments(parser)
+    add_schedule_argument(parser)
+    add_compact_argument(parser)
+    args = parser.parse_args()
+    if args.compact:
+        enable_compaction()
+
+    repair_predictions(args.files, args.models, args.workers, args.dry_run, trace=args.trace,
+                       max_tokens=args.max_tokens, max_cost=args.max_cost, schedule=args.schedule)
@@ -12,6 +12,11 @@ Provider: Hugging Face Inference API
 Usage:
     python scripts/replace_llama_with_gptoss.py
 
+Note:
+    Kept for reproducing the original run. For new columns use
+    backfill_predictions.py, which works for any model and file, runs in
+    parallel and resumes from a checkpoint.
+
 Author: [Your Name]
 Date: December 31, 2024
 """
@@ -21,6 +26,8 @@ import requests
 import time
 from pathlib import Path
 
+from jsonl_io import iter_records, resolve_data_file
+
 
 def load_api_config():
     """Load API configuration from config file."""
@@ -167,8 +174,7 @@ def replace_llama_with_gptoss():
     sample_path = Path(__file__).parent.parent / 'data' / 'sample_1000.json'
     
     print("Loading dataset...")
-    with open(sample_path, 'r', encoding='utf-8') as f:
-        all_data = {r['unified_id']: r for r in json.load(f)}
+    all_data = {r['unified_id']: r for r in iter_records(resolve_data_file(sample_path))}
     
     print()
     print("="*80)
@@ -0,0 +1,75 @@
+"""
+LLM Response Cache
+==================
+
+Purpose:
+    Remember answers per (model, prompt) so re-runs, backfills and repairs
+    never pay twice for the same request. Stored in a single SQLite file
+    (outputs/cache/responses.db by default).
+
+    Only valid category codes are cached. Failures (ERROR, RATE_LIMITED,
+    PARSE_ERROR, ...) are not, so repair and re-runs can try them again.
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+DEFAULT_CACHE = Path(__file__).parent.parent / 'outputs' / 'cache' / 'responses.db'
+
+CACHEABLE = {'LOOP_COND', 'COND_BRANCH', 'STMT_INTEGRITY', 'IO_FORMAT',
+             'VAR_INIT', 'DATA_TYPE', 'COMPUTATION'}
+
+
+class ResponseCache:
+    """Thread-safe SQLite cache of result dicts"""
+
+    def __init__(self, path=DEFAULT_CACHE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, result TEXT, created REAL)"
+        )
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model_key, model_name, prompt, with_confidence=False):
+        """sha256 over everything that changes the request"""
+        raw = json.dumps([model_key, model_name, bool(with_confidence), prompt], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Cached result dict or None"""
+        with self.lock:
+            row = self.conn.execute("SELECT result FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, result):
+        """Store a result dict if it holds a valid code"""
+        if result.get('prediction') not in CACHEABLE:
+            return
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, result, created) VALUES (?, ?, ?, ?)",
+                (key, result.get('model'), json.dumps(result, ensure_ascii=False), time.time())
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -5,6 +5,8 @@ from pathlib import Path
 from datetime import datetime
 import requests
 from google import genai
+from jsonl_io import read_records, resolve_data_file
+from scan_data_quality import filter_excluded
 
 
 def load_config():
@@ -17,12 +19,12 @@ def load_config():
 def load_sample(num_samples=None):
     """Load sample dataset"""
     sample_path = Path(__file__).parent.parent / 'data' / 'sample_1000.json'
-    with open(sample_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = read_records(resolve_data_file(sample_path))
     
+    # Slice before filtering, so an exclusion list does not shift which records are in the run
     if num_samples:
-        return data[:num_samples]
-    return data
+        data = data[:num_samples]
+    return filter_excluded(data)
 
 
 def create_prompt(record):
@@ -5,6 +5,8 @@ from pathlib import Path
 from datetime import datetime
 import requests
 from google import genai
+from jsonl_io import read_records, resolve_data_file
+from scan_data_quality import filter_excluded
 
 def load_config():
     config_path = Path(__file__).parent.parent / 'config' / 'api_keys.json'
@@ -13,9 +15,9 @@ def load_config():
 
 def load_sample(num_samples=200):
     sample_path = Path(__file__).parent.parent / 'data' / 'sample_1000.json'
-    with open(sample_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    return data[:num_samples]
+    # Slice before filtering, so an exclusion list does not shift which records are in the run
+    data = read_records(resolve_data_file(sample_path))
+    return filter_excluded(data[:num_samples])
 
 def create_prompt(record):
     from prompt_template import create_classification_prompt
@@ -129,7 +131,11 @@ def run_predictions_200():
     
     start_time = time.time()
     
-    for i, record in enumerate(sample[start_idx:], start_idx + 1):
+    # Resume by id rather than position, so a new exclusion list cannot skip or repeat records
+    done_ids = {r['unified_id'] for r in results}
+    todo = [r for r in sample if r['unified_id'] not in done_ids]
+    
+    for i, record in enumerate(todo, start_idx + 1):
         if i % 10 == 1:
             print(f"\n[{i}/{len(sample)}] {record['unified_id']}...")
         else:
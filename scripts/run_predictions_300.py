@@ -3,8 +3,16 @@ import time
 import re
 from pathlib import Path
 from datetime import datetime
-import requests
-from google import genai
+from hedging import HedgedCaller
+from circuit_breaker import BreakerRegistry, CIRCUIT_OPEN
+from online_metrics import OnlineMetrics
+from telemetry import NULL_TELEMETRY, Telemetry
+from request_trace import NULL_TRACER, TraceRecorder
+from cost_accounting import CostTracker, add_budget_arguments, usage_from_gemini, usage_from_hf
+from llm_clients import load_model_registry
+from jsonl_io import read_records, resolve_data_file
+from prompt_template import add_compact_argument, enable_compaction
+from scan_data_quality import filter_excluded
 
 def load_config():
     config_path = Path(__file__).parent.parent / 'config' / 'api_keys.json'
@@ -13,9 +21,9 @@ def load_config():
 
 def load_sample(num_samples=300):
     sample_path = Path(__file__).parent.parent / 'data' / 'sample_1000.json'
-    with open(sample_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    return data[:num_samples]
+    # Slice before filtering, so an exclusion list does not shift which records are in the run
+    data = read_records(resolve_data_file(sample_path))
+    return filter_excluded(data[:num_samples])
 
 def create_prompt(record):
     from prompt_template import create_classification_prompt
@@ -35,26 +43,41 @@ def extract_category_code(response_text):
     
     return "PARSE_ERROR"
 
-def predict_gemini(prompt, config):
-    try:
-        client = genai.Client(
-            api_key=config['gemini']['api_key'],
-            http_options={'api_version': 'v1'}
-        )
-        
-        response = client.models.generate_content(
-            model=config['gemini']['model'],
-            contents=prompt
-        )
-        
-        return extract_category_code(response.text)
-    except Exception as e:
-        error_msg = str(e)
-        if "429" in error_msg:
-            return "QUOTA_EXCEEDED"
-        return "ERROR"
+def predict_gemini(prompt, config, telemetry=None, costs=None, tags=None):
+    from google import genai    # imported on first use, not for --help / dry runs
+
+    telemetry = telemetry or NULL_TELEMETRY
+    with telemetry.attempt('gemini', 1, prompt) as call:
+        try:
+            client = genai.Client(
+                api_key=config['gemini']['api_key'],
+                http_options={'api_version': 'v1'}
+            )
+            
+            response = client.models.generate_content(
+                model=config['gemini']['model'],
+                contents=prompt
+            )
+            
+            if costs:
+                costs.add('gemini', usage_from_gemini(response), **(tags or {}))
+            prediction = extract_category_code(response.text)
+            call.finish(prediction, 200, response.text)
+            return prediction
+        except Exception as e:
+            error_msg = str(e)
+            if "429" in error_msg:
+                call.finish("QUOTA_EXCEEDED", 429)
+                return "QUOTA_EXCEEDED"
+            call.finish("ERROR", response=type(e).__name__)
+            return "ERROR"
 
-def predict_huggingface(prompt, model_name, config, max_retries=2):
+def predict_huggingface(prompt, model_name, config, max_retries=2, model_key=None,
+                        telemetry=None, costs=None, tags=None):
+    import requests
+
+    model_key = model_key or model_name
+    telemetry = telemetry or NULL_TELEMETRY
     for attempt in range(max_retries):
         try:
             API_URL = "https://router.huggingface.co/v1/chat/completions"
@@ -70,15 +93,23 @@ def predict_huggingface(prompt, model_name, config, max_retries=2):
                 "temperature": 0.1
             }
             
-            response = requests.post(API_URL, headers=headers, json=payload, timeout=60)
+            with telemetry.attempt(model_key, attempt + 1, prompt) as call:
+                response = requests.post(API_URL, headers=headers, json=payload, timeout=60)
+                
+                if response.status_code == 200:
+                    result = response.json()
+                    if costs:
+                        costs.add(model_key, usage_from_hf(result), **(tags or {}))
+                    raw_response = result['choices'][0]['message']['content']
+                    prediction = extract_category_code(raw_response)
+                    call.finish(prediction, 200, raw_response)
+                    return prediction
+                call.finish("RATE_LIMITED" if response.status_code == 429 else "ERROR",
+                            response.status_code)
             
-            if response.status_code == 200:
-                result = response.json()
-                raw_response = result['choices'][0]['message']['content']
-                return extract_category_code(raw_response)
-            elif response.status_code == 429:
+            if response.status_code == 429:
                 if attempt < max_retries - 1:
-                    time.sleep(10)
+                    telemetry.sleep(model_key, 10, 'rate_limit_wait')
                     continue
                 return "RATE_LIMITED"
             else:
@@ -86,13 +117,14 @@ def predict_huggingface(prompt, model_name, config, max_retries=2):
                 
         except Exception as e:
             if attempt < max_retries - 1:
-                time.sleep(5)
+                telemetry.sleep(model_key, 5, 'backoff')
                 continue
             return "ERROR"
     
     return "ERROR"
 
-def run_predictions_300_fast():
+def run_predictions_300_fast(hedge=False, max_deferred_wait=900, metrics_every=25, trace=False,
+                             max_tokens=None, max_cost=None):
     print("="*80)
     print("⚡ FAST 300-SAMPLE PREDICTIONS - 3 MODELS")
     print("="*80)
@@ -119,6 +151,13 @@ def run_predictions_300_fast():
         results = []
     
     start_idx = len(results)
+    
+    # Live validity / agreement numbers, refreshed every metrics_every records
+    metrics = OnlineMetrics(['gemini', 'qwen', 'llama'],
+                            status_file=output_dir / 'predictions_300_status.json',
+                            every=metrics_every)
+    metrics.add_records(results)
+    
     model_stats = {
         'gemini': {'success': 0, 'errors': 0},
         'qwen': {'success': 0, 'errors': 0},
@@ -128,15 +167,74 @@ def run_predictions_300_fast():
     valid_codes = ['LOOP_COND', 'COND_BRANCH', 'STMT_INTEGRITY', 
                    'IO_FORMAT', 'VAR_INIT', 'DATA_TYPE', 'COMPUTATION']
     
+    # Latency / status / sleep time for every provider call
+    telemetry = Telemetry()
+    
+    # Optional timeline of every (record, model) request
+    tracer = TraceRecorder('predictions_300') if trace else NULL_TRACER
+    
+    # Tokens / cost per model, source and language; optional budget caps
+    registry, _ = load_model_registry()
+    costs = CostTracker.from_registry(registry, max_tokens, max_cost)
+    
+    # Optional duplicate requests for HF calls that run past their p95
+    hedger = HedgedCaller() if hedge else None
+    
+    def call_hf(model_key, model_name, prompt, tags):
+        call = lambda: predict_huggingface(prompt, model_name, config, model_key=model_key,
+                                           telemetry=telemetry, costs=costs, tags=tags)
+        if hedger:
+            return hedger.call(model_key, call)
+        return call()
+    
+    # Skip providers that keep failing; their records are retried at the end
+    breakers = BreakerRegistry(failure_threshold=3, cooldown=300)
+    model_calls = {
+        'gemini': lambda prompt, tags: predict_gemini(prompt, config, telemetry, costs, tags),
+        'qwen': lambda prompt, tags: call_hf('qwen', "Qwen/Qwen2.5-Coder-7B-Instruct", prompt, tags),
+        'llama': lambda prompt, tags: call_hf('llama', "meta-llama/Llama-3.2-3B-Instruct", prompt, tags)
+    }
+    # (index in results, model key); calls still skipped when an earlier run
+    # stopped are retried along with this run's
+    sample_ids = {r['unified_id'] for r in sample}
+    deferred = [(idx, model_key) for idx, row in enumerate(results) if row['unified_id'] in sample_ids
+                for model_key in model_calls if row.get(model_key) == CIRCUIT_OPEN]
+    
+    def call_model(model_key, prompt, record):
+        tags = {'source': record['source_dataset'], 'language': record['language']}
+        with tracer.span(model_key, record_id=record['unified_id'], model=model_key) as span:
+            span['prediction'] = breakers.call(model_key, lambda: model_calls[model_key](prompt, tags))
+        return span['prediction']
+    
+    def record_prediction(idx, predictions, model_key, prediction):
+        predictions[model_key] = prediction
+        if prediction == CIRCUIT_OPEN:
+            deferred.append((idx, model_key))
+        elif prediction in valid_codes:
+            model_stats[model_key]['success'] += 1
+        else:
+            model_stats[model_key]['errors'] += 1
+    
     start_time = time.time()
     
-    for i, record in enumerate(sample[start_idx:], start_idx + 1):
+    # Resume by id rather than position, so a new exclusion list cannot skip or repeat records
+    done_ids = {r['unified_id'] for r in results}
+    todo = [r for r in sample if r['unified_id'] not in done_ids]
+    
+    for i, record in enumerate(todo, start_idx + 1):
+        if costs.exhausted():
+            print(f"\n💰 Budget reached after {i - 1} records ({costs.budget_status()})")
+            with open(progress_file, 'w') as f:
+                json.dump(results, f, indent=2)
+            break
+        
         if i % 10 == 1:
             print(f"\n[{i}/{len(sample)}] Processing...")
         else:
             print(f"[{i}]", end=" ", flush=True)
         
         prompt = create_prompt(record)
+        record_start = time.time()
         
         predictions = {
             'unified_id': record['unified_id'],
@@ -145,34 +243,25 @@ def run_predictions_300_fast():
             'timestamp': datetime.now().isoformat()
         }
         
+        idx = len(results)
+        
         # Gemini
-        predictions['gemini'] = predict_gemini(prompt, config)
-        if predictions['gemini'] in valid_codes:
-            model_stats['gemini']['success'] += 1
-        else:
-            model_stats['gemini']['errors'] += 1
-        time.sleep(1)  # Minimal wait
+        record_prediction(idx, predictions, 'gemini', call_model('gemini', prompt, record))
+        if predictions['gemini'] != CIRCUIT_OPEN:
+            telemetry.sleep('gemini', 1, 'pacing')  # Minimal wait
         
         # Qwen
-        predictions['qwen'] = predict_huggingface(
-            prompt, "Qwen/Qwen2.5-Coder-7B-Instruct", config
-        )
-        if predictions['qwen'] in valid_codes:
-            model_stats['qwen']['success'] += 1
-        else:
-            model_stats['qwen']['errors'] += 1
-        time.sleep(2)  # Reduced wait
+        record_prediction(idx, predictions, 'qwen', call_model('qwen', prompt, record))
+        if predictions['qwen'] != CIRCUIT_OPEN:
+            telemetry.sleep('qwen', 2, 'pacing')  # Reduced wait
         
         # Llama
-        predictions['llama'] = predict_huggingface(
-            prompt, "meta-llama/Llama-3.2-3B-Instruct", config
-        )
-        if predictions['llama'] in valid_codes:
-            model_stats['llama']['success'] += 1
-        else:
-            model_stats['llama']['errors'] += 1
+        record_prediction(idx, predictions, 'llama', call_model('llama', prompt, record))
         
         results.append(predictions)
+        metrics.add_record(predictions)
+        tracer.add(record['unified_id'], 'record', record_start, time.time(),
+                   record_id=record['unified_id'])
         
         # Progress update
         if i % 10 == 0:
@@ -190,12 +279,41 @@ def run_predictions_300_fast():
         # Short wait between samples
         time.sleep(3)  # Reduced from 6
     
+    # Retry calls skipped while a breaker was open (half-open probes decide)
+    if deferred:
+        print(f"\n\n🔁 Retrying {len(deferred)} deferred calls...")
+        records_by_id = {r['unified_id']: r for r in sample}
+        waited = 0
+        while deferred and not costs.exhausted():
+            pending, deferred = deferred, []
+            for idx, model_key in pending:
+                record = records_by_id[results[idx]['unified_id']]
+                prompt = create_prompt(record)
+                before = dict(results[idx])
+                record_prediction(idx, results[idx], model_key, call_model(model_key, prompt, record))
+                metrics.replace_record(before, results[idx])
+            
+            if not deferred:
+                break
+            wait = breakers.seconds_until_probe({m for _, m in deferred})
+            if waited + wait > max_deferred_wait:
+                print(f"  ⚠️ {len(deferred)} calls still skipped (left as {CIRCUIT_OPEN})")
+                for _, model_key in deferred:
+                    model_stats[model_key]['errors'] += 1
+                break
+            print(f"  ⏳ {len(deferred)} calls waiting {wait:.0f}s for a half-open probe")
+            time.sleep(wait)
+            waited += wait
+        if deferred:
+            print(f"  ↪️ Rerun, or run repair_predictions.py, to fill the {CIRCUIT_OPEN} cells")
+    
     # Final save
     final_file = output_dir / 'predictions_300_final.json'
     with open(final_file, 'w') as f:
         json.dump(results, f, indent=2, ensure_ascii=False)
     
     print(f"\n\n✅ SAVED: {final_file}")
+    metrics.write_status()
     
     # Summary
     print("\n" + "="*80)
@@ -223,14 +341,45 @@ def run_predictions_300_fast():
     print(f"Conflicts:        {len(conflicts)} ({len(conflicts)/len(results)*100:.1f}%)")
     print(f"\n💾 Conflicts: {conflicts_file}")
     
+    breakers.print_summary()
+    
+    telemetry.print_summary()
+    telemetry_file = telemetry.save(output_dir / 'telemetry_300.json')
+    print(f"💾 Telemetry: {telemetry_file}")
+    
+    costs.print_summary()
+    costs_file = costs.save(output_dir / 'costs_300.json')
+    print(f"💾 Costs: {costs_file}")
+    if trace:
+        tracer.save(output_dir / 'trace_300.json', telemetry)
+    
+    if hedger:
+        hedger.print_summary()
+        hedger.shutdown()
+    
     total_time = time.time() - start_time
     print(f"⏱️  Total: {total_time/60:.1f} min")
     print("="*80)
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Fast 300-sample predictions")
+    parser.add_argument('--hedge', action='store_true',
+                        help="Send a duplicate request when a call runs past the model's p95 latency")
+    parser.add_argument('--trace', action='store_true',
+                        help="Write a Chrome/Perfetto trace of every request to outputs/predictions/trace_300.json")
+    parser.add_argument('--metrics-every', type=int, default=25,
+                        help="Print live metrics and refresh the status file every N records")
+    add_budget_arguments(parser)
+    add_compact_argument(parser)
+    args = parser.parse_args()
+    if args.compact:
+        enable_compaction()
+    
     print("\n⚡ FAST MODE - 300 Samples")
     print("⏱️  Time: ~60-90 minutes\n")
     
     input("Press Enter to start...")
     
-    run_predictions_300_fast()
+    run_predictions_300_fast(hedge=args.hedge, metrics_every=args.metrics_every, trace=args.trace,
+                             max_tokens=args.max_tokens, max_cost=args.max_cost)
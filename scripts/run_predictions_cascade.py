@@ -0,0 +1,332 @@
+"""
+Cost-Aware Cascade Predictions
+==============================
+
+Purpose:
+    Classify records by asking the cheapest model first and escalating to
+    larger models only when needed, instead of sending every record to all
+    five models like run_5models_batch() does.
+
+    Tiers come from the 'tier' field in config/models.json. After each tier
+    the collected votes are checked:
+    - a single valid vote is accepted if its confidence (logprobs, or the
+      self-reported CONFIDENCE line) is >= confidence_threshold
+    - several votes are accepted if the leading label has at least
+      min_agreeing_votes and more votes than all other labels combined
+    Otherwise (low confidence or disagreement) the next tier is called.
+    Models whose circuit breaker is open are skipped, which simply moves the
+    record on to the next tier.
+
+Output:
+    - outputs/predictions/predictions_cascade_<N>.json (per-record labels)
+    - outputs/predictions/cascade_stats_<N>.json (per-tier call statistics)
+
+Usage:
+    python scripts/run_predictions_cascade.py --samples 300
+    python scripts/run_predictions_cascade.py --samples 1000 --max-calls 1500
+    python scripts/run_predictions_cascade.py --samples 300 --hedge
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import argparse
+import json
+import time
+from collections import Counter
+from pathlib import Path
+from datetime import datetime
+
+from circuit_breaker import BreakerRegistry, CIRCUIT_OPEN
+from cost_accounting import CostTracker, add_budget_arguments
+from hedging import HedgedCaller
+from jsonl_io import read_records, resolve_data_file
+from llm_clients import REQUEST_FLIGHTS, VALID_CODES, load_config, load_model_registry, request_prediction
+from prompt_template import add_compact_argument, enable_compaction
+from request_trace import NULL_TRACER, TraceRecorder
+from scan_data_quality import filter_excluded
+from telemetry import Telemetry
+
+
+def load_sample(num_samples=None):
+    """Load sample dataset"""
+    sample_path = Path(__file__).parent.parent / 'data' / 'sample_1000.json'
+    data = read_records(resolve_data_file(sample_path))
+
+    # Slice before filtering, so an exclusion list does not shift which records are in the run
+    if num_samples:
+        data = data[:num_samples]
+    return filter_excluded(data)
+
+
+def create_prompt(record):
+    """Import from prompt_template.py"""
+    from prompt_template import create_classification_prompt
+    return create_classification_prompt(record)
+
+
+def build_tiers(models):
+    """Group registry model keys by tier, cheapest tier first"""
+    tiers = {}
+    for key, entry in models.items():
+        tiers.setdefault(entry['tier'], []).append(key)
+    return [tiers[tier] for tier in sorted(tiers)]
+
+
+def cascade_decision(votes, confidence_threshold, min_agreeing_votes):
+    """
+    Decide whether the votes collected so far are trustworthy.
+
+    Args:
+        votes (list): Result dicts from request_prediction()
+        confidence_threshold (float): Minimum confidence for a lone vote
+        min_agreeing_votes (int): Votes needed to accept without confidence
+
+    Returns:
+        tuple: (label, confidence) if accepted, otherwise None
+    """
+    valid = [v for v in votes if v['prediction'] in VALID_CODES]
+    if not valid:
+        return None
+
+    counts = Counter(v['prediction'] for v in valid)
+    label, top = counts.most_common(1)[0]
+    confidences = [v['confidence'] for v in valid
+                   if v['prediction'] == label and v['confidence'] is not None]
+    confidence = max(confidences) if confidences else None
+
+    # Only one opinion so far - trust it if the model is sure
+    if len(valid) == 1:
+        if confidence is not None and confidence >= confidence_threshold:
+            return label, confidence
+        return None
+
+    # Several opinions - need a clear majority
+    if top >= min_agreeing_votes and top > len(valid) - top:
+        return label, confidence
+    return None
+
+
+def run_cascade_batch(num_samples=300, max_calls=None, wait_between_calls=2, hedge=False, trace=False,
+                      max_tokens=None, max_cost=None):
+    """
+    Run cascade predictions over the sample.
+
+    Args:
+        num_samples (int): Number of records from sample_1000.json
+        max_calls (int): Optional API call budget; no new records are started
+            once the next record could not get its first tier within budget
+        wait_between_calls (float): Seconds to sleep between API calls
+        hedge (bool): Duplicate calls that run past the model's p95 latency
+        trace (bool): Write a Chrome/Perfetto trace of every request
+        max_tokens (int): Optional token budget (prompt + completion)
+        max_cost (float): Optional cost budget (prices in config/models.json)
+
+    Returns:
+        list: Per-record prediction dicts
+    """
+    print("="*80)
+    print("🪜 CASCADE PREDICTIONS - CHEAP MODELS FIRST")
+    print("="*80)
+    print()
+
+    config = load_config()
+    models, settings = load_model_registry()
+    cascade_settings = settings.get('cascade', {})
+    threshold = cascade_settings.get('confidence_threshold', 0.7)
+    min_votes = cascade_settings.get('min_agreeing_votes', 2)
+    tiers = build_tiers(models)
+    sample = load_sample(num_samples)
+
+    print(f"📊 Processing {len(sample)} samples")
+    for tier_num, tier_models in enumerate(tiers, 1):
+        print(f"🤖 Tier {tier_num}: {', '.join(models[m]['name'] for m in tier_models)}")
+    print(f"🎯 Confidence threshold: {threshold} | Agreeing votes: {min_votes}")
+    if max_calls:
+        print(f"💰 Call budget: {max_calls}")
+    costs = CostTracker.from_registry(models, max_tokens, max_cost)
+    if max_tokens or max_cost:
+        print(f"💰 Token/cost budget: {costs.budget_status()}")
+    print()
+
+    tier_stats = [
+        {'tier': n, 'models': tier_models, 'records_reached': 0, 'calls': 0, 'resolved': 0}
+        for n, tier_models in enumerate(tiers, 1)
+    ]
+    telemetry = Telemetry()
+    tracer = TraceRecorder(f'cascade_{num_samples}') if trace else NULL_TRACER
+    hedger = HedgedCaller() if hedge else None
+    breakers = BreakerRegistry(failure_threshold=3, cooldown=300)
+    results = []
+    total_calls = 0
+
+    def call_model(model_key, prompt, record, tier):
+        call = lambda coalesce=True: request_prediction(model_key, prompt, config, models, with_confidence=True,
+                                                        telemetry=telemetry, coalesce=coalesce)
+        # The returned copy is booked by the caller; a hedge's other copy here
+        book_extra = lambda result: costs.add_result(result, record['source_dataset'], record['language'])
+        with tracer.span(model_key, record_id=record['unified_id'], model=model_key, tier=tier):
+            if hedger:
+                # The duplicate must not single-flight onto the primary's call
+                return breakers.call(model_key, lambda: hedger.call(
+                    model_key, call, on_extra=book_extra, hedge_fn=lambda: call(coalesce=False)))
+            return breakers.call(model_key, call)
+
+    start_time = time.time()
+
+    for i, record in enumerate(sample, 1):
+        if max_calls and total_calls + len(tiers[0]) > max_calls:
+            print(f"\n💰 Call budget reached after {i - 1} records")
+            break
+        if costs.exhausted():
+            print(f"\n💰 Token/cost budget reached after {i - 1} records ({costs.budget_status()})")
+            break
+
+        print(f"[{i}/{len(sample)}] {record['unified_id']}...", end=" ", flush=True)
+
+        prompt = create_prompt(record)
+        record_start = time.time()
+
+        predictions = {
+            'unified_id': record['unified_id'],
+            'source_dataset': record['source_dataset'],
+            'language': record['language'],
+            'timestamp': datetime.now().isoformat()
+        }
+
+        votes = []
+        decision = None
+        resolved_tier = None
+        for tier_num, tier_models in enumerate(tiers, 1):
+            if max_calls and total_calls + len(tier_models) > max_calls:
+                break
+            if costs.exhausted():
+                break
+
+            tier_stats[tier_num - 1]['records_reached'] += 1
+            for model_key in tier_models:
+                result = call_model(model_key, prompt, record, tier_num)
+                if result == CIRCUIT_OPEN:
+                    predictions[model_key] = CIRCUIT_OPEN
+                    continue
+                costs.add_result(result, record['source_dataset'], record['language'])
+                votes.append(result)
+                predictions[model_key] = result['prediction']
+                predictions[f'{model_key}_confidence'] = result['confidence']
+                tier_stats[tier_num - 1]['calls'] += 1
+                total_calls += 1
+                telemetry.sleep(model_key, wait_between_calls, 'pacing')
+
+            decision = cascade_decision(votes, threshold, min_votes)
+            if decision:
+                resolved_tier = tier_num
+                tier_stats[tier_num - 1]['resolved'] += 1
+                break
+
+        if decision:
+            predictions['cascade_label'], predictions['cascade_confidence'] = decision
+            predictions['cascade_resolved'] = True
+            print(f"✓ {decision[0]} (tier {resolved_tier})")
+        else:
+            # Fall back to the plurality vote, but flag it as untrusted
+            valid = [v['prediction'] for v in votes if v['prediction'] in VALID_CODES]
+            predictions['cascade_label'] = Counter(valid).most_common(1)[0][0] if valid else 'UNRESOLVED'
+            predictions['cascade_confidence'] = None
+            predictions['cascade_resolved'] = False
+            print(f"✗ {predictions['cascade_label']} (unresolved)")
+
+        predictions['cascade_tier'] = resolved_tier
+        predictions['cascade_calls'] = len(votes)
+        results.append(predictions)
+        tracer.add(record['unified_id'], 'record', record_start, time.time(),
+                   record_id=record['unified_id'], tier=resolved_tier)
+
+    if hedger:
+        # Let abandoned duplicates finish so their tokens are in the cost report
+        hedger.shutdown(wait=True)
+
+    # Save results
+    output_dir = Path(__file__).parent.parent / 'outputs' / 'predictions'
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    output_file = output_dir / f'predictions_cascade_{len(sample)}.json'
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    full_calls = len(results) * len(models)
+    resolved = sum(1 for r in results if r['cascade_resolved'])
+    stats = {
+        'records': len(results),
+        'resolved': resolved,
+        'total_calls': total_calls,
+        'full_run_calls': full_calls,
+        'calls_saved': full_calls - total_calls,
+        'confidence_threshold': threshold,
+        'min_agreeing_votes': min_votes,
+        'tiers': tier_stats,
+        'costs': costs.summary()
+    }
+    stats_file = output_dir / f'cascade_stats_{len(sample)}.json'
+    with open(stats_file, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, indent=2)
+
+    print(f"\n\n✅ SAVED: {output_file}")
+
+    # Summary
+    print("\n" + "="*80)
+    print("📊 CASCADE SUMMARY")
+    print("="*80)
+    print(f"{'Tier':<6} {'Models':<30} {'Reached':<10} {'Calls':<10} {'Resolved':<10}")
+    print("-" * 80)
+    for t in tier_stats:
+        print(f"{t['tier']:<6} {', '.join(t['models']):<30} {t['records_reached']:<10} "
+              f"{t['calls']:<10} {t['resolved']:<10}")
+
+    print("-" * 80)
+    pct_saved = (stats['calls_saved'] / full_calls * 100) if full_calls else 0
+    pct_resolved = (resolved / len(results) * 100) if results else 0
+    print(f"Records:            {len(results)}")
+    print(f"Trusted labels:     {resolved} ({pct_resolved:.1f}%)")
+    print(f"API calls:          {total_calls} (all-models run: {full_calls})")
+    print(f"Calls saved:        {stats['calls_saved']} ({pct_saved:.1f}%)")
+    print(f"💾 Stats: {stats_file}")
+    breakers.print_summary()
+    REQUEST_FLIGHTS.print_summary()
+
+    costs.print_summary()
+    telemetry.print_summary()
+    telemetry_file = telemetry.save(output_dir / f'telemetry_cascade_{len(sample)}.json')
+    print(f"💾 Telemetry: {telemetry_file}")
+    if trace:
+        tracer.save(output_dir / f'trace_cascade_{len(sample)}.json', telemetry)
+
+    if hedger:
+        hedger.print_summary()
+        stats['latency'] = hedger.summary()
+        with open(stats_file, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2)
+
+    total_time = time.time() - start_time
+    print(f"⏱️  Total: {total_time/60:.1f} min")
+    print("="*80)
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cost-aware cascade predictions")
+    parser.add_argument('--samples', type=int, default=300, help="Number of samples to classify")
+    parser.add_argument('--max-calls', type=int, default=None, help="Stop once this many API calls are used")
+    parser.add_argument('--hedge', action='store_true', help="Duplicate calls that run past the model's p95 latency")
+    parser.add_argument('--trace', action='store_true', help="Write a Chrome/Perfetto request trace")
+    add_budget_arguments(parser)
+    add_compact_argument(parser)
+    args = parser.parse_args()
+    if args.compact:
+        enable_compaction()
+
+    print("\n🪜 CASCADE MODE - cheap models first, escalate when unsure")
+    input("Press Enter to start...")
+
+    run_cascade_batch(num_samples=args.samples, max_calls=args.max_calls, hedge=args.hedge, trace=args.trace,
+                      max_tokens=args.max_tokens, max_cost=args.max_cost)
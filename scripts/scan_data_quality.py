@@ -0,0 +1,255 @@
+"""
+Data Quality Scanner
+====================
+
+Purpose:
+    One streaming pass over the unified corpus, run before samples are
+    drawn or a model is paid for. Each record is checked for:
+
+    - missing_field    unified_id, source_dataset, language or buggy_code absent/null
+    - empty_code       buggy_code empty or whitespace only
+    - oversized_code   buggy_code over the token budget (~4 characters per token)
+    - control_chars    control characters in a text field (the ones
+                       combine_datasets.clean_for_excel strips)
+    - duplicate_id     unified_id seen more than once; every copy is excluded,
+                       since predictions are joined on the id
+
+    JSON parsing and the checks run in worker processes. The main process
+    only streams lines and tracks ids for the duplicate check. Flagged ids
+    go to data/exclusions.json. The prediction runners, the worker queue,
+    backfill and repair skip every id on that list, after taking their
+    slice of the sample. create_sample.py keeps its seeded draw unchanged.
+
+Usage:
+    python scripts/scan_data_quality.py
+    python scripts/scan_data_quality.py --token-budget 4000 --workers 8
+    python scripts/scan_data_quality.py --keep control_chars   # report only
+
+    from scan_data_quality import filter_excluded
+    records = filter_excluded(records)
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+
+from jsonl_io import iter_lines, resolve_data_file
+
+
+UNIFIED_DATASET = Path(__file__).parent.parent / 'data' / 'unified_dataset.json'
+EXCLUSIONS_FILE = Path(__file__).parent.parent / 'data' / 'exclusions.json'
+
+ISSUES = ('missing_field', 'empty_code', 'oversized_code', 'control_chars', 'duplicate_id')
+
+REQUIRED_FIELDS = ('unified_id', 'source_dataset', 'language', 'buggy_code')
+TEXT_FIELDS = ('problem_description', 'buggy_code', 'correct_code', 'execution_feedback', 'hint')
+
+# Control characters Excel rejects; newlines and tabs are fine
+CONTROL_CHARS = re.compile(r'[\x00-\x08\x0B-\x0C\x0E-\x1F\x7F-\x9F]')
+
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 6000
+BATCH_SIZE = 2000
+
+
+def estimate_tokens(text):
+    """Rough token count (no tokenizer needed)"""
+    return len(text) // CHARS_PER_TOKEN
+
+
+def check_record(record, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Record-level issues (everything but duplicate_id) as a tuple of names"""
+    issues = []
+    if any(record.get(name) is None for name in REQUIRED_FIELDS):
+        issues.append('missing_field')
+    code = record.get('buggy_code')
+    if isinstance(code, str):
+        if not code.strip():
+            issues.append('empty_code')
+        elif estimate_tokens(code) > token_budget:
+            issues.append('oversized_code')
+    if any(isinstance(record.get(name), str) and CONTROL_CHARS.search(record[name])
+           for name in TEXT_FIELDS):
+        issues.append('control_chars')
+    return tuple(issues)
+
+
+def check_batch(args):
+    """Worker: parse and check a batch -> [(unified_id, source_dataset, issues)]"""
+    items, token_budget = args
+    results = []
+    for item in items:
+        record = json.loads(item) if isinstance(item, str) else item
+        results.append((record.get('unified_id'), record.get('source_dataset'),
+                        check_record(record, token_budget)))
+    return results
+
+
+def _batches(path, token_budget):
+    lines = iter_lines(path)
+    while True:
+        batch = list(islice(lines, BATCH_SIZE))
+        if not batch:
+            return
+        yield batch, token_budget
+
+
+def scan(path=UNIFIED_DATASET, token_budget=DEFAULT_TOKEN_BUDGET, workers=None):
+    """
+    Scan a record file in one pass.
+
+    Args:
+        path (Path): Record file (any jsonl_io format; JSONL formats stream)
+        token_budget (int): Largest buggy_code allowed, in estimated tokens
+        workers (int): Worker processes (1 = in this process)
+
+    Returns:
+        dict: {'total', 'flagged': {id: [issues]}, 'counts', 'by_source', 'no_id'}
+    """
+    path = resolve_data_file(path)
+    workers = workers or os.cpu_count() or 1
+
+    if workers > 1:
+        from multiprocessing import Pool
+        pool = Pool(workers)
+        results = pool.imap(check_batch, _batches(path, token_budget))
+    else:
+        pool = None
+        results = map(check_batch, _batches(path, token_budget))
+
+    total = 0
+    no_id = 0
+    seen = set()
+    flagged = {}
+    sources = {}
+    try:
+        for batch in results:
+            for uid, source, issues in batch:
+                total += 1
+                if uid is None:
+                    no_id += 1
+                    continue
+                if uid in seen:
+                    issues += ('duplicate_id',)
+                else:
+                    seen.add(uid)
+                if issues:
+                    entry = flagged.setdefault(uid, [])
+                    entry.extend(issue for issue in issues if issue not in entry)
+                    sources[uid] = source or 'Unknown'
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    counts = Counter(issue for issues in flagged.values() for issue in issues)
+    by_source = {}
+    for uid, issues in flagged.items():
+        source_counts = by_source.setdefault(sources.get(uid, 'Unknown'), Counter())
+        source_counts.update(issues)
+    return {'total': total, 'flagged': flagged, 'no_id': no_id,
+            'counts': {issue: counts.get(issue, 0) for issue in ISSUES},
+            'by_source': {source: dict(c) for source, c in sorted(by_source.items())}}
+
+
+def write_exclusions(result, path=EXCLUSIONS_FILE, dataset=None, token_budget=None, keep=()):
+    """Save the ids to exclude (flagged for any issue not in `keep`)"""
+    excluded = {uid: issues for uid, issues in result['flagged'].items()
+                if any(issue not in keep for issue in issues)}
+    payload = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'dataset': str(dataset) if dataset else None,
+        'token_budget': token_budget,
+        'records_scanned': result['total'],
+        'issue_counts': result['counts'],
+        'by_source': result['by_source'],
+        'kept_issues': list(keep),
+        'excluded': excluded
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+    return excluded
+
+
+# ========================================
+# Exclusion list (used by samplers and runners)
+# ========================================
+
+def load_exclusions(path=EXCLUSIONS_FILE):
+    """unified_id -> issues of excluded records (empty when no scan has run)"""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('excluded', {})
+
+
+def filter_excluded(records, exclusions=None):
+    """Drop records (a list of Records or dicts) on the exclusion list"""
+    if exclusions is None:
+        exclusions = load_exclusions()
+    if not exclusions:
+        return list(records)
+    kept = [r for r in records if r['unified_id'] not in exclusions]
+    skipped = len(records) - len(kept)
+    if skipped:
+        print(f"🚫 Skipping {skipped} records on the exclusion list ({EXCLUSIONS_FILE.name})")
+    return kept
+
+
+def print_report(result, excluded, seconds, path):
+    print("="*80)
+    print("🔎 DATA QUALITY SCAN")
+    print("="*80)
+    print(f"File:             {path}")
+    print(f"Records scanned:  {result['total']:,} in {seconds:.1f}s "
+          f"({result['total'] / max(seconds, 1e-9):,.0f} records/s)")
+    if result['no_id']:
+        print(f"Without an id:    {result['no_id']:,} (cannot be excluded by id)")
+    print()
+    print(f"{'Issue':<18} {'Records':>8}")
+    print("-"*80)
+    for issue, count in result['counts'].items():
+        print(f"{issue:<18} {count:>8,}")
+    if result['by_source']:
+        print()
+        print(f"{'Source':<14} " + " ".join(f"{issue[:14]:>14}" for issue in ISSUES))
+        print("-"*80)
+        for source, counts in result['by_source'].items():
+            print(f"{source:<14} " + " ".join(f"{counts.get(issue, 0):>14,}" for issue in ISSUES))
+    print("-"*80)
+    print(f"🚫 Excluded: {len(excluded):,} records -> {EXCLUSIONS_FILE}")
+    print("="*80)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan the unified dataset for records not worth sending to a model")
+    parser.add_argument('data_file', nargs='?', type=Path, default=UNIFIED_DATASET)
+    parser.add_argument('--token-budget', type=int, default=DEFAULT_TOKEN_BUDGET,
+                        help="Largest buggy_code in estimated tokens")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--keep', nargs='+', choices=ISSUES, default=[],
+                        help="Report these issues but do not exclude for them")
+    args = parser.parse_args()
+
+    data_file = resolve_data_file(args.data_file)
+    if not data_file.exists():
+        print(f"❌ {data_file} not found (run combine_datasets.py first)")
+        raise SystemExit(1)
+
+    start = time.perf_counter()
+    result = scan(data_file, args.token_budget, args.workers)
+    seconds = time.perf_counter() - start
+    excluded = write_exclusions(result, EXCLUSIONS_FILE, data_file, args.token_budget, args.keep)
+    print_report(result, excluded, seconds, data_file)
@@ -0,0 +1,268 @@
+"""
+Source Schema Mapping
+=====================
+
+Purpose:
+    Standardize a raw source dataset into unified-schema Records from the
+    declarative mapping in config/source_schemas.json. This replaces the
+    five hand-written per-record loaders. Each field is computed once per
+    column with pandas: ids from {index} templates, renames, defaults for
+    missing keys, and list joins such as the SPOC description. A new
+    source only needs a config entry.
+
+    Field specs (a standardized field that is not listed stays null):
+      {"value": "PyPal"}                       constant
+      {"column": "uid", "default": ""}         raw field; default only when the key is missing
+      {"column": "uid", "default_format": "YAKSH_{index:06d}"}
+      {"column": "description", "default": [], "join": "\\n"}
+      {"format": "concept{concept_number}_q{question_number}"}
+      {"columns": ["file_name"]}               additional_info dict
+
+    Templates behave like the old f-strings, so a missing raw field
+    renders as 'None'.
+
+Usage:
+    from schema_mapping import load_source_schemas, standardize
+    schemas = load_source_schemas()
+    records = standardize(json.load(f), schemas['pypal'])
+
+    python scripts/schema_mapping.py --benchmark       # vectorized vs per-record
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import argparse
+import json
+import re
+import string
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from records import FIELDS, Record
+
+
+SCHEMAS_PATH = Path(__file__).parent.parent / 'config' / 'source_schemas.json'
+
+_formatter = string.Formatter()
+
+
+def load_source_schemas(path=SCHEMAS_PATH):
+    """Source key -> schema entry, in config order"""
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    schemas = {entry['key']: entry for entry in config['sources']}
+    for key, entry in schemas.items():
+        unknown = set(entry['fields']) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"{path.name}: source '{key}' maps unknown fields {sorted(unknown)}")
+    return schemas
+
+
+# ========================================
+# Column operations
+# ========================================
+
+def _column(frame, name):
+    """Raw column as an object array; NaN marks a missing key, None an explicit null"""
+    if name in frame.columns:
+        return frame[name].to_numpy(dtype=object, copy=True)
+    return np.full(len(frame), np.nan, dtype=object)
+
+
+def _missing(values):
+    """True where the key was absent (NaN), not where it was null"""
+    return pd.isna(values) & (values != None)    # noqa: E711 (elementwise)
+
+
+def _render(frame, template):
+    """Vectorized template: literal text, {index:0Nd} and {raw_field}"""
+    n = len(frame)
+    out = np.full(n, '', dtype=object)
+    if n == 0:
+        # np.char.zfill cannot size an empty array
+        return out
+    for literal, name, spec, conversion in _formatter.parse(template):
+        if literal:
+            out = out + literal
+        if name is None:
+            continue
+        if name == 'index':
+            zero_pad = re.fullmatch(r'(?:0(\d+))?d?', spec)
+            if zero_pad and not conversion:
+                width = int(zero_pad.group(1) or 0)
+                part = np.char.zfill(np.arange(n).astype(str), width).astype(object)
+            else:
+                part = np.array([format(i, spec) for i in range(n)], dtype=object)
+        else:
+            values = _column(frame, name)
+            values[_missing(values)] = None
+            if spec or conversion:
+                part = np.array([_formatter.format_field(_formatter.convert_field(v, conversion), spec)
+                                 for v in values], dtype=object)
+            else:
+                part = pd.Series(values, dtype=object).map(str).to_numpy(dtype=object)
+        out = out + part
+    return out
+
+
+def _field_values(frame, spec):
+    """Values of one standardized field (object array, or a scalar for constants)"""
+    if 'value' in spec:
+        return spec['value']
+    if 'format' in spec:
+        return _render(frame, spec['format'])
+    if 'columns' in spec:
+        columns = [_column(frame, name) for name in spec['columns']]
+        for values in columns:
+            values[_missing(values)] = None
+        return np.array([dict(zip(spec['columns'], row)) for row in zip(*columns)] if columns
+                        else [{}] * len(frame), dtype=object)
+
+    values = _column(frame, spec['column'])
+    missing = _missing(values)
+    if missing.any():
+        if 'default_format' in spec:
+            values[missing] = _render(frame, spec['default_format'])[missing]
+        else:
+            default = spec.get('default')
+            if isinstance(default, (list, dict)):
+                # numpy would broadcast a container; place one object per row
+                for i in np.flatnonzero(missing):
+                    values[i] = default
+            else:
+                values[missing] = default
+    if 'join' in spec:
+        is_list = pd.Series(values, dtype=object).map(lambda v: isinstance(v, list)).to_numpy(dtype=bool)
+        if is_list.any():
+            values[is_list] = pd.Series(values[is_list], dtype=object).str.join(spec['join']).to_numpy(dtype=object)
+    return values
+
+
+def standardize_columns(raw, schema):
+    """
+    Standardized fields of a raw dataset, column-wise.
+
+    Args:
+        raw (list): Raw records (dicts) as read from the source file
+        schema (dict): One entry of config/source_schemas.json
+
+    Returns:
+        dict: Standardized field -> object array (or scalar constant)
+    """
+    frame = pd.DataFrame(raw, dtype=object)
+    if frame.empty:
+        frame = pd.DataFrame(index=range(len(raw)))
+    return {name: _field_values(frame, spec) for name, spec in schema['fields'].items()}
+
+
+def to_records(columns, n):
+    """Records from standardize_columns() output"""
+    return Record.from_columns(columns, n)
+
+
+def standardize(raw, schema):
+    """Raw records -> list of Records following the schema"""
+    return to_records(standardize_columns(raw, schema), len(raw))
+
+
+# ========================================
+# Per-record reference (benchmark / verification)
+# ========================================
+
+def standardize_rowwise(raw, schema):
+    """The same mapping one record at a time, as the old loaders did"""
+    def render(template, index, record):
+        return template.format(index=index, **{name: record.get(name) for _, name, _, _
+                                               in _formatter.parse(template) if name and name != 'index'})
+
+    records = []
+    for index, record in enumerate(raw):
+        fields = {}
+        for name, spec in schema['fields'].items():
+            if 'value' in spec:
+                value = spec['value']
+            elif 'format' in spec:
+                value = render(spec['format'], index, record)
+            elif 'columns' in spec:
+                value = {column: record.get(column) for column in spec['columns']}
+            else:
+                if spec['column'] in record:
+                    value = record[spec['column']]
+                elif 'default_format' in spec:
+                    value = render(spec['default_format'], index, record)
+                else:
+                    value = spec.get('default')
+                if 'join' in spec and isinstance(value, list):
+                    value = spec['join'].join(value)
+            fields[name] = value
+        records.append(Record(**fields))
+    return records
+
+
+def _synthetic_source(key, n):
+    """Raw records shaped like each source file"""
+    rng = np.random.default_rng(0)
+    code = "def solve(a, b):\n    return a - b\n"
+    rows = []
+    for i in range(n):
+        if key == 'pypal':
+            rows.append({'uid': f"u{i}", 'concept_number': int(rng.integers(1, 9)), 'question_number': i % 40,
+                         'question': "Add two numbers", 'buggy_code': code, 'execution_feedback': "",
+                         'hint': "Check the operator", 'anon_id': f"a{i % 300}"})
+        elif key == 'yaksh':
+            rows.append({'uid': f"YAKSH_{i}", 'problem_description': "Add", 'buggy_code': code,
+                         'language': 'Python', 'execution_feedback': "", 'ground_truth': 'A'})
+        elif key == 'spoc':
+            rows.append({'submission_id': str(i), 'problem_id': f"p{i % 500}",
+                         'description': ["Read n.", "Print n + 1."], 'code': code})
+        else:
+            rows.append({'file_name': f"{i}.c", 'problem_id': f"p{i % 500}", 'code': code,
+                         'erroneous_code': code, 'correct_code': code})
+    return rows
+
+
+def benchmark(n=50_000):
+    """Time vectorized vs per-record standardization per source and check they agree"""
+    schemas = load_source_schemas()
+    print("="*80)
+    print(f"⏱️  SCHEMA MAPPING BENCHMARK ({n:,} records per source)")
+    print("="*80)
+    print(f"{'Source':<12} {'Per-record s':>13} {'Columns s':>10} {'+ Records s':>12} {'Speedup':>8}")
+    print("-"*80)
+    for key, schema in schemas.items():
+        raw = _synthetic_source(key, n)
+
+        start = time.perf_counter()
+        expected = standardize_rowwise(raw, schema)
+        rowwise = time.perf_counter() - start
+
+        start = time.perf_counter()
+        columns = standardize_columns(raw, schema)
+        columnwise = time.perf_counter() - start
+        records = to_records(columns, len(raw))
+        total = time.perf_counter() - start
+
+        assert [r.to_dict() for r in records] == [r.to_dict() for r in expected], key
+        assert standardize([], schema) == standardize_rowwise([], schema) == [], key
+        print(f"{schema['name']:<12} {rowwise:>13.3f} {columnwise:>10.3f} {total:>12.3f} "
+              f"{rowwise / total:>7.1f}x")
+    print("-"*80)
+    print("Columns = field mapping only; + Records adds building the Records (speedup is per-record / + Records)")
+    print("="*80)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Source schema mapping")
+    parser.add_argument('--benchmark', action='store_true', help="Vectorized vs per-record mapping")
+    parser.add_argument('--records', type=int, default=50_000, help="Records per source for --benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.records)
+    else:
+        for key, schema in load_source_schemas().items():
+            print(f"{key:<12} {schema['file']:<28} {', '.join(schema['fields'])}")
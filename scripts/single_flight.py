@@ -0,0 +1,101 @@
+"""
+Single-Flight Request Coalescing
+================================
+
+Purpose:
+    When several threads ask for the same (model, prompt) at the same time
+    (duplicate submissions, a backfill overlapping a main run, concurrent
+    service requests), only the first one calls the provider. The others
+    wait for that call and get its result. Nothing is remembered after the
+    call finishes; that is the response cache's job.
+
+    llm_clients.request_prediction() goes through REQUEST_FLIGHTS, so every
+    runner gets this without changes. Results handed to waiting callers are
+    copies marked 'coalesced': True, so token costs are booked only once.
+
+Usage:
+    flights = SingleFlight()
+    result, shared = flights.do(('qwen', prompt), lambda: call_provider(prompt))
+    flights.print_summary()
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import threading
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers with the same key"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """
+        Run fn() unless a call with the same key is already in flight.
+
+        Returns:
+            tuple: (result, shared) where shared is True for callers that
+            got another caller's result. Exceptions are re-raised in every
+            waiting caller.
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def summary(self):
+        with self._lock:
+            return {'calls': self.calls, 'executed': self.executed, 'coalesced': self.coalesced,
+                    'in_flight': len(self._calls)}
+
+    def print_summary(self):
+        """One line; silent when nothing was coalesced"""
+        summary = self.summary()
+        if summary['coalesced']:
+            print(f"🔗 Coalesced {summary['coalesced']} of {summary['calls']} identical in-flight "
+                  f"requests ({summary['executed']} provider calls)")
+        return summary
@@ -0,0 +1,192 @@
+"""
+Request Telemetry
+=================
+
+Purpose:
+    Record every provider call so a run shows where its wall-clock time
+    went. Each attempt logs start/end time, attempt number, result status,
+    HTTP status (when known) and prompt/response size. Time is split into:
+
+    - network:          time inside the provider call
+    - rate_limit_wait:  sleeps after a 429 / quota response
+    - backoff:          sleeps after an exception or server error
+    - pacing:           fixed waits between calls the runner adds itself
+
+    At the end of a run the per-model latency histograms, status mix,
+    retry counts and time breakdown are written to a metrics file.
+
+Usage:
+    telemetry = Telemetry()
+    with telemetry.attempt('qwen', attempt, prompt) as call:
+        response = requests.post(...)
+        call.finish('LOOP_COND', http_status=200, response=text)
+    telemetry.sleep('qwen', 15, 'rate_limit_wait')
+    telemetry.save(output_dir / 'telemetry_300.json')
+
+    Functions that take telemetry=None fall back to NULL_TELEMETRY, which
+    sleeps but records nothing.
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from hedging import percentile
+
+
+# Upper bounds (seconds) of the latency histogram buckets; the last is open
+LATENCY_BUCKETS = [0.5, 1, 2, 5, 10, 20, 30, 60, 90]
+
+TIME_KINDS = ['network', 'rate_limit_wait', 'backoff', 'pacing']
+
+
+class CallRecord:
+    """One attempt; filled in by the provider code via finish()"""
+
+    __slots__ = ('model', 'attempt', 'start', 'end', 'status', 'http_status',
+                 'prompt_chars', 'response_chars', 'tid')
+
+    def __init__(self, model, attempt, prompt_chars):
+        self.model = model
+        self.attempt = attempt
+        self.prompt_chars = prompt_chars
+        self.start = time.time()
+        self.end = None
+        self.status = None
+        self.http_status = None
+        self.response_chars = 0
+        self.tid = threading.get_ident()
+
+    def finish(self, status, http_status=None, response=None):
+        self.status = status
+        self.http_status = http_status
+        self.response_chars = len(response) if response else 0
+
+    def to_dict(self):
+        return {
+            'model': self.model,
+            'attempt': self.attempt,
+            'start': round(self.start, 3),
+            'end': round(self.end, 3),
+            'latency': round(self.end - self.start, 3),
+            'status': self.status,
+            'http_status': self.http_status,
+            'prompt_chars': self.prompt_chars,
+            'response_chars': self.response_chars
+        }
+
+
+class Telemetry:
+    """Thread-safe collector of call records and sleep time"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.started = time.time()
+        self.calls = []
+        self.time_spent = {}  # model -> kind -> seconds
+        self._lock = threading.Lock()
+
+    def _add_time(self, model, kind, seconds):
+        with self._lock:
+            per_model = self.time_spent.setdefault(model, {k: 0.0 for k in TIME_KINDS})
+            per_model[kind] = per_model.get(kind, 0.0) + seconds
+
+    @contextmanager
+    def attempt(self, model, attempt, prompt):
+        """Time one provider call; an escaping exception is logged as EXCEPTION"""
+        record = CallRecord(model, attempt, len(prompt) if prompt else 0)
+        try:
+            yield record
+        except Exception as e:
+            record.finish('EXCEPTION', response=type(e).__name__)
+            raise
+        finally:
+            record.end = time.time()
+            if record.status is None:
+                record.finish('UNKNOWN')
+            if self.enabled:
+                self._add_time(model, 'network', record.end - record.start)
+                with self._lock:
+                    self.calls.append(record)
+
+    def sleep(self, model, seconds, kind):
+        """time.sleep() that is booked under model / kind"""
+        time.sleep(seconds)
+        if self.enabled and seconds > 0:
+            self._add_time(model, kind, seconds)
+
+    def summary(self):
+        """Per-model latency histogram, status mix, retries and time breakdown"""
+        with self._lock:
+            calls = list(self.calls)
+            time_spent = {m: dict(v) for m, v in self.time_spent.items()}
+
+        labels = [f"<={b}s" for b in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+        models = {}
+        for record in calls:
+            stats = models.setdefault(record.model, {
+                'calls': 0, 'retries': 0, 'latencies': [], 'status': {}, 'http_status': {},
+                'prompt_chars': 0, 'response_chars': 0
+            })
+            stats['calls'] += 1
+            stats['retries'] += record.attempt > 1
+            stats['latencies'].append(record.end - record.start)
+            stats['status'][record.status] = stats['status'].get(record.status, 0) + 1
+            http = str(record.http_status) if record.http_status is not None else 'none'
+            stats['http_status'][http] = stats['http_status'].get(http, 0) + 1
+            stats['prompt_chars'] += record.prompt_chars
+            stats['response_chars'] += record.response_chars
+
+        for model, stats in models.items():
+            latencies = stats.pop('latencies')
+            histogram = [0] * len(labels)
+            for latency in latencies:
+                bucket = next((i for i, b in enumerate(LATENCY_BUCKETS) if latency <= b), len(LATENCY_BUCKETS))
+                histogram[bucket] += 1
+            stats['latency'] = {
+                'mean': round(sum(latencies) / len(latencies), 3),
+                'p50': round(percentile(latencies, 50), 3),
+                'p95': round(percentile(latencies, 95), 3),
+                'max': round(max(latencies), 3),
+                'histogram': dict(zip(labels, histogram))
+            }
+            stats['time_seconds'] = {k: round(v, 1) for k, v in
+                                     time_spent.get(model, {k: 0.0 for k in TIME_KINDS}).items()}
+
+        return {
+            'wall_seconds': round(time.time() - self.started, 1),
+            'total_calls': len(calls),
+            'models': models
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        print("\n📡 Request telemetry:")
+        for model, stats in summary['models'].items():
+            lat = stats['latency']
+            t = stats['time_seconds']
+            print(f"  {model:<10} {stats['calls']:>4} calls ({stats['retries']} retries) | "
+                  f"p50 {lat['p50']:.1f}s p95 {lat['p95']:.1f}s max {lat['max']:.1f}s")
+            print(f"  {'':<10} network {t['network']/60:.1f}m | rate-limit wait {t['rate_limit_wait']/60:.1f}m | "
+                  f"backoff {t['backoff']/60:.1f}m | pacing {t['pacing']/60:.1f}m")
+            status = ', '.join(f"{k}={v}" for k, v in sorted(stats['status'].items(), key=lambda x: -x[1]))
+            print(f"  {'':<10} {status}")
+        return summary
+
+    def save(self, path):
+        """Write the summary plus the raw call log"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            calls = [record.to_dict() for record in self.calls]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'summary': self.summary(), 'calls': calls}, f, indent=2)
+        return path
+
+
+NULL_TELEMETRY = Telemetry(enabled=False)
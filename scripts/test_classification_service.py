@@ -0,0 +1,159 @@
+"""
+Classification Service Tests
+============================
+
+Purpose:
+    Drive MicroBatcher and ClassificationService against the local
+    StubBackend (no API keys or network): batching, coalescing of identical
+    prompts, SLO adaptation, and the /classify and /metrics endpoints.
+
+Usage:
+    python scripts/test_classification_service.py
+    python -m pytest scripts/test_classification_service.py -q
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+
+from classification_service import ClassificationService, MicroBatcher, StubBackend, create_server
+from llm_clients import VALID_CODES
+
+
+MODELS = {'qwen': {'model': 'stub/qwen'}, 'llama': {'model': 'stub/llama'}}
+
+RECORD = {'unified_id': 'TEST_1', 'language': 'Python', 'buggy_code': "def f(n):\n    return n - 1\n"}
+
+
+def submit_all(batcher, prompts):
+    """Submit every prompt, then wait for all results"""
+    futures = [batcher.submit(prompt) for prompt in prompts]
+    return [f.result(timeout=10) for f in futures]
+
+
+def test_full_batch_is_one_dispatch():
+    """max_batch distinct prompts within max_wait go out as one batch, one call each"""
+    batcher = MicroBatcher('qwen', StubBackend(MODELS, base_latency=0.01), max_batch=8, max_wait=1.0)
+    try:
+        results = submit_all(batcher, [f"prompt {i}" for i in range(8)])
+        summary = batcher.summary()
+    finally:
+        batcher.stop()
+    assert all(r['prediction'] in VALID_CODES for r in results)
+    assert summary['requests'] == 8
+    assert summary['batches'] == 1
+    assert summary['calls'] == 8
+    assert summary['mean_batch_size'] == 8
+    assert summary['queued'] == 0
+
+
+def test_identical_prompts_are_coalesced():
+    """Duplicates inside one batch share a single backend call and its result"""
+    calls = []
+    stub = StubBackend(MODELS, base_latency=0.01)
+
+    def backend(model_key, prompt):
+        calls.append(prompt)
+        return stub(model_key, prompt)
+    backend.model_name = stub.model_name
+
+    batcher = MicroBatcher('qwen', backend, max_batch=6, max_wait=1.0)
+    try:
+        results = submit_all(batcher, ['a', 'b', 'a', 'a', 'b', 'a'])
+        summary = batcher.summary()
+    finally:
+        batcher.stop()
+    assert sorted(calls) == ['a', 'b']
+    assert summary['calls'] == 2
+    assert summary['coalesced'] == 4
+    assert results[0] is results[2] is results[3] is results[5]
+    assert results[1] is results[4]
+
+
+def test_wait_shrinks_over_slo():
+    """A p95 over the SLO halves the batching wait (never above the configured limit)"""
+    batcher = MicroBatcher('qwen', StubBackend(MODELS, base_latency=0.02), max_batch=1, max_wait=0.01,
+                           slo=0.001)
+    try:
+        submit_all(batcher, [f"prompt {i}" for i in range(25)])
+        summary = batcher.summary()
+    finally:
+        batcher.stop()
+    assert summary['max_wait_ms'] < 10
+    assert summary['latency_ms']['p95'] > 1
+
+
+def test_concurrent_requests_update_metrics():
+    """Threads calling classify() concurrently are all counted and batched together"""
+    service = ClassificationService(StubBackend(MODELS, base_latency=0.01), ['qwen', 'llama'],
+                                    max_batch=16, max_wait=0.2)
+    try:
+        threads = [threading.Thread(target=service.classify, args=(RECORD,)) for _ in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        metrics = service.metrics()
+    finally:
+        service.shutdown()
+    assert metrics['requests'] == 12
+    assert metrics['errors'] == 0
+    assert metrics['latency_ms']['p50'] > 0
+    for model in ('qwen', 'llama'):
+        stats = metrics['models'][model]
+        assert stats['requests'] == 12
+        assert stats['calls'] + stats['coalesced'] == 12
+        assert stats['calls'] < 12
+
+
+def test_http_endpoints():
+    """/classify answers per model, a bad record is a 400, /metrics counts both"""
+    service = ClassificationService(StubBackend(MODELS, base_latency=0.01), ['qwen', 'llama'])
+    server = create_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def post(body):
+        request = urllib.request.Request(f"{base}/classify", data=json.dumps(body).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return json.load(response)
+
+    try:
+        answer = post({'record': RECORD, 'models': ['qwen']})
+        try:
+            post({'record': {'language': 'Python'}})
+            status = 200
+        except urllib.error.HTTPError as e:
+            status = e.code
+        with urllib.request.urlopen(f"{base}/metrics", timeout=10) as response:
+            metrics = json.load(response)
+    finally:
+        server.shutdown()
+        service.shutdown()
+    assert answer['unified_id'] == 'TEST_1'
+    assert list(answer['predictions']) == ['qwen']
+    assert answer['predictions']['qwen'] in VALID_CODES
+    assert status == 400
+    assert metrics['requests'] == 1
+    assert metrics['errors'] == 1
+    assert metrics['models']['qwen']['calls'] == 1
+    assert metrics['models']['llama']['requests'] == 0
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    raise SystemExit(1 if failed else 0)
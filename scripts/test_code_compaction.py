@@ -0,0 +1,66 @@
+"""
+Code Compaction Tests
+=====================
+
+Purpose:
+    Check how html_to_text turns problem descriptions into plain text:
+    tags and entities, <pre> blocks kept line by line, and comparisons
+    that only look like tags.
+
+Usage:
+    python scripts/test_code_compaction.py
+    python -m pytest scripts/test_code_compaction.py -q
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+from code_compaction import html_to_text
+
+
+def test_tags_and_entities():
+    """Block tags break lines, inline tags vanish, entities are unescaped"""
+    text = '<p>Read <code>n</code> &amp; print it.</p><ul><li>one</li><li>two</li></ul>'
+    assert html_to_text(text) == 'Read n & print it.\n\n- one\n- two'
+
+
+def test_pre_keeps_line_breaks():
+    """Lines inside <pre> stay separate lines, with their indentation"""
+    text = ('<p>Print  both forms.</p>\n'
+            '<pre>Input:\np = Point(1, 2)\nstr(p)\nrepr(p)</pre>\n'
+            '<pre class="code">\ndef f():<br>    return 1 &lt; 2\n</pre>')
+    assert html_to_text(text) == ('Print both forms.\n'
+                                  'Input:\np = Point(1, 2)\nstr(p)\nrepr(p)\n'
+                                  'def f():\n    return 1 < 2')
+
+
+def test_comparison_is_not_a_tag():
+    """"<a and a>" has no name=value attributes, so it is text, not an <a> tag"""
+    assert html_to_text('Loop while i <a and a> 0') == 'Loop while i <a and a> 0'
+    assert html_to_text('<p>Loop while i <a and a> 0</p>') == 'Loop while i <a and a> 0'
+
+
+def test_attributes_are_accepted():
+    """Tags with quoted or bare name=value attributes are still stripped"""
+    text = '<a href="x.html" class=big>link</a> <img src=\'p.png\' />done'
+    assert html_to_text(text) == 'link done'
+
+
+def test_plain_text_unchanged():
+    """Text without markup comes back as is, spacing included"""
+    text = 'Read n.\n  Print  n + 1.'
+    assert html_to_text(text) is text
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    raise SystemExit(1 if failed else 0)
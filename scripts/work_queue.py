@@ -0,0 +1,229 @@
+"""
+Lease-Based Work Queue
+======================
+
+Purpose:
+    Share one prediction run between several worker processes (or machines
+    on a shared disk, each with its own API keys). The queue is a single
+    SQLite file holding one task per (record, model):
+
+    - pending: waiting to be claimed
+    - leased:  claimed by a worker until lease_expires; the worker extends
+               the lease with heartbeats while the API call is running
+    - done:    a result has been stored
+
+    A lease that expires (worker crashed or lost its network) makes the task
+    claimable again. Results are keyed by (record, model) and the first one
+    stored wins, so a task finished twice after a reassignment is harmless.
+
+Tables:
+    records(unified_id, payload)             - record JSON for prompt building
+    tasks(unified_id, model, status, ...)    - one row per (record, model)
+    results(unified_id, model, prediction)   - idempotent results
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    unified_id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    unified_id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (unified_id, model)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, lease_expires);
+CREATE TABLE IF NOT EXISTS results (
+    unified_id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prediction TEXT NOT NULL,
+    worker TEXT,
+    finished_at REAL,
+    PRIMARY KEY (unified_id, model)
+);
+"""
+
+
+class WorkQueue:
+    """SQLite-backed (record, model) task queue with leases"""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps the queue safe to
+        # use from heartbeat threads and from other processes
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def enqueue(self, records, models):
+        """
+        Add (record, model) tasks; existing tasks and results are kept.
+
+        Returns:
+            int: Number of new tasks
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR IGNORE INTO records (unified_id, payload) VALUES (?, ?)",
+                [(r['unified_id'], json.dumps(r, ensure_ascii=False)) for r in records]
+            )
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO tasks (unified_id, model) VALUES (?, ?)",
+                [(r['unified_id'], m) for r in records for m in models]
+            )
+            added = conn.total_changes - before
+            conn.execute("COMMIT")
+        return added
+
+    def claim(self, worker_id, limit=1, lease_seconds=120, models=None):
+        """
+        Lease up to `limit` pending or expired tasks to this worker.
+
+        Args:
+            worker_id (str): Unique worker name
+            limit (int): Max tasks to claim
+            lease_seconds (float): Lease length before reassignment
+            models (list): Only claim tasks for these models (e.g. the ones
+                this worker has keys for)
+
+        Returns:
+            list: Task dicts with 'unified_id', 'model', 'record', 'attempts'
+        """
+        now = time.time()
+        model_filter = ""
+        params = [now]
+        if models:
+            model_filter = f"AND t.model IN ({','.join('?' * len(models))})"
+            params.extend(models)
+        params.append(limit)
+
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(f"""
+                SELECT t.unified_id, t.model, t.attempts, r.payload
+                FROM tasks t JOIN records r ON r.unified_id = t.unified_id
+                WHERE (t.status = 'pending' OR (t.status = 'leased' AND t.lease_expires < ?))
+                {model_filter}
+                ORDER BY t.attempts, t.rowid
+                LIMIT ?
+            """, params).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE unified_id = ? AND model = ?",
+                [(worker_id, now + lease_seconds, uid, model) for uid, model, _, _ in rows]
+            )
+            conn.execute("COMMIT")
+
+        return [
+            {'unified_id': uid, 'model': model, 'attempts': attempts + 1,
+             'record': json.loads(payload)}
+            for uid, model, attempts, payload in rows
+        ]
+
+    def heartbeat(self, worker_id, tasks, lease_seconds=120):
+        """Extend the leases this worker still holds"""
+        if not tasks:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE tasks SET lease_expires = ? WHERE unified_id = ? AND model = ? "
+                "AND worker = ? AND status = 'leased'",
+                [(time.time() + lease_seconds, t['unified_id'], t['model'], worker_id) for t in tasks]
+            )
+
+    def complete(self, worker_id, task, prediction):
+        """Store a result (first result per cell wins) and mark the task done"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR IGNORE INTO results (unified_id, model, prediction, worker, finished_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (task['unified_id'], task['model'], prediction, worker_id, time.time())
+            )
+            conn.execute(
+                "UPDATE tasks SET status = 'done', lease_expires = NULL "
+                "WHERE unified_id = ? AND model = ?",
+                (task['unified_id'], task['model'])
+            )
+            conn.execute("COMMIT")
+
+    def release(self, worker_id, task, attempted=True):
+        """
+        Hand a leased task back.
+
+        attempted=False (no call was made, e.g. its provider's breaker is
+        open) takes back the attempt counted by claim().
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = 'pending', worker = NULL, lease_expires = NULL, "
+                "attempts = attempts - ? "
+                "WHERE unified_id = ? AND model = ? AND worker = ? AND status = 'leased'",
+                (0 if attempted else 1, task['unified_id'], task['model'], worker_id)
+            )
+
+    def counts(self):
+        """Task counts per status"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        counts = {'pending': 0, 'leased': 0, 'done': 0}
+        counts.update(dict(rows))
+        return counts
+
+    def export_predictions(self):
+        """
+        Results in the usual predictions file layout.
+
+        Returns:
+            list: One dict per record with a column per model
+        """
+        with self._connect() as conn:
+            records = conn.execute("SELECT unified_id, payload FROM records ORDER BY rowid").fetchall()
+            results = conn.execute("SELECT unified_id, model, prediction FROM results").fetchall()
+
+        by_record = {}
+        for uid, model, prediction in results:
+            by_record.setdefault(uid, {})[model] = prediction
+
+        predictions = []
+        for uid, payload in records:
+            if uid not in by_record:
+                continue
+            record = json.loads(payload)
+            row = {
+                'unified_id': uid,
+                'source_dataset': record.get('source_dataset'),
+                'language': record.get('language')
+            }
+            row.update(by_record[uid])
+            predictions.append(row)
+        return predictions
@@ -0,0 +1,229 @@
+"""
+Prediction Worker
+=================
+
+Purpose:
+    Entry point for multi-worker prediction runs on top of work_queue.py.
+    Start as many workers as you have API keys / machines; each one claims
+    (record, model) tasks, keeps its leases alive with heartbeats while the
+    API call runs, and stores the result. Throughput grows with the number
+    of workers until the provider rate limits are reached.
+
+Usage:
+    # 1. Fill the queue once
+    python scripts/worker.py init --db outputs/predictions/queue.db --samples 1000 --models qwen llama gemini
+
+    # 2. Start workers (any number, any time, each with its own keys)
+    python scripts/worker.py run --db outputs/predictions/queue.db --worker-id w1
+    python scripts/worker.py run --db outputs/predictions/queue.db --worker-id w2 --api-keys config/api_keys_2.json
+
+    # 3. Check progress / export the usual predictions JSON
+    python scripts/worker.py status --db outputs/predictions/queue.db
+    python scripts/worker.py export --db outputs/predictions/queue.db --output outputs/predictions/predictions_queue.json
+
+Author: [Your Name]
+Date: January 2025
+"""
+
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+
+from circuit_breaker import BreakerRegistry, CIRCUIT_OPEN
+from cost_accounting import CostTracker, add_budget_arguments
+from jsonl_io import read_records, resolve_data_file
+from length_scheduling import add_schedule_argument, order_records
+from llm_clients import REQUEST_FLIGHTS, VALID_CODES, load_config, load_model_registry, request_prediction
+from prompt_template import add_compact_argument, enable_compaction
+from scan_data_quality import filter_excluded
+from work_queue import WorkQueue
+
+
+DEFAULT_DB = Path(__file__).parent.parent / 'outputs' / 'predictions' / 'queue.db'
+
+# Answers worth keeping even though they are not a category code
+FINAL_STATUSES = {'PARSE_ERROR'}
+
+
+def create_prompt(record):
+    """Import from prompt_template.py"""
+    from prompt_template import create_classification_prompt
+    return create_classification_prompt(record)
+
+
+def init_queue(db_path, num_samples=None, models=None, schedule='fifo'):
+    """Enqueue (record, model) tasks for the first num_samples records, in schedule order"""
+    sample_path = Path(__file__).parent.parent / 'data' / 'sample_1000.json'
+    sample = read_records(resolve_data_file(sample_path))
+    if num_samples:
+        sample = sample[:num_samples]
+    sample = filter_excluded(sample)
+
+    registry, _ = load_model_registry()
+    if not models:
+        models = list(registry)
+    # Tasks are claimed in insertion order, so the queue order is the schedule
+    sample = order_records(sample, {m: registry[m] for m in models if m in registry}, schedule)
+
+    queue = WorkQueue(db_path)
+    added = queue.enqueue(sample, models)
+    print(f"✅ Queued {added} new tasks ({len(sample)} records × {len(models)} models)")
+    print(f"📂 Queue: {db_path}")
+
+
+def run_worker(db_path, worker_id, models=None, api_keys=None, batch=4,
+               lease_seconds=120, max_attempts=3, poll_seconds=10, max_tokens=None, max_cost=None):
+    """
+    Claim and process tasks until the queue is drained.
+
+    Args:
+        db_path (Path): Queue database
+        worker_id (str): Unique name for this worker
+        models (list): Models this worker serves (default: all in registry)
+        api_keys (Path): API key file for this worker
+        batch (int): Tasks claimed per round trip
+        lease_seconds (float): Lease length; heartbeats renew it every third
+        max_attempts (int): Transient errors are handed back until this many tries
+        poll_seconds (float): Wait when other workers hold the remaining tasks
+        max_tokens (int): This worker stops claiming after this many tokens
+        max_cost (float): This worker stops claiming after this much spend
+    """
+    queue = WorkQueue(db_path)
+    config = load_config(api_keys)
+    registry, _ = load_model_registry()
+    models = models or list(registry)
+    breakers = BreakerRegistry(failure_threshold=3, cooldown=300)
+    costs = CostTracker.from_registry(registry, max_tokens, max_cost)
+
+    print("="*80)
+    print(f"👷 WORKER {worker_id}")
+    print("="*80)
+    print(f"🤖 Models: {', '.join(models)}")
+    print(f"📂 Queue: {db_path}")
+    print()
+
+    held = []
+    held_lock = threading.Lock()
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(lease_seconds / 3):
+            with held_lock:
+                tasks = list(held)
+            queue.heartbeat(worker_id, tasks, lease_seconds)
+
+    heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+    heartbeat_thread.start()
+
+    done = 0
+    released = 0
+    start_time = time.time()
+    try:
+        while True:
+            if costs.exhausted():
+                print(f"💰 Budget reached ({costs.budget_status()}); not claiming more tasks")
+                break
+
+            # Do not claim work for providers whose breaker is open
+            open_for = {m: breakers.get(m).seconds_until_probe() for m in models}
+            claimable = [m for m in models if open_for[m] == 0]
+            tasks = queue.claim(worker_id, batch, lease_seconds, claimable) if claimable else []
+
+            if not tasks:
+                counts = queue.counts()
+                if counts['pending'] == 0 and counts['leased'] == 0:
+                    break
+                wait = poll_seconds if claimable else min(open_for.values())
+                time.sleep(max(1, min(wait, poll_seconds * 6)))
+                continue
+
+            with held_lock:
+                held[:] = tasks
+
+            for task in tasks:
+                prompt = create_prompt(task['record'])
+                result = breakers.call(
+                    task['model'],
+                    lambda: request_prediction(task['model'], prompt, config, registry)
+                )
+                prediction = result if result == CIRCUIT_OPEN else result['prediction']
+                costs.add_result(result, task['record'].get('source_dataset'), task['record'].get('language'))
+
+                retryable = prediction not in VALID_CODES and prediction not in FINAL_STATUSES
+                if prediction == CIRCUIT_OPEN or (retryable and task['attempts'] < max_attempts):
+                    queue.release(worker_id, task, attempted=prediction != CIRCUIT_OPEN)
+                    released += 1
+                else:
+                    queue.complete(worker_id, task, prediction)
+                    done += 1
+                    print(f"[{done}] {task['unified_id']} {task['model']}: {prediction}", flush=True)
+
+                with held_lock:
+                    held.remove(task)
+    finally:
+        stop.set()
+
+    elapsed = time.time() - start_time
+    print("\n" + "="*80)
+    print(f"✅ Worker {worker_id} finished")
+    print(f"Completed: {done} tasks | Handed back: {released}")
+    if elapsed > 0:
+        print(f"Throughput: {done / elapsed * 60:.1f} tasks/min")
+    print("="*80)
+    costs.print_summary()
+    breakers.print_summary()
+    REQUEST_FLIGHTS.print_summary()
+
+
+def print_status(db_path):
+    """Print task counts"""
+    counts = WorkQueue(db_path).counts()
+    total = sum(counts.values())
+    print(f"Tasks: {total}")
+    for status, count in counts.items():
+        pct = count / total * 100 if total else 0
+        print(f"  {status:<10} {count:>7} ({pct:>5.1f}%)")
+
+
+def export_results(db_path, output_file):
+    """Write results as a regular predictions JSON file"""
+    predictions = WorkQueue(db_path).export_predictions()
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(predictions, f, indent=2, ensure_ascii=False)
+    print(f"✅ SAVED: {output_file} ({len(predictions)} records)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-worker prediction queue")
+    parser.add_argument('command', choices=['init', 'run', 'status', 'export'])
+    parser.add_argument('--db', type=Path, default=DEFAULT_DB, help="Queue database file")
+    parser.add_argument('--samples', type=int, default=None, help="init: number of records")
+    add_schedule_argument(parser)
+    parser.add_argument('--models', nargs='+', default=None, help="Model keys from config/models.json")
+    parser.add_argument('--worker-id', default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument('--api-keys', type=Path, default=None, help="run: API key file for this worker")
+    parser.add_argument('--batch', type=int, default=4, help="run: tasks claimed at a time")
+    parser.add_argument('--lease', type=float, default=120, help="run: lease length in seconds")
+    add_budget_arguments(parser)
+    add_compact_argument(parser)
+    parser.add_argument('--output', type=Path,
+                        default=Path(__file__).parent.parent / 'outputs' / 'predictions' / 'predictions_queue.json')
+    args = parser.parse_args()
+    if args.compact:
+        enable_compaction()
+
+    if args.command == 'init':
+        init_queue(args.db, args.samples, args.models, args.schedule)
+    elif args.command == 'run':
+        run_worker(args.db, args.worker_id, args.models, args.api_keys, args.batch, args.lease,
+                   max_tokens=args.max_tokens, max_cost=args.max_cost)
+    elif args.command == 'status':
+        print_status(args.db)
+    else:
+        export_results(args.db, args.output)